@@ -25,7 +25,8 @@ def _callback_checkout(args):
     kargs = {
         "package_path": args.package,
         "asset_name": args.asset,
-        "rebase": args.reset
+        "rebase": args.reset,
+        "verify_file": args.verify
     }
 
     if args.branch:
@@ -127,6 +128,11 @@ examples:
         help="if the asset is already check out on local repository: "
              "will discard all changes."
     )
+    parser.add_argument(
+        "--verify", action="store_true",
+        help="check the file on origin against its recorded sha256 before "
+             "checking it out (the file is hashed on origin)."
+    )
     return parser
 
 
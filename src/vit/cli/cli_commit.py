@@ -5,6 +5,7 @@ from vit.connection.connection_utils import ssh_connect_auto
 from vit.vit_lib import commit
 from vit.custom_exceptions import VitCustomException, Asset_NotEditable_E
 from vit.cli import logger
+from vit.cli.progress_bar import add_progress_bar
 
 
 def _callback_commit(args):
@@ -23,6 +24,7 @@ def _callback_commit(args):
         logger.log.error(err)
         logger.log.error(str(e))
         return False, None
+    add_progress_bar(vit_connection)
     try:
         with vit_connection:
             commit.commit_file(
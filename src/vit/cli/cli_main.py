@@ -6,7 +6,8 @@ from vit.cli import (
     cli_commit, cli_free, cli_branch,
     cli_infos, cli_log, cli_clean,
     cli_init, cli_clone, cli_package,
-    cli_fetch, cli_tag,
+    cli_fetch, cli_tag, cli_verify,
+    cli_replicate,
 )
 
 
@@ -40,7 +41,9 @@ def create_parser():
         cli_list.PARSER_WRAPPER_LIST,
         cli_log.PARSER_WRAPPER_LOG,
         cli_package.PARSER_WRAPPER_PACKAGE,
+        cli_replicate.PARSER_WRAPPER_REPLICATE,
         cli_tag.PARSER_WRAPPER_TAG,
+        cli_verify.PARSER_WRAPPER_VERIFY,
     )
 
     parser = ArgumentParser(
@@ -14,7 +14,8 @@ def _callback_rebase(args):
     )
     status, _ = command_line_helpers.exec_vit_cmd_from_cwd_with_server(
         rebase.rebase_from_commit, "Could not {}".format(_str),
-        args.package_path, args.asset, args.branch, args.commit
+        args.package_path, args.asset, args.branch, args.commit,
+        verify_commit=args.verify
     )
     if status:
         logger.log.info("successfully {}".format(_str))
@@ -57,6 +58,10 @@ examples:
     parser.add_argument(
         "commit", type=str,
         help="id of the commit to reset the branch to")
+    parser.add_argument(
+        "--verify", action="store_true",
+        help="check the commit file on origin against its recorded sha256 "
+             "before rebasing (the file is hashed on origin).")
     return parser
 
 
@@ -0,0 +1,54 @@
+from vit.cli.argument_parser import ArgumentParser, SubArgumentParserWrapper
+from vit.cli import command_line_helpers
+from vit.vit_lib import replicate
+from vit.cli import logger
+
+
+def _callback_replicate(args):
+    status, copied = command_line_helpers.exec_vit_cmd_from_cwd_with_server(
+        replicate.replicate,
+        "Could not replicate origin to mirror {}.".format(args.mirror),
+        args.mirror, max_workers=args.jobs
+    )
+    if status:
+        logger.log.info("{} files replicated to mirror {}.".format(
+            copied, args.mirror))
+    return status
+
+
+def _create_parser_replicate():
+    parser = ArgumentParser('replicate')
+    parser.set_defaults(func=_callback_replicate)
+    parser.help = "copy what changed on origin to one of its mirrors."
+    parser.description = """
+--- vit REPLICATE command ---
+
+This command keeps a mirror of origin repository up to date. Mirrors are
+declared in the "mirrors" section of the repository config, and serve
+commit files to the sites they are near of.
+
+Only files changed on origin since last replication are copied, commit
+files first and then metadata. Where the last replication stopped is
+stored on the mirror: an interrupted replication restarts from there.
+
+Origin is locked only at the end, to copy what changed meanwhile.
+    """
+    parser.epilog = """
+examples:
+    vit replicate site2
+    vit replicate site2 -j 16
+    """
+    parser.add_argument(
+        "mirror", type=str,
+        help="name of the mirror to update.")
+    parser.add_argument(
+        "-j", "--jobs", type=int,
+        default=replicate.MAX_WORKERS,
+        help="number of files copied at once.")
+    return parser
+
+
+PARSER_WRAPPER_REPLICATE = SubArgumentParserWrapper(
+    arg_parser=_create_parser_replicate(),
+    origin_connection_needed=True
+)
@@ -0,0 +1,56 @@
+from vit.cli.argument_parser import ArgumentParser, SubArgumentParserWrapper
+from vit.cli import command_line_helpers
+from vit.vit_lib import verify
+from vit.cli import logger
+
+
+def _callback_verify(args):
+    status, ret = command_line_helpers.exec_vit_cmd_from_cwd_with_server(
+        verify.verify_asset,
+        "Could not verify asset {}.".format(args.asset),
+        args.package_path, args.asset
+    )
+    if not status:
+        return status
+    for commit, file_status in sorted(ret.items()):
+        if file_status == verify.FILE_OK:
+            continue
+        logger.log.warning("{}: {}".format(commit, file_status))
+    if any(s in (verify.FILE_MISSING, verify.FILE_CORRUPTED) for s in ret.values()):
+        logger.log.error("asset {} has missing or corrupted commits.".format(
+            args.asset))
+        return False
+    logger.log.info("all {} commits of asset {} are valid.".format(
+        len(ret), args.asset))
+    return status
+
+
+def _create_parser_verify():
+    parser = ArgumentParser('verify')
+    parser.set_defaults(func=_callback_verify)
+    parser.help = "check integrity of the commits of an asset on origin."
+    parser.description = """
+--- vit VERIFY command ---
+
+This command checks that every commit of an asset is still present on origin
+and matches the sha256 recorded when it was committed.
+
+Files are hashed on origin: nothing is downloaded, even for huge assets.
+    """
+    parser.epilog = """
+examples:
+    vit verify package_1 asset_A
+    """
+    parser.add_argument(
+        "package_path", type=str,
+        help="path to the package containing the asset.")
+    parser.add_argument(
+        "asset", type=str,
+        help="id of the asset to verify.")
+    return parser
+
+
+PARSER_WRAPPER_VERIFY = SubArgumentParserWrapper(
+    arg_parser=_create_parser_verify(),
+    origin_connection_needed=True
+)
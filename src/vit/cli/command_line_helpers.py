@@ -3,6 +3,7 @@ from vit.custom_exceptions import VitCustomException, VitCustomException_FetchNe
 from vit.connection.connection_utils import ssh_connect_auto
 from vit import constants
 from vit.cli import logger
+from vit.cli.progress_bar import add_progress_bar
 
 
 def is_vit_repo():
@@ -29,6 +30,7 @@ def exec_vit_cmd_from_cwd_with_server(
         logger.log.error(error_mess)
         logger.log.error(str(e))
         return False, None
+    add_progress_bar(vit_connection)
     try:
         with vit_connection:
             ret = vit_command_func(vit_connection, *args, **kargs)
@@ -136,7 +136,7 @@ class Graph(object):
         )
 
         with tree_asset:
-            tree_data = tree_asset.data
+            tree_data = tree_asset.get_data_copy()
             self.tag_index = tree_asset.get_tag_to_origin_commit()
         self.tree_commits = tree_data["commits"]
         self.tree_branches = tree_data["branches"]
@@ -0,0 +1,52 @@
+import os
+import sys
+import time
+
+from vit.connection.transfer_progress import format_size
+
+# renders transfers with origin as a progress bar on stderr, used as a
+# progress observer of the vit connection (see transfer_progress).
+
+BAR_WIDTH = 30
+REFRESH_INTERVAL = 0.1
+
+
+class ProgressBar(object):
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stderr
+        self.last_render_time = 0
+
+    def __call__(self, progress):
+        now = time.monotonic()
+        if not progress.finished and now - self.last_render_time < REFRESH_INTERVAL:
+            return
+        self.last_render_time = now
+        line = "\r{} {} {}/s".format(
+            os.path.basename(progress.src),
+            self._format_done(progress),
+            format_size(progress.throughput)
+        )
+        self.stream.write(line.ljust(80))
+        if progress.finished:
+            self.stream.write("\n")
+        self.stream.flush()
+
+    @staticmethod
+    def _format_done(progress):
+        ratio = progress.ratio
+        if ratio is None:
+            return format_size(progress.bytes_done)
+        filled = int(ratio * BAR_WIDTH)
+        return "[{}{}] {:3d}% {}".format(
+            "#" * filled,
+            " " * (BAR_WIDTH - filled),
+            int(ratio * 100),
+            format_size(progress.total)
+        )
+
+
+def add_progress_bar(vit_connection):
+    # only when stderr is a terminal, logs would be filled with bars.
+    if sys.stderr.isatty():
+        vit_connection.add_progress_observer(ProgressBar())
@@ -0,0 +1,92 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+# asyncio front end of a VitConnection: blocking calls (paramiko, scp,
+# local copies) run in a bounded thread pool, so a pipeline can await
+# many origin operations concurrently, eg: with asyncio.gather.
+
+MAX_WORKERS = 8
+
+
+def _run_in_executor(method_name):
+    async def method(self, *args, **kargs):
+        return await self.run(
+            getattr(self.vit_connection, method_name),
+            *args, **kargs
+        )
+    method.__name__ = method_name
+    return method
+
+
+class AsyncVitConnection(object):
+
+    def __init__(self, vit_connection, max_workers=MAX_WORKERS):
+        self.vit_connection = vit_connection
+        self.executor = ThreadPoolExecutor(max_workers)
+
+    async def __aenter__(self):
+        await self.run(self.vit_connection.open_connection)
+        return self
+
+    async def __aexit__(self, t, value, traceback):
+        try:
+            await self.run(self.vit_connection.__exit__, t, value, traceback)
+        finally:
+            self.executor.shutdown(wait=False)
+
+    @property
+    def local_path(self):
+        return self.vit_connection.local_path
+
+    @property
+    def ssh_link(self):
+        return self.vit_connection.ssh_link
+
+    def add_progress_observer(self, observer):
+        # observers are called from the executor threads.
+        self.vit_connection.add_progress_observer(observer)
+
+    def remove_progress_observer(self, observer):
+        self.vit_connection.remove_progress_observer(observer)
+
+    def get_transfer_queue_depth(self, priority=None):
+        return self.vit_connection.get_transfer_queue_depth(priority)
+
+    def get_transfer_queue_status(self):
+        return self.vit_connection.get_transfer_queue_status()
+
+    async def run(self, func, *args, **kargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor,
+            functools.partial(func, *args, **kargs)
+        )
+
+    async def run_workflow(self, workflow_func, *args, **kargs):
+        # runs a vit_lib function taking the connection as first argument.
+        return await self.run(workflow_func, self.vit_connection, *args, **kargs)
+
+    # -- Data transfer with origin api ---------------------------------------
+
+    get_data_from_origin = _run_in_executor("get_data_from_origin")
+    put_data_to_origin = _run_in_executor("put_data_to_origin")
+    put_commit_to_origin = _run_in_executor("put_commit_to_origin")
+    get_metadata_from_origin = _run_in_executor("get_metadata_from_origin")
+    get_metadata_from_origin_as_staged = _run_in_executor(
+        "get_metadata_from_origin_as_staged"
+    )
+    put_metadata_to_origin = _run_in_executor("put_metadata_to_origin")
+    update_staged_metadata = _run_in_executor("update_staged_metadata")
+    apply_metadata_operations = _run_in_executor("apply_metadata_operations")
+
+    # -- Command to be executed on origin ------------------------------------
+
+    create_dirs_at_origin_if_not_exist = _run_in_executor(
+        "create_dirs_at_origin_if_not_exist"
+    )
+    copy_file_at_origin = _run_in_executor("copy_file_at_origin")
+    exists_on_origin = _run_in_executor("exists_on_origin")
+    exists_many_on_origin = _run_in_executor("exists_many_on_origin")
+    hash_on_origin = _run_in_executor("hash_on_origin")
+    hash_many_on_origin = _run_in_executor("hash_many_on_origin")
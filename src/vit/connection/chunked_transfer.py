@@ -0,0 +1,82 @@
+import threading
+import collections
+from concurrent.futures import ThreadPoolExecutor
+
+# Splits a file in byte ranges transferred in parallel over several
+# streams. Sources and destinations are given as callables opening a new
+# file object for a given stream index, so the same code is used for local
+# files and sftp files (one sftp channel per stream).
+
+
+def split_byte_ranges(size, chunk_size):
+    return [
+        (offset, min(chunk_size, size - offset))
+        for offset in range(0, size, chunk_size)
+    ]
+
+
+def read_range(file_object, offset, length, buffer_size):
+    # sftp files can prefetch a whole range with concurrent requests.
+    if hasattr(file_object, "readv"):
+        yield from file_object.readv([(offset, length)])
+        return
+    file_object.seek(offset)
+    remaining = length
+    while remaining:
+        chunk = file_object.read(min(buffer_size, remaining))
+        if not chunk:
+            raise EOFError("unexpected end of file at {}".format(
+                offset + length - remaining
+            ))
+        remaining -= len(chunk)
+        yield chunk
+
+
+class ChunkedTransfer(object):
+
+    def __init__(
+            self, open_src, open_dst,
+            streams=4,
+            chunk_size=16777216,
+            buffer_size=1048576):
+        self.open_src = open_src
+        self.open_dst = open_dst
+        self.streams = streams
+        self.chunk_size = chunk_size
+        self.buffer_size = buffer_size
+        # called with the size of each piece of data written.
+        self.on_bytes = None
+
+    def run(self, size, skip_offsets=(), on_range_done=None):
+        ranges = collections.deque(
+            r for r in split_byte_ranges(size, self.chunk_size)
+            if r[0] not in skip_offsets
+        )
+        self.on_range_done = on_range_done
+        self.on_range_done_lock = threading.Lock()
+        stream_number = max(1, min(self.streams, len(ranges)))
+        with ThreadPoolExecutor(stream_number) as executor:
+            futures = [
+                executor.submit(self._transfer_ranges, i, ranges)
+                for i in range(stream_number)
+            ]
+            for future in futures:
+                future.result()
+
+    def _transfer_ranges(self, stream_idx, ranges):
+        with self.open_src(stream_idx) as f_src, \
+                self.open_dst(stream_idx) as f_dst:
+            while True:
+                try:
+                    offset, length = ranges.popleft()
+                except IndexError:
+                    return
+                f_dst.seek(offset)
+                for chunk in read_range(f_src, offset, length, self.buffer_size):
+                    f_dst.write(chunk)
+                    if self.on_bytes is not None:
+                        self.on_bytes(len(chunk))
+                if self.on_range_done is not None:
+                    f_dst.flush()
+                    with self.on_range_done_lock:
+                        self.on_range_done(offset)
@@ -0,0 +1,95 @@
+import os
+import zlib
+import tarfile
+
+# On the wire compression of transfers: data is streamed through gzip on
+# an exec channel instead of being sent by the file transport. Whether a
+# transfer is worth compressing is decided from the file extension, or for
+# unknown extensions by compressing a sample of the file.
+
+GZIP_WBITS = 31
+
+
+def is_worth_compressing(path, read_sample, transfer_config):
+    mode = transfer_config.get("compression", "never")
+    if mode == "never":
+        return False
+    if mode == "always":
+        return True
+    extension = os.path.splitext(path)[1].lower()
+    if extension in transfer_config.get("compression_extensions", ()):
+        return True
+    if extension in transfer_config.get("no_compression_extensions", ()):
+        return False
+    try:
+        sample = read_sample(path, transfer_config.get("compression_probe_size", 65536))
+    except (OSError, IOError):
+        return False
+    return get_compression_ratio(
+        sample,
+        transfer_config.get("compression_level", 3)
+    ) <= transfer_config.get("compression_max_ratio", 0.9)
+
+
+def get_compression_ratio(data, level):
+    if not data:
+        return 1
+    return len(zlib.compress(data, level)) / len(data)
+
+
+def read_local_sample(path, size):
+    with open(path, "rb") as f:
+        return f.read(size)
+
+
+# on_bytes callbacks are given the size of compressed data, as sent on the
+# wire.
+
+def send_compressed(channel, file_object, level, buffer_size, on_bytes=None):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, GZIP_WBITS)
+    while True:
+        chunk = file_object.read(buffer_size)
+        if not chunk:
+            break
+        data = compressor.compress(chunk)
+        channel.sendall(data)
+        if on_bytes is not None:
+            on_bytes(len(data))
+    channel.sendall(compressor.flush())
+    channel.shutdown_write()
+
+
+def recv_decompressed(channel, file_object, buffer_size, on_bytes=None):
+    decompressor = zlib.decompressobj(GZIP_WBITS)
+    while True:
+        data = channel.recv(buffer_size)
+        if not data:
+            break
+        if on_bytes is not None:
+            on_bytes(len(data))
+        file_object.write(decompressor.decompress(data))
+    file_object.write(decompressor.flush())
+
+
+def recv_tar(channel, dst, on_bytes=None):
+    # extracts a 'tar cz' stream, merging it into dst.
+    with channel.makefile("rb") as stream:
+        if on_bytes is not None:
+            stream = _CountingReader(stream, on_bytes)
+        with tarfile.open(fileobj=stream, mode="r|gz") as tar:
+            if hasattr(tarfile, "data_filter"):
+                tar.extractall(dst, filter="data")
+            else:
+                tar.extractall(dst)
+
+
+class _CountingReader(object):
+
+    def __init__(self, stream, on_bytes):
+        self.stream = stream
+        self.on_bytes = on_bytes
+
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        self.on_bytes(len(data))
+        return data
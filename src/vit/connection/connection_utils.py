@@ -3,6 +3,7 @@ from vit.file_handlers import repo_config
 from vit.connection.vit_connection import VitConnection
 from vit.connection.vit_connection_local import VitConnectionLocal
 from vit.connection.vit_connection_remote import VitConnectionRemote
+from vit.connection.async_vit_connection import AsyncVitConnection, MAX_WORKERS
 
 
 def ssh_connect_auto(path):
@@ -14,6 +15,10 @@ def ssh_connect_auto(path):
     return vit_connection_type(path, host, origin_path, user)
 
 
+def async_ssh_connect_auto(path, max_workers=MAX_WORKERS):
+    return AsyncVitConnection(ssh_connect_auto(path), max_workers)
+
+
 @atexit.register
 def dispose_vit_connection():
     for instance in VitConnection.instances:
@@ -0,0 +1,148 @@
+import os
+import shutil
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+import logging
+log = logging.getLogger()
+
+# Copy of a file on the same machine, trying first what avoids to
+# duplicate data:
+#   - reflink: blocks shared with src (copy on write), btrfs / xfs.
+#   - hardlink: same inode as src, only when src is removed right after
+#     (commit sent to a local origin without keeping it editable).
+#   - copy_file_range / sendfile: data copied by the kernel (can be done
+#     server side on network filesystems).
+#   - shutil: read / write by blocks.
+# Strategy used for each copy is counted in stats (see get_copy_stats).
+
+REFLINK = "reflink"
+HARDLINK = "hardlink"
+COPY_FILE_RANGE = "copy_file_range"
+SENDFILE = "sendfile"
+SHUTIL = "shutil"
+
+FICLONE = 0x40049409
+BLOCK_SIZE = 1048576
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def copy_file(src, dst, on_bytes=None, allow_hardlink=False):
+    # returns the strategy used.
+    if os.path.isdir(dst):
+        dst = os.path.join(dst, os.path.basename(src))
+    dst_existed = os.path.lexists(dst)
+    size = os.path.getsize(src)
+    strategies = [(REFLINK, _reflink)]
+    if allow_hardlink and not dst_existed:
+        strategies.append((HARDLINK, _hardlink))
+    strategies += [
+        (COPY_FILE_RANGE, _copy_file_range),
+        (SENDFILE, _sendfile),
+    ]
+    for strategy, copy_func in strategies:
+        try:
+            done = copy_func(src, dst, on_bytes)
+        except OSError as e:
+            log.debug("{} copy of {} failed: {}".format(strategy, src, e))
+            done = False
+        if done:
+            break
+        if not dst_existed and os.path.lexists(dst):
+            os.remove(dst)
+    else:
+        strategy = SHUTIL
+        _copy_by_blocks(src, dst, on_bytes)
+    if strategy != HARDLINK:
+        shutil.copymode(src, dst)
+    if on_bytes is not None and strategy in (REFLINK, HARDLINK):
+        on_bytes(size)
+    record_copy(strategy, size)
+    log.debug("{} copied to {} ({}).".format(src, dst, strategy))
+    return strategy
+
+
+def record_copy(strategy, size=0):
+    with _stats_lock:
+        files, copied = _stats.get(strategy, (0, 0))
+        _stats[strategy] = (files + 1, copied + size)
+
+
+def get_copy_stats():
+    # {strategy: {"files": n, "bytes": n}}, bytes are only known for
+    # local copies.
+    with _stats_lock:
+        return {
+            strategy: {"files": files, "bytes": copied}
+            for strategy, (files, copied) in _stats.items()
+        }
+
+
+def reset_copy_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def _reflink(src, dst, on_bytes):
+    if fcntl is None:
+        return False
+    with open(src, "rb") as f_src, open(dst, "wb") as f_dst:
+        fcntl.ioctl(f_dst.fileno(), FICLONE, f_src.fileno())
+    return True
+
+
+def _hardlink(src, dst, on_bytes):
+    os.link(src, dst)
+    return True
+
+
+def _copy_file_range(src, dst, on_bytes):
+    if not hasattr(os, "copy_file_range"):
+        return False
+    return _copy_by_kernel(
+        src, dst, on_bytes,
+        lambda fd_src, fd_dst, offset: os.copy_file_range(
+            fd_src, fd_dst, BLOCK_SIZE, offset, offset
+        )
+    )
+
+
+def _sendfile(src, dst, on_bytes):
+    if not hasattr(os, "sendfile"):
+        return False
+    return _copy_by_kernel(
+        src, dst, on_bytes,
+        lambda fd_src, fd_dst, offset: os.sendfile(
+            fd_dst, fd_src, offset, BLOCK_SIZE
+        )
+    )
+
+
+def _copy_by_kernel(src, dst, on_bytes, copy_block):
+    with open(src, "rb") as f_src, open(dst, "wb") as f_dst:
+        offset = 0
+        while True:
+            copied = copy_block(f_src.fileno(), f_dst.fileno(), offset)
+            if not copied:
+                break
+            offset += copied
+            if on_bytes is not None:
+                on_bytes(copied)
+    return True
+
+
+def _copy_by_blocks(src, dst, on_bytes):
+    with open(src, "rb") as f_src, open(dst, "wb") as f_dst:
+        while True:
+            b = f_src.read(BLOCK_SIZE)
+            if not b:
+                break
+            f_dst.write(b)
+            if on_bytes is not None:
+                on_bytes(len(b))
@@ -0,0 +1,173 @@
+import re
+import sys
+import zlib
+import struct
+import hashlib
+
+# Delta transfer of a file against a previous version already on origin.
+#
+# Both versions are cut in content defined chunks: cut points are line
+# starts (a newline followed by a non blank char), grouped until the crc of
+# a segment matches a condition, so an edit only changes the chunks around
+# it and chunks after it are found again in the previous version whatever
+# their new offsets. The signature of the previous version (one strong
+# digest per chunk) is computed on origin, the delta (copy from previous
+# version / literal data) is computed locally and applied on origin.
+#
+# Signature and patch are run on origin by vit-delta, installed there like
+# vit-serve (see "vit_delta" of connection config).
+
+MAGIC = b"VITDELTA1\n"
+READ_SIZE = 8388608
+MAX_CHUNK_SIZE = 1048576
+GROUP_RATE = 64
+ANCHOR = re.compile(rb"\n(?=\S)")
+
+
+def iter_chunks(file_object):
+    buffer = b""
+    offset = 0
+    scan_from = 0
+    chunk_start = 0
+    segment_start = 0
+    while True:
+        data = file_object.read(READ_SIZE)
+        eof = not data
+        buffer = buffer[chunk_start:] + data
+        offset += chunk_start
+        scan_from -= chunk_start
+        segment_start -= chunk_start
+        chunk_start = 0
+        # an anchor needs the byte following the newline to be known.
+        limit = len(buffer) if eof else max(len(buffer) - 1, scan_from)
+        view = memoryview(buffer)
+        for match in ANCHOR.finditer(buffer, scan_from, limit):
+            cut = match.start() + 1
+            while cut - chunk_start > MAX_CHUNK_SIZE:
+                yield offset + chunk_start, buffer[chunk_start:chunk_start + MAX_CHUNK_SIZE]
+                chunk_start += MAX_CHUNK_SIZE
+                segment_start = max(segment_start, chunk_start)
+            if zlib.crc32(view[segment_start:cut]) % GROUP_RATE == 0:
+                yield offset + chunk_start, buffer[chunk_start:cut]
+                chunk_start = cut
+            segment_start = cut
+        # a newline just before limit was not matched, its next byte being
+        # out of the scan: scanned again with next read.
+        scan_from = max(limit - 1, 0)
+        while len(buffer) - chunk_start > MAX_CHUNK_SIZE:
+            yield offset + chunk_start, buffer[chunk_start:chunk_start + MAX_CHUNK_SIZE]
+            chunk_start += MAX_CHUNK_SIZE
+            segment_start = max(segment_start, chunk_start)
+        view.release()
+        if eof:
+            if chunk_start < len(buffer):
+                yield offset + chunk_start, buffer[chunk_start:]
+            return
+
+
+def chunk_digest(chunk):
+    return hashlib.sha256(chunk).hexdigest()[:32]
+
+
+def write_signature(file_object, output):
+    for offset, chunk in iter_chunks(file_object):
+        output.write("{} {} {}\n".format(chunk_digest(chunk), offset, len(chunk)))
+
+
+def parse_signature(lines):
+    signature = {}
+    for line in lines:
+        digest, offset, length = line.split()
+        signature.setdefault(digest, (int(offset), int(length)))
+    return signature
+
+
+def write_delta(signature, file_object, output):
+    # returns (literal bytes, copied bytes).
+    stats = [0, 0]
+    pending = [None]
+
+    def flush():
+        if pending[0] is None:
+            return
+        op = pending[0]
+        if op[0] == b"C":
+            output.write(b"C" + struct.pack(">QQ", op[1], op[2]))
+        else:
+            data = b"".join(op[1])
+            output.write(b"D" + struct.pack(">Q", len(data)) + data)
+        pending[0] = None
+
+    output.write(MAGIC)
+    for _, chunk in iter_chunks(file_object):
+        match = signature.get(chunk_digest(chunk))
+        if match is not None and match[1] == len(chunk):
+            stats[1] += len(chunk)
+            op = pending[0]
+            if op is not None and op[0] == b"C" and op[1] + op[2] == match[0]:
+                pending[0] = (b"C", op[1], op[2] + match[1])
+                continue
+            flush()
+            pending[0] = (b"C", match[0], match[1])
+        else:
+            stats[0] += len(chunk)
+            op = pending[0]
+            if op is not None and op[0] == b"D":
+                op[1].append(chunk)
+                continue
+            flush()
+            pending[0] = (b"D", [chunk])
+    flush()
+    return tuple(stats)
+
+
+def apply_delta(basis, delta, output):
+    # returns sha256 of the rebuilt file.
+    sha = hashlib.sha256()
+    if delta.read(len(MAGIC)) != MAGIC:
+        raise ValueError("not a vit delta file.")
+    while True:
+        op = delta.read(1)
+        if not op:
+            break
+        if op == b"C":
+            offset, length = struct.unpack(">QQ", delta.read(16))
+            basis.seek(offset)
+            while length:
+                data = basis.read(min(length, READ_SIZE))
+                if not data:
+                    raise EOFError("basis file too short.")
+                length -= len(data)
+                sha.update(data)
+                output.write(data)
+        elif op == b"D":
+            length, = struct.unpack(">Q", delta.read(8))
+            while length:
+                data = delta.read(min(length, READ_SIZE))
+                if not data:
+                    raise EOFError("delta file too short.")
+                length -= len(data)
+                sha.update(data)
+                output.write(data)
+        else:
+            raise ValueError("unknown delta operation {}.".format(op))
+    return sha.hexdigest()
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv[0] == "signature":
+        with open(argv[1], "rb") as f:
+            write_signature(f, sys.stdout)
+    elif argv[0] == "patch":
+        with open(argv[1], "rb") as basis, \
+                open(argv[2], "rb") as delta, \
+                open(argv[3], "wb") as output:
+            print(apply_delta(basis, delta, output))
+    else:
+        raise ValueError("unknown command {}.".format(argv[0]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+import os
+import json
+import time
+import shlex
+import threading
+
+import logging
+log = logging.getLogger()
+
+# Read only mirrors of origin (see "mirrors" of RepoConfig). Commit files
+# are never modified once written on origin: they can be read from any
+# mirror which already has them. Everything else (metadata, lock, writes)
+# stays on origin.
+# The nearest of origin and its mirrors is picked from the latency of a
+# trivial command, choice is kept mirror_probe_ttl seconds per process.
+# Mirrors are filled by replication from origin (see vit_lib.replicate).
+
+PROBE_COMMAND = "true"
+MKDIR_BATCH_SIZE = 200
+
+_nearest = {}
+_nearest_lock = threading.Lock()
+
+
+class Mirror(object):
+
+    def __init__(self, name, host, path, user, ssh_connection):
+        self.name = name
+        self.host = host
+        self.path = path
+        self.user = user
+        self.ssh_connection = ssh_connection
+
+    def format_path(self, path):
+        return os.path.join(self.path, path)
+
+    def mkdirs(self, dirs):
+        dirs = sorted(set(dirs))
+        for i in range(0, len(dirs), MKDIR_BATCH_SIZE):
+            status = self.ssh_connection.exec_command_output(
+                "mkdir -p " + " ".join(
+                    shlex.quote(self.format_path(d))
+                    for d in dirs[i:i + MKDIR_BATCH_SIZE]
+                ),
+                retry=True
+            )[0]
+            if not status:
+                return False
+        return True
+
+    def read_json(self, path):
+        # None when missing or not readable.
+        status, lines = self.ssh_connection.exec_command_output(
+            "cat {} 2>/dev/null".format(shlex.quote(self.format_path(path))),
+            retry=True
+        )
+        if not status or not lines:
+            return None
+        try:
+            return json.loads("\n".join(lines))
+        except ValueError:
+            return None
+
+    def write_json(self, path, data):
+        path = shlex.quote(self.format_path(path))
+        return self.ssh_connection.exec_command_output(
+            "printf '%s\\n' {} > {}.tmp && mv {}.tmp {}".format(
+                shlex.quote(json.dumps(data)), path, path, path
+            ),
+            retry=True
+        )[0]
+
+    def close(self):
+        try:
+            self.ssh_connection.close_connection()
+        except Exception as e:
+            log.debug("could not close connection to mirror {}: {}".format(
+                self.name, e
+            ))
+
+
+def open_mirror(ssh_connection_type, name, mirror_link, transfer_config, password=None):
+    # None when mirror can't be reached.
+    ssh_connection = ssh_connection_type(mirror_link["host"], mirror_link["username"])
+    ssh_connection.configure_transfer(**transfer_config)
+    try:
+        ssh_connection.open_connection(password)
+    except Exception as e:
+        log.info("mirror {} not reachable: {}".format(name, e))
+        return None
+    return Mirror(
+        name,
+        mirror_link["host"],
+        mirror_link["path"],
+        mirror_link["username"],
+        ssh_connection
+    )
+
+
+def probe_latency(ssh_connection, samples=3):
+    # best time of samples trivial commands, None when it fails.
+    best = None
+    for _ in range(samples):
+        start = time.monotonic()
+        try:
+            status = ssh_connection.exec_command(PROBE_COMMAND)
+        except Exception as e:
+            log.debug("latency probe failed: {}".format(e))
+            return None
+        if not status:
+            return None
+        elapsed = time.monotonic() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def select_nearest(latencies):
+    # latencies: {mirror name (None for origin): seconds or None}.
+    # origin wins ties, unreachable ones are never selected.
+    reachable = {
+        name: latency for name, latency in latencies.items()
+        if latency is not None
+    }
+    if not reachable:
+        return None
+    return min(reachable, key=lambda name: (reachable[name], name is not None))
+
+
+def get_nearest(key, ttl):
+    # (True, name) when a choice younger than ttl exists, else (False, None).
+    with _nearest_lock:
+        entry = _nearest.get(key)
+    if entry is None:
+        return False, None
+    choice_time, name = entry
+    if time.monotonic() - choice_time > ttl:
+        return False, None
+    return True, name
+
+
+def set_nearest(key, name):
+    with _nearest_lock:
+        _nearest[key] = (time.monotonic(), name)
+
+
+def reset_nearest():
+    with _nearest_lock:
+        _nearest.clear()
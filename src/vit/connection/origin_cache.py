@@ -0,0 +1,84 @@
+import os
+import time
+import threading
+
+# Cache of what is known to exist on origin, paths relative to origin
+# root. Filled from directory listings (one listing answers existence of
+# every entry of the directory) and from what vit itself writes on origin.
+# Entries expire after ttl seconds, as others can write on origin too.
+
+
+def _parent(path):
+    return os.path.dirname(path)
+
+
+def _normalize(path):
+    path = os.path.normpath(path)
+    return "" if path == "." else path
+
+
+class OriginCache(object):
+
+    def __init__(self, ttl=0):
+        self.ttl = ttl
+        self.listings = {}
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def exists(self, path):
+        # True / False, or None when not known.
+        path = _normalize(path)
+        if not self.ttl:
+            return None
+        with self.lock:
+            entry = self._get_fresh(self.entries, path)
+            if entry is not None:
+                return entry
+            listing = self._get_fresh(self.listings, _parent(path))
+            if listing is None:
+                return None
+            return os.path.basename(path) in listing
+
+    def set_listing(self, dir_path, names):
+        # names: entry names of dir_path, empty for a missing directory.
+        with self.lock:
+            self.listings[_normalize(dir_path)] = (time.monotonic(), frozenset(names))
+
+    def set_exists(self, path, exists):
+        path = _normalize(path)
+        with self.lock:
+            self.entries[path] = (time.monotonic(), exists)
+            self.listings.pop(_parent(path), None)
+
+    def invalidate(self, path, ancestors=False):
+        # drops what is known of path, what is under it, and its parent.
+        # ancestors: also of every ancestor of path, which may have been
+        # created with it (mkdir -p).
+        path = _normalize(path)
+        prefix = path + "/"
+        with self.lock:
+            for cache in (self.listings, self.entries):
+                for key in list(cache):
+                    if key == path or key.startswith(prefix):
+                        del cache[key]
+            parent = _parent(path)
+            self.listings.pop(parent, None)
+            while ancestors and parent:
+                self.entries.pop(parent, None)
+                parent = _parent(parent)
+                self.listings.pop(parent, None)
+
+    def clear(self):
+        with self.lock:
+            self.listings.clear()
+            self.entries.clear()
+
+    def _get_fresh(self, cache, key):
+        value = cache.get(key)
+        if value is None:
+            return None
+        cache_time, data = value
+        if time.monotonic() - cache_time > self.ttl:
+            del cache[key]
+            return None
+        return data
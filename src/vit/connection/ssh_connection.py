@@ -1,7 +1,26 @@
 import os
+import stat
+import time
+import uuid
+import zlib
+import tarfile
+import socket
+import threading
+import contextlib
+import shlex
 import paramiko
 from scp import SCPClient
-from vit.custom_exceptions import SSH_ConnectionError_E
+from vit import py_helpers
+from vit.connection import ssh_control
+from vit.connection import compression
+from vit.connection import transfer_scheduler
+from vit.connection.chunked_transfer import ChunkedTransfer
+from vit.file_handlers.transfer_checkpoint import TransferCheckpoint
+from vit.custom_exceptions import (
+    SSH_ConnectionError_E,
+    SSH_OperationInterrupted_E,
+    SSH_TransferVerificationError_E
+)
 from getpass import getpass
 
 import logging
@@ -11,6 +30,13 @@ log = logging.getLogger()
 class SSHConnection(object):
 
     port = 22
+    # None: decided from the environment when the connection is opened.
+    use_control_daemon = None
+    # methods that can be forwarded to the ssh control daemon.
+    control_methods = (
+        "put", "get",
+        "exec_command", "exec_command_output",
+    )
 
     def __init__(self, server, user):
         self.server = server
@@ -20,7 +46,21 @@ class SSHConnection(object):
             self.server
         )
         self.ssh_client = None
-        self.scp_client = None
+        # kept to reconnect when the connection drops.
+        self.password = None
+        # file transports not in use, one per transfer running at once.
+        self.idle_file_transports = []
+        self.control_client = None
+        self.remote_shell = None
+        self.remote_shell_lock = threading.Lock()
+        self.transfer_config = {}
+        self.chunked_sftp_clients = []
+        # one per chunked stream but the first (see _get_chunked_sftp_clients).
+        self.stream_ssh_clients = []
+        # scp client and sftp clients creation are not thread safe: only
+        # creation is locked, transfers run at once on the ssh transport.
+        self.file_transport_lock = threading.Lock()
+        self.chunked_sftp_clients_lock = threading.Lock()
 
     def __enter__(self):
         self.open_connection()
@@ -29,40 +69,845 @@ class SSHConnection(object):
     def __exit__(self, t, value, traceback):
         self.close_connection()
 
-    def open_connection(self):
+    def open_connection(self, password=None):
+        use_control_daemon = self.use_control_daemon
+        if use_control_daemon is None:
+            use_control_daemon = ssh_control.is_available()
+        if use_control_daemon:
+            # daemon session has the transfer config of this connection.
+            self.control_client = ssh_control.attach(
+                self.server,
+                self.port,
+                self.user,
+                transfer_config=self.transfer_config
+            )
+            if self.control_client is not None:
+                return
         self.ssh_client = paramiko.SSHClient()
         self.ssh_client.load_system_host_keys()
-        password = getpass("{}'s password: ".format(self.user))
+        if password is None:
+            password = getpass("{}'s password: ".format(self.user))
         try:
             self.ssh_client.connect(self.server, self.port, self.user, password)
         except Exception as e:
             raise SSH_ConnectionError_E(self.ssh_link, e)
-        else:
-            self.scp_client = SCPClient(self.ssh_client.get_transport())
+        self.password = password
+        self._configure_keepalive()
+
+    def reconnect(self):
+        log.info("reconnecting to {}.".format(self.ssh_link))
+        self._close_remote_shell()
+        self._close_chunked_sftp_clients()
+        self._close_file_transports()
+        try:
+            self.ssh_client.close()
+        except Exception:
+            pass
+        self.ssh_client = None
+        self.open_connection(self.password)
+
+    def configure_transfer(self, **transfer_config):
+        if transfer_config == self.transfer_config:
+            return
+        self.transfer_config = transfer_config
+        self._configure_bandwidth()
+        if self.control_client is not None:
+            # attached again, to the session with this transfer config.
+            self.control_client.close()
+            self.control_client = None
+            self.open_connection(self.password)
+        if self.ssh_client is not None:
+            self._configure_keepalive()
+            self._close_file_transports()
 
     def close_connection(self):
-        self.scp_client.close()
+        if self.control_client is not None:
+            # the session stays warm in the daemon, only detach from it.
+            self.control_client.close()
+            self.control_client = None
+            return
+        self._close_remote_shell()
+        self._close_chunked_sftp_clients()
+        self._close_file_transports()
         self.ssh_client.close()
-        self.scp_client = None
         self.ssh_client = None
 
-    def put(self, *args, **kargs):
-        return self.scp_client.put(*args, **kargs)
+    def put(
+            self, src, dst,
+            recursive=False,
+            resume=None,
+            priority=transfer_scheduler.PRIORITY_INTERACTIVE,
+            on_bytes=None,
+            retry=False,
+            hash_src=False):
+        # resume: (partial_path, checkpoint_path), data is first written to
+        # partial_path on origin so an interrupted upload can be resumed.
+        # on_bytes: called with the size of each piece of data sent, sent
+        # back by the ssh control daemon when attached to it.
+        # retry: see _call_with_retry.
+        # hash_src: returns sha256 of src (a file), computed while sending
+        # it when the transfer reads src in order.
+        if self.control_client is not None:
+            return self.control_client.call(
+                "put", os.path.abspath(src), dst,
+                recursive=recursive,
+                resume=_abspath_resume(resume, checkpoint_only=True),
+                priority=priority,
+                on_bytes=on_bytes,
+                retry=retry,
+                hash_src=hash_src
+            )
+        sha256 = self._call_with_retry(
+            "upload of {}".format(src), retry,
+            self._put, src, dst, recursive, resume,
+            self._get_bytes_callback(priority, on_bytes),
+            hash_src and not os.path.isdir(src)
+        )
+        if not hash_src:
+            return None
+        if sha256 is None:
+            sha256 = py_helpers.calculate_file_sha(src)
+        return sha256
+
+    def _put(self, src, dst, recursive, resume, on_bytes, hash_src):
+        # returns sha256 of src if it was computed during the transfer.
+        if resume and self._is_above_threshold(
+                src, os.path.getsize, "resumable_threshold"):
+            return self._put_ranges(src, dst, *resume, on_bytes=on_bytes)
+        if not os.path.isdir(src) and compression.is_worth_compressing(
+                src, compression.read_local_sample, self.transfer_config):
+            sha256 = self._put_compressed(src, dst, on_bytes, hash_src)
+            if sha256:
+                return sha256 if hash_src else None
+        if self._is_above_threshold(src, os.path.getsize, "chunked_threshold"):
+            return self._put_ranges(src, dst, on_bytes=on_bytes)
+        with self._file_transport() as file_transport:
+            return file_transport.put(
+                src, dst,
+                recursive=recursive,
+                on_bytes=on_bytes,
+                hash_src=hash_src
+            )
+
+    def get(
+            self, src, dst,
+            recursive=False,
+            resume=None,
+            priority=transfer_scheduler.PRIORITY_INTERACTIVE,
+            on_bytes=None,
+            retry=False):
+        # resume: (partial_path, checkpoint_path), both local.
+        if self.control_client is not None:
+            return self.control_client.call(
+                "get", src, os.path.abspath(dst),
+                recursive=recursive,
+                resume=_abspath_resume(resume),
+                priority=priority,
+                on_bytes=on_bytes,
+                retry=retry
+            )
+        return self._call_with_retry(
+            "download of {}".format(src), retry,
+            self._get, src, dst, recursive, resume,
+            self._get_bytes_callback(priority, on_bytes)
+        )
 
-    def get(self, *args, **kargs):
-        dst = args[1]
-        recursive = kargs.get("recursive")
+    def _get(self, src, dst, recursive, resume, on_bytes):
         if recursive:
             parent_dir = os.path.dirname(dst)
             if not os.path.exists(parent_dir):
                 os.makedirs(parent_dir)
-        return self.scp_client.get(*args, **kargs)
+        if resume and self._is_above_threshold(
+                src, self._get_remote_size, "resumable_threshold"):
+            return self._get_ranges(src, dst, *resume, on_bytes=on_bytes)
+        if self._is_get_worth_compressing(src, recursive):
+            if self._get_compressed(src, dst, recursive, on_bytes):
+                return
+        if self._is_above_threshold(src, self._get_remote_size, "chunked_threshold"):
+            return self._get_ranges(src, dst, on_bytes=on_bytes)
+        with self._file_transport() as file_transport:
+            return file_transport.get(
+                src, dst,
+                recursive=recursive,
+                on_bytes=on_bytes
+            )
 
-    def exec_command(self, command):
-        ret = self.ssh_client.exec_command(command)
-        stdout = ret[1].readlines()
-        stderr = ret[2].readlines()
-        return not len(stderr) > 0
+    def exec_command(self, command, retry=False):
+        status, _ = self.exec_command_output(command, retry=retry)
+        return status
+
+    def exec_command_output(self, command, retry=False):
+        if self.control_client is not None:
+            return tuple(self.control_client.call(
+                "exec_command_output", command,
+                retry=retry
+            ))
+        return self._call_with_retry(
+            "command '{}'".format(command), retry,
+            self._run_command, command
+        )
 
     def check_is_open(self):
-        return self.ssh_client is not None
+        return self.ssh_client is not None or self.control_client is not None
+
+    def check_is_alive(self):
+        if self.ssh_client is None:
+            return False
+        transport = self.ssh_client.get_transport()
+        if transport is None or not transport.is_active():
+            return False
+        try:
+            transport.send_ignore()
+        except Exception:
+            return False
+        return True
+
+    # -- Private -------------------------------------------------------------
+
+    def _call_with_retry(self, operation, retry, func, *args):
+        # when the connection drops during func, the connection is opened
+        # again and:
+        #  - retry: func is idempotent, called again up to retry_attempts
+        #    times with an exponential backoff.
+        #  - not retry: func may or may not have been done on origin,
+        #    SSH_OperationInterrupted_E is raised and the caller decides.
+        attempts = self.transfer_config.get("retry_attempts", 3) if retry else 0
+        attempt = 0
+        error = None
+        while True:
+            if error is None:
+                try:
+                    return func(*args)
+                except (OSError, EOFError, paramiko.SSHException) as e:
+                    if self.check_is_alive():
+                        # not a connection problem (missing file...).
+                        raise
+                    log.debug("connection lost during {}: {}".format(operation, e))
+                    error = e
+            if attempt >= attempts:
+                if not retry:
+                    self._try_reconnect()
+                    raise SSH_OperationInterrupted_E(self.ssh_link, operation)
+                raise SSH_ConnectionError_E(self.ssh_link, error)
+            time.sleep(min(
+                self.transfer_config.get("retry_backoff", 1) * 2 ** attempt,
+                self.transfer_config.get("retry_max_backoff", 30)
+            ))
+            attempt += 1
+            error = self._try_reconnect()
+
+    def _try_reconnect(self):
+        # returns the error if the connection could not be opened again.
+        try:
+            self.reconnect()
+        except SSH_ConnectionError_E as e:
+            log.debug(str(e))
+            return e
+        return None
+
+    def _configure_keepalive(self):
+        transport = self.ssh_client.get_transport()
+        if transport is not None:
+            transport.set_keepalive(
+                self.transfer_config.get("keepalive_interval", 0)
+            )
+
+    @contextlib.contextmanager
+    def _file_transport(self):
+        # a file transport of the pool, or a new one when all are in use.
+        with self.file_transport_lock:
+            if self.idle_file_transports:
+                file_transport = self.idle_file_transports.pop()
+            else:
+                transport_name = self.transfer_config.get("transport", "scp")
+                file_transport = TRANSPORTS[transport_name](
+                    self.ssh_client.get_transport(),
+                    **self.transfer_config
+                )
+        try:
+            yield file_transport
+        except BaseException:
+            file_transport.close()
+            raise
+        with self.file_transport_lock:
+            self.idle_file_transports.append(file_transport)
+
+    def _close_file_transports(self):
+        with self.file_transport_lock:
+            file_transports = self.idle_file_transports
+            self.idle_file_transports = []
+        for file_transport in file_transports:
+            try:
+                file_transport.close()
+            except Exception:
+                pass
+
+    # bandwidth caps: per origin, global and for background transfers.
+    # on_bytes callbacks given to transfers consume the buckets and sleep
+    # when over the budget.
+
+    def _configure_bandwidth(self):
+        transfer_scheduler.configure_bandwidth_bucket(
+            self.ssh_link,
+            self.transfer_config.get("bandwidth_limit", 0)
+        )
+        transfer_scheduler.configure_bandwidth_bucket(
+            "global",
+            self.transfer_config.get("global_bandwidth_limit", 0)
+        )
+        transfer_scheduler.configure_bandwidth_bucket(
+            "background",
+            self.transfer_config.get("background_bandwidth_limit", 0)
+        )
+
+    def _get_bytes_callback(self, priority, on_bytes=None):
+        # callback given to transfers: bandwidth caps and caller's on_bytes.
+        callbacks = [
+            callback for callback in (
+                self._get_bandwidth_callback(priority),
+                on_bytes
+            )
+            if callback is not None
+        ]
+        if not callbacks:
+            return None
+        if len(callbacks) == 1:
+            return callbacks[0]
+
+        def chained(size):
+            for callback in callbacks:
+                callback(size)
+        return chained
+
+    def _get_bandwidth_callback(self, priority):
+        bucket_keys = [self.ssh_link, "global"]
+        if priority == transfer_scheduler.PRIORITY_BACKGROUND:
+            bucket_keys.append("background")
+        buckets = [
+            transfer_scheduler.get_bandwidth_bucket(key)
+            for key in bucket_keys
+        ]
+        buckets = [bucket for bucket in buckets if bucket.rate]
+        if not buckets:
+            return None
+
+        def on_bytes(size):
+            for bucket in buckets:
+                bucket.consume(size)
+        return on_bytes
+
+    # compressed transfers: data goes through gzip on an exec channel,
+    # recursive gets through a tar stream. Any failure (no gzip on origin,
+    # missing file...) falls back to the regular transfer.
+
+    def _is_get_worth_compressing(self, src, recursive):
+        if recursive:
+            # directories of metadata: no extension to decide from.
+            return self.transfer_config.get("compression", "never") != "never"
+        return compression.is_worth_compressing(
+            src, self._read_remote_sample, self.transfer_config
+        )
+
+    def _read_remote_sample(self, path, size):
+        sftp_client = self._get_chunked_sftp_clients(1)[0]
+        with sftp_client.open(path, "rb") as f:
+            return f.read(size)
+
+    def _open_exec_channel(self, command):
+        channel = self.ssh_client.get_transport().open_session()
+        channel.exec_command(command)
+        return channel
+
+    def _put_compressed(self, src, dst, on_bytes=None, hash_src=False):
+        # returns sha256 of src if hash_src, else True, or False on failure.
+        channel = self._open_exec_channel(
+            "gzip -dc > {}".format(shlex.quote(dst))
+        )
+        try:
+            with open(src, "rb") as f_src:
+                if hash_src:
+                    f_src = py_helpers.HashingReader(f_src)
+                compression.send_compressed(
+                    channel, f_src,
+                    self.transfer_config.get("compression_level", 3),
+                    self.transfer_config.get("sftp_buffer_size", 1048576),
+                    on_bytes
+                )
+            status = channel.recv_exit_status() == 0
+            if status and hash_src:
+                status = f_src.hexdigest()
+        except (OSError, EOFError, paramiko.SSHException) as e:
+            log.debug("compressed upload of {} failed: {}".format(src, e))
+            status = False
+        finally:
+            channel.close()
+        return status
+
+    def _get_compressed(self, src, dst, recursive, on_bytes=None):
+        # first byte sent tells if src is a directory (tar) or a file (gzip).
+        channel = self._open_exec_channel(
+            "if [ -d {0} ]; then printf d; tar czf - -C {0} .; "
+            "else printf f; gzip -{1} -c {0}; fi".format(
+                shlex.quote(src),
+                self.transfer_config.get("compression_level", 3)
+            )
+        )
+        partial = "{}.vitz".format(dst)
+        try:
+            kind = channel.recv(1)
+            if kind == b"d" and recursive:
+                if not os.path.exists(dst):
+                    os.makedirs(dst)
+                compression.recv_tar(channel, dst, on_bytes)
+            elif kind == b"f":
+                with open(partial, "wb") as f_dst:
+                    compression.recv_decompressed(
+                        channel, f_dst,
+                        self.transfer_config.get("sftp_buffer_size", 1048576),
+                        on_bytes
+                    )
+            status = kind in (b"d", b"f") and channel.recv_exit_status() == 0
+        except (OSError, EOFError, zlib.error, tarfile.TarError,
+                paramiko.SSHException) as e:
+            log.debug("compressed download of {} failed: {}".format(src, e))
+            status = False
+        finally:
+            channel.close()
+        if os.path.exists(partial):
+            if status:
+                os.replace(partial, dst)
+            else:
+                os.remove(partial)
+        return status
+
+    # large files are split in byte ranges sent over several sftp channels
+    # (whatever the configured transport), then checked by sha256. Ranges
+    # written are recorded in a checkpoint file when the transfer is
+    # resumable, a retry only sends the missing ones.
+
+    def _is_above_threshold(self, path, get_size, threshold_key):
+        threshold = self.transfer_config.get(threshold_key)
+        if not threshold:
+            return False
+        try:
+            return get_size(path) >= threshold
+        except (OSError, IOError):
+            return False
+
+    def _get_remote_size(self, path):
+        sftp_client = self._get_chunked_sftp_clients(1)[0]
+        attributes = sftp_client.stat(path)
+        if stat.S_ISDIR(attributes.st_mode):
+            return 0
+        return attributes.st_size
+
+    def _put_ranges(
+            self, src, dst,
+            partial=None, checkpoint_path=None,
+            on_bytes=None):
+        size = os.path.getsize(src)
+        target = partial or dst
+        sftp_clients = self._get_chunked_sftp_clients()
+
+        def open_dst(idx):
+            f_dst = sftp_clients[idx].open(target, "r+b")
+            f_dst.set_pipelined(True)
+            return f_dst
+
+        def create_target():
+            if partial:
+                _sftp_makedirs(sftp_clients[0], os.path.dirname(partial))
+            with sftp_clients[0].open(target, "wb") as f_dst:
+                f_dst.truncate(size)
+
+        self._transfer_ranges(
+            lambda idx: open(src, "rb"), open_dst,
+            src, dst, size, os.path.getmtime(src),
+            lambda: _check_exists(sftp_clients[0].stat, target),
+            create_target, checkpoint_path, on_bytes
+        )
+        sha256 = self._verify_transfer(src, target, dst, checkpoint_path)
+        if partial:
+            sftp_clients[0].rename(partial, dst)
+        return sha256
+
+    def _get_ranges(
+            self, src, dst,
+            partial=None, checkpoint_path=None,
+            on_bytes=None):
+        sftp_clients = self._get_chunked_sftp_clients()
+        attributes = sftp_clients[0].stat(src)
+        size = attributes.st_size
+        target = partial or dst
+
+        def create_target():
+            with open(target, "wb") as f_dst:
+                f_dst.truncate(size)
+
+        self._transfer_ranges(
+            lambda idx: sftp_clients[idx].open(src, "rb"),
+            lambda idx: open(target, "r+b"),
+            src, dst, size, attributes.st_mtime,
+            lambda: os.path.exists(target),
+            create_target, checkpoint_path, on_bytes
+        )
+        self._verify_transfer(target, src, src, checkpoint_path)
+        if partial:
+            os.replace(partial, dst)
+
+    def _transfer_ranges(
+            self, open_src, open_dst,
+            src, dst, size, mtime,
+            check_target_exists, create_target,
+            checkpoint_path=None, on_bytes=None):
+        chunked_transfer = self._get_chunked_transfer(open_src, open_dst)
+        chunked_transfer.on_bytes = on_bytes
+        if size < self.transfer_config.get("chunked_threshold", size + 1):
+            chunked_transfer.streams = 1
+        if checkpoint_path is None:
+            create_target()
+            return chunked_transfer.run(size)
+
+        done_offsets = set()
+        if os.path.exists(checkpoint_path) and check_target_exists():
+            with TransferCheckpoint(checkpoint_path) as checkpoint:
+                if checkpoint.check_matches(
+                        src, dst, size, mtime,
+                        chunked_transfer.chunk_size):
+                    done_offsets = checkpoint.get_done_offsets()
+        if done_offsets:
+            log.info("resuming transfer of {}.".format(src))
+        else:
+            checkpoint_dir = os.path.dirname(checkpoint_path)
+            if not os.path.exists(checkpoint_dir):
+                os.makedirs(checkpoint_dir)
+            TransferCheckpoint.create_file(
+                checkpoint_path, src, dst, size, mtime,
+                chunked_transfer.chunk_size
+            )
+            create_target()
+
+        def on_range_done(offset):
+            with TransferCheckpoint(checkpoint_path) as checkpoint:
+                checkpoint.add_done_offset(offset)
+
+        chunked_transfer.run(size, done_offsets, on_range_done)
+
+    def _get_chunked_transfer(self, open_src, open_dst):
+        return ChunkedTransfer(
+            open_src, open_dst,
+            streams=self.transfer_config.get("chunked_streams", 4),
+            chunk_size=self.transfer_config.get("chunked_chunk_size", 16777216),
+            buffer_size=self.transfer_config.get("sftp_buffer_size", 1048576)
+        )
+
+    def _get_chunked_sftp_clients(self, number=None):
+        # first stream uses the connection itself, each other one its own
+        # tcp connection: streams don't share a congestion window nor a
+        # cipher, which is what makes them faster on high latency links.
+        if number is None:
+            number = self.transfer_config.get("chunked_streams", 4)
+        with self.chunked_sftp_clients_lock:
+            while len(self.chunked_sftp_clients) < number:
+                transport = self.ssh_client.get_transport()
+                if self.chunked_sftp_clients:
+                    transport = self._open_stream_transport() or transport
+                self.chunked_sftp_clients.append(
+                    paramiko.SFTPClient.from_transport(
+                        transport,
+                        window_size=self.transfer_config.get("sftp_window_size"),
+                        max_packet_size=self.transfer_config.get("sftp_max_packet_size")
+                    )
+                )
+            return list(self.chunked_sftp_clients)
+
+    def _open_stream_transport(self):
+        # None when origin refuses more connections: the stream is then
+        # a channel of the main connection.
+        ssh_client = paramiko.SSHClient()
+        ssh_client.load_system_host_keys()
+        try:
+            ssh_client.connect(self.server, self.port, self.user, self.password)
+        except Exception as e:
+            log.debug("could not open stream connection: {}".format(e))
+            ssh_client.close()
+            return None
+        self.stream_ssh_clients.append(ssh_client)
+        return ssh_client.get_transport()
+
+    def _close_chunked_sftp_clients(self):
+        for sftp_client in self.chunked_sftp_clients:
+            sftp_client.close()
+        self.chunked_sftp_clients = []
+        for ssh_client in self.stream_ssh_clients:
+            ssh_client.close()
+        self.stream_ssh_clients = []
+
+    def _verify_transfer(
+            self, local_path, remote_path,
+            transferred_path, checkpoint_path=None):
+        # returns sha256 of the local file, None if not verified.
+        status, lines = self._run_command(
+            "sha256sum {0} || shasum -a 256 {0}".format(shlex.quote(remote_path))
+        )
+        if checkpoint_path is not None and os.path.exists(checkpoint_path):
+            # once checked, the partial file is either complete or corrupted:
+            # in both case the checkpoint is useless.
+            os.remove(checkpoint_path)
+        if not status or not lines:
+            log.debug("could not hash {} on origin, transfer not verified.".format(
+                remote_path
+            ))
+            return None
+        sha256 = py_helpers.calculate_file_sha(local_path)
+        if lines[0].split()[0] != sha256:
+            raise SSH_TransferVerificationError_E(self.ssh_link, transferred_path)
+        return sha256
+
+    def _run_command(self, command):
+        # shell busy with another command of a concurrent call: this one
+        # gets its own channel instead of waiting.
+        if self.remote_shell_lock.acquire(blocking=False):
+            try:
+                if self.remote_shell is None:
+                    self.remote_shell = RemoteShell(
+                        self.ssh_client.get_transport()
+                    )
+                exit_code, lines = self.remote_shell.run(command)
+            except (EOFError, paramiko.SSHException) as e:
+                log.debug("remote shell unavailable: {}".format(e))
+                self._close_remote_shell()
+            else:
+                return exit_code == 0, lines
+            finally:
+                self.remote_shell_lock.release()
+        # fallback: one channel per command.
+        _, stdout, _ = self.ssh_client.exec_command(command)
+        lines = stdout.read().decode().splitlines()
+        return stdout.channel.recv_exit_status() == 0, lines
+
+    def _close_remote_shell(self):
+        if self.remote_shell is not None:
+            self.remote_shell.close()
+            self.remote_shell = None
+
+
+def _abspath_resume(resume, checkpoint_only=False):
+    if not resume:
+        return resume
+    partial, checkpoint_path = resume
+    if not checkpoint_only:
+        partial = os.path.abspath(partial)
+    return partial, os.path.abspath(checkpoint_path)
+
+
+def _scp_progress(on_bytes):
+    # scp gives the position in the current file, on_bytes wants deltas.
+    positions = {}
+
+    def progress(file_name, size, sent):
+        on_bytes(sent - positions.get(file_name, 0))
+        positions[file_name] = sent
+    return progress
+
+
+def _sftp_makedirs(sftp_client, path):
+    if _check_exists(sftp_client.stat, path):
+        return
+    _sftp_makedirs(sftp_client, os.path.dirname(path))
+    sftp_client.mkdir(path)
+
+
+def _check_exists(stat_func, path):
+    try:
+        stat_func(path)
+    except IOError:
+        return False
+    return True
+
+
+class SCPTransport(object):
+
+    def __init__(self, transport, **transfer_config):
+        self.transport = transport
+        self.scp_client = SCPClient(transport)
+
+    def put(self, src, dst, recursive=False, on_bytes=None, hash_src=False):
+        # returns sha256 of src if hash_src.
+        if on_bytes is None and not hash_src:
+            return self.scp_client.put(src, dst, recursive=recursive)
+        progress = _scp_progress(on_bytes) if on_bytes is not None else None
+        with SCPClient(self.transport, progress=progress) as scp_client:
+            if not hash_src:
+                return scp_client.put(src, dst, recursive=recursive)
+            with open(src, "rb") as f_src:
+                f_src = py_helpers.HashingReader(f_src)
+                scp_client.putfo(
+                    f_src, dst,
+                    mode="0{:o}".format(stat.S_IMODE(os.stat(src).st_mode)),
+                    size=os.path.getsize(src)
+                )
+            return f_src.hexdigest()
+
+    def get(self, src, dst, recursive=False, on_bytes=None):
+        if on_bytes is None:
+            return self.scp_client.get(src, dst, recursive=recursive)
+        with SCPClient(self.transport, progress=_scp_progress(on_bytes)) as scp_client:
+            return scp_client.get(src, dst, recursive=recursive)
+
+    def close(self):
+        self.scp_client.close()
+
+
+class SFTPTransport(object):
+
+    # sftp backend: writes are pipelined (no wait for each ack) and reads
+    # are prefetched with several requests in flight, window and buffer
+    # sizes are tunable from the repository config.
+
+    def __init__(
+            self, transport,
+            sftp_window_size=None,
+            sftp_max_packet_size=None,
+            sftp_buffer_size=1048576,
+            sftp_prefetch_requests=None,
+            **transfer_config):
+        self.buffer_size = sftp_buffer_size
+        self.prefetch_requests = sftp_prefetch_requests
+        self.sftp_client = paramiko.SFTPClient.from_transport(
+            transport,
+            window_size=sftp_window_size,
+            max_packet_size=sftp_max_packet_size
+        )
+
+    def put(self, src, dst, recursive=False, on_bytes=None, hash_src=False):
+        # returns sha256 of src if hash_src.
+        if not os.path.isdir(src):
+            return self._put_file(src, dst, on_bytes, hash_src)
+        for dir_path, _, file_names in os.walk(src):
+            dst_dir = os.path.join(dst, os.path.relpath(dir_path, src))
+            self._mkdir_if_not_exists(os.path.normpath(dst_dir))
+            for file_name in file_names:
+                self._put_file(
+                    os.path.join(dir_path, file_name),
+                    os.path.join(dst_dir, file_name),
+                    on_bytes
+                )
+
+    def get(self, src, dst, recursive=False, on_bytes=None):
+        if not stat.S_ISDIR(self.sftp_client.stat(src).st_mode):
+            return self._get_file(src, dst, on_bytes)
+        if not os.path.exists(dst):
+            os.makedirs(dst)
+        for entry in self.sftp_client.listdir_attr(src):
+            self.get(
+                os.path.join(src, entry.filename),
+                os.path.join(dst, entry.filename),
+                recursive=recursive,
+                on_bytes=on_bytes
+            )
+
+    def close(self):
+        self.sftp_client.close()
+
+    def _put_file(self, src, dst, on_bytes=None, hash_src=False):
+        with open(src, "rb") as f_src:
+            if hash_src:
+                f_src = py_helpers.HashingReader(f_src)
+            with self.sftp_client.open(dst, "wb", self.buffer_size) as f_dst:
+                f_dst.set_pipelined(True)
+                while True:
+                    chunk = f_src.read(self.buffer_size)
+                    if not chunk:
+                        break
+                    f_dst.write(chunk)
+                    if on_bytes is not None:
+                        on_bytes(len(chunk))
+        return f_src.hexdigest() if hash_src else None
+
+    def _get_file(self, src, dst, on_bytes=None):
+        with self.sftp_client.open(src, "rb", self.buffer_size) as f_src:
+            f_src.prefetch(
+                f_src.stat().st_size,
+                max_concurrent_requests=self.prefetch_requests
+            )
+            with open(dst, "wb") as f_dst:
+                while True:
+                    chunk = f_src.read(self.buffer_size)
+                    if not chunk:
+                        break
+                    f_dst.write(chunk)
+                    if on_bytes is not None:
+                        on_bytes(len(chunk))
+
+    def _mkdir_if_not_exists(self, path):
+        try:
+            self.sftp_client.stat(path)
+        except IOError:
+            self.sftp_client.mkdir(path)
+
+
+TRANSPORTS = {
+    "scp": SCPTransport,
+    "sftp": SFTPTransport,
+}
+
+
+class RemoteShell(object):
+
+    # Long lived 'sh' channel on origin: each command is written to the
+    # shell followed by a marker line carrying its exit code, so running a
+    # command costs one write and one read instead of a channel open.
+
+    read_size = 32768
+    poll_timeout = 0.1
+
+    def __init__(self, transport):
+        self.marker = "__vit_{}__".format(uuid.uuid4().hex).encode()
+        self.buffer = bytearray()
+        self.stderr = b""
+        self.channel = transport.open_session()
+        self.channel.exec_command("/bin/sh")
+        self.channel.settimeout(self.poll_timeout)
+
+    def run(self, command):
+        framed_command = "( {}\n) < /dev/null\nprintf '\\n{} %d\\n' $?\n".format(
+            command,
+            self.marker.decode()
+        )
+        self.channel.sendall(framed_command.encode())
+        frame_end = b"\n" + self.marker + b" "
+        search_from = 0
+        while True:
+            self._drain_stderr()
+            idx = self.buffer.find(frame_end, search_from)
+            if idx != -1:
+                end_of_line = self.buffer.find(b"\n", idx + len(frame_end))
+                if end_of_line != -1:
+                    break
+            else:
+                search_from = max(0, len(self.buffer) - len(frame_end))
+            try:
+                data = self.channel.recv(self.read_size)
+            except socket.timeout:
+                continue
+            if not data:
+                raise EOFError("remote shell closed.")
+            self.buffer += data
+        output = bytes(self.buffer[:idx])
+        exit_code = int(self.buffer[idx + len(frame_end):end_of_line])
+        del self.buffer[:end_of_line + 1]
+        if self.stderr:
+            log.debug("origin: {}".format(self.stderr.decode(errors="replace")))
+            self.stderr = b""
+        return exit_code, output.decode().splitlines()
+
+    def close(self):
+        try:
+            self.channel.close()
+        except Exception:
+            pass
+
+    def _drain_stderr(self):
+        while self.channel.recv_stderr_ready():
+            self.stderr += self.channel.recv_stderr(self.read_size)
@@ -0,0 +1,413 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import socket
+import threading
+import subprocess
+import socketserver
+from getpass import getpass
+
+from vit import custom_exceptions
+from vit.custom_exceptions import (
+    VitCustomException, SSH_ConnectionError_E, SSH_ControlError_E
+)
+
+import logging
+log = logging.getLogger()
+
+# Per user control daemon holding warm ssh sessions, one per origin.
+# Each vit process attaches to it through a unix socket and forwards its
+# ssh operations instead of doing its own handshake / authentication.
+
+IDLE_TIMEOUT = 600
+HEALTH_CHECK_INTERVAL = 30
+SPAWN_TIMEOUT = 5
+
+
+def is_available():
+    if not hasattr(socket, "AF_UNIX"):
+        return False
+    return os.environ.get("VIT_SSH_CONTROL", "1") != "0"
+
+
+def get_runtime_dir():
+    # per user directory of files shared by vit processes.
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if not runtime_dir:
+        runtime_dir = os.path.join(os.path.expanduser("~"), ".vit_control")
+    return runtime_dir
+
+
+def get_socket_path():
+    return os.path.join(get_runtime_dir(), "vit-ssh-control.sock")
+
+
+def attach(server, port, user, socket_path=None, transfer_config=None):
+    # transfer_config: of the session to attach to, see SSHControlDaemon.
+    socket_path = socket_path or get_socket_path()
+    try:
+        client = SSHControlClient(
+            socket_path, server, port, user, transfer_config
+        )
+    except OSError:
+        if not _spawn_daemon(socket_path):
+            return None
+        try:
+            client = SSHControlClient(
+                socket_path, server, port, user, transfer_config
+            )
+        except OSError as e:
+            log.debug("could not attach to ssh control daemon: {}".format(e))
+            return None
+    if not client.call("status"):
+        password = getpass("{}'s password: ".format(user))
+        try:
+            client.call("open", password)
+        except SSH_ControlError_E as e:
+            client.close()
+            raise SSH_ConnectionError_E(client.ssh_link, e.error)
+    return client
+
+
+class SSHControlClient(object):
+
+    def __init__(self, socket_path, server, port, user, transfer_config=None):
+        self.server = server
+        self.port = port
+        self.user = user
+        self.transfer_config = transfer_config or {}
+        self.ssh_link = "{}@{}".format(user, server)
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self.socket.connect(socket_path)
+        except OSError:
+            self.socket.close()
+            raise
+        self.stream = self.socket.makefile("rwb")
+        self.lock = threading.Lock()
+
+    def call(self, method, *args, on_bytes=None, **kargs):
+        # on_bytes: for transfers, called with the byte counts the daemon
+        # sends back before its response.
+        request = {
+            "server": self.server,
+            "port": self.port,
+            "user": self.user,
+            "transfer_config": self.transfer_config,
+            "method": method,
+            "args": args,
+            "kargs": kargs,
+            "progress": on_bytes is not None
+        }
+        try:
+            with self.lock:
+                self.stream.write(json.dumps(request).encode() + b"\n")
+                self.stream.flush()
+                response = self._read_response(on_bytes)
+        except OSError as e:
+            raise SSH_ControlError_E(self.ssh_link, e)
+        if response["status"] != "ok":
+            raise _get_exception(self.ssh_link, response)
+        return response["result"]
+
+    def _read_response(self, on_bytes):
+        while True:
+            response = self.stream.readline()
+            if not response:
+                raise SSH_ControlError_E(self.ssh_link, "daemon closed connection")
+            response = json.loads(response)
+            if response["status"] != "progress":
+                return response
+            on_bytes(response["bytes"])
+
+    def close(self):
+        self.stream.close()
+        self.socket.close()
+
+
+class SSHControlDaemon(object):
+
+    def __init__(
+            self, socket_path,
+            connection_type,
+            idle_timeout=IDLE_TIMEOUT,
+            health_check_interval=HEALTH_CHECK_INTERVAL):
+        self.socket_path = socket_path
+        self.connection_type = connection_type
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.sessions = {}
+        self.sessions_lock = threading.Lock()
+        self.last_activity = time.time()
+        self.server = None
+
+    def serve_forever(self):
+        socket_dir = os.path.dirname(self.socket_path)
+        if not os.path.exists(socket_dir):
+            os.makedirs(socket_dir, mode=0o700)
+        if os.path.exists(self.socket_path):
+            if _is_socket_served(self.socket_path):
+                log.debug("ssh control daemon already running")
+                return
+            os.remove(self.socket_path)
+        daemon = self
+
+        class _Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                # chunked transfers report progress from several threads.
+                write_lock = threading.Lock()
+
+                def send(response):
+                    with write_lock:
+                        self.wfile.write(json.dumps(response).encode() + b"\n")
+                        self.wfile.flush()
+
+                def on_bytes(size):
+                    send({"status": "progress", "bytes": size})
+
+                for line in self.rfile:
+                    send(daemon.handle_request(json.loads(line), on_bytes))
+
+        self.server = socketserver.ThreadingUnixStreamServer(
+            self.socket_path, _Handler
+        )
+        self.server.daemon_threads = True
+        os.chmod(self.socket_path, 0o600)
+        reaper = threading.Thread(target=self._reaper_loop, daemon=True)
+        reaper.start()
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+            self.close_all_sessions()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+
+    def shutdown(self):
+        if self.server is not None:
+            self.server.shutdown()
+
+    def handle_request(self, request, on_bytes=None):
+        # on_bytes: sends transferred byte counts back to the client, for
+        # transfers it asked progress of.
+        self.last_activity = time.time()
+        key = _get_session_key(request)
+        method = request["method"]
+        try:
+            if method == "status":
+                result = self._get_live_session(key) is not None
+            elif method == "open":
+                self._open_session(key, request, *request["args"])
+                result = True
+            else:
+                kargs = request["kargs"]
+                if request.get("progress") and method in ("put", "get"):
+                    kargs = dict(kargs, on_bytes=on_bytes)
+                result = self._call_session(
+                    key, method,
+                    request["args"],
+                    kargs
+                )
+        except Exception as e:
+            return _format_error(e)
+        return {"status": "ok", "result": result}
+
+    def reap_sessions(self):
+        with self.sessions_lock:
+            for key, session in list(self.sessions.items()):
+                idle = session.check_is_idle(self.idle_timeout)
+                if idle or not session.check_is_alive():
+                    self.sessions.pop(key)
+                    session.close()
+            is_empty = not self.sessions
+        return is_empty
+
+    def close_all_sessions(self):
+        with self.sessions_lock:
+            for session in self.sessions.values():
+                session.close()
+            self.sessions = {}
+
+    # -- Private -------------------------------------------------------------
+
+    def _reaper_loop(self):
+        while True:
+            time.sleep(self.health_check_interval)
+            is_empty = self.reap_sessions()
+            if is_empty and time.time() - self.last_activity > self.idle_timeout:
+                self.shutdown()
+                return
+
+    def _get_live_session(self, key):
+        with self.sessions_lock:
+            session = self.sessions.get(key, None)
+            if session is not None and not session.check_is_alive():
+                self.sessions.pop(key)
+                session.close()
+                session = None
+        return session
+
+    def _open_session(self, key, request, password):
+        session = self._get_live_session(key)
+        if session is not None:
+            return
+        connection = self.connection_type(request["server"], request["user"])
+        connection.port = request["port"]
+        connection.use_control_daemon = False
+        connection.configure_transfer(**request.get("transfer_config", {}))
+        connection.open_connection(password)
+        with self.sessions_lock:
+            self.sessions[key] = _Session(connection)
+
+    def _call_session(self, key, method, args, kargs):
+        session = self._get_live_session(key)
+        if session is None:
+            raise EnvironmentError("no open session for {}".format(key))
+        if method not in session.connection.control_methods:
+            raise ValueError("method not allowed: {}".format(method))
+        return session.call(method, args, kargs)
+
+
+class _Session(object):
+
+    # calls of all clients run at once on the ssh connection of the
+    # session, which only locks channel creation: a long transfer does not
+    # hold back commands and other transfers.
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.lock = threading.Lock()
+        self.last_used = time.time()
+        self.running_calls = 0
+
+    def call(self, method, args, kargs):
+        with self.lock:
+            self.last_used = time.time()
+            self.running_calls += 1
+        try:
+            return getattr(self.connection, method)(*args, **kargs)
+        finally:
+            with self.lock:
+                self.last_used = time.time()
+                self.running_calls -= 1
+
+    def check_is_idle(self, idle_timeout):
+        with self.lock:
+            if self.running_calls:
+                return False
+            return time.time() - self.last_used > idle_timeout
+
+    def check_is_alive(self):
+        check = getattr(self.connection, "check_is_alive", None)
+        if check is None:
+            return self.connection.check_is_open()
+        return check()
+
+    def close(self):
+        try:
+            self.connection.close_connection()
+        except Exception as e:
+            log.debug("error closing ssh session: {}".format(e))
+
+
+# -- Private -----------------------------------------------------------------
+
+def _get_session_key(request):
+    # one session per origin and transfer config: processes with different
+    # settings (transport, thresholds, retries...) do not share a session.
+    key = "{}@{}:{}".format(
+        request["user"],
+        request["server"],
+        request["port"]
+    )
+    transfer_config = request.get("transfer_config")
+    if transfer_config:
+        key += "#" + hashlib.sha1(
+            json.dumps(transfer_config, sort_keys=True).encode()
+        ).hexdigest()
+    return key
+
+def _format_error(exception):
+    # vit exceptions are raised again by the client with the same type
+    # and arguments (see _get_exception), callers handling them as if the
+    # session was their own.
+    error = {"status": "error", "error": str(exception)}
+    if isinstance(exception, VitCustomException):
+        error["exception"] = type(exception).__name__
+        error["args"] = [
+            arg if isinstance(arg, (str, int, float, bool, type(None)))
+            else str(arg)
+            for arg in exception.args
+        ]
+    return error
+
+def _get_exception(ssh_link, response):
+    exception_type = getattr(
+        custom_exceptions, response.get("exception", ""), None
+    )
+    if isinstance(exception_type, type) and \
+            issubclass(exception_type, VitCustomException):
+        try:
+            return exception_type(*response["args"])
+        except TypeError:
+            pass
+    return SSH_ControlError_E(ssh_link, response["error"])
+
+def _is_socket_served(socket_path):
+    s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        s.connect(socket_path)
+    except OSError:
+        return False
+    else:
+        return True
+    finally:
+        s.close()
+
+
+def _spawn_daemon(socket_path):
+    # socket left by a daemon which did not exit cleanly: nothing listens.
+    if os.path.exists(socket_path) and not _is_socket_served(socket_path):
+        log.debug("removing stale ssh control socket {}".format(socket_path))
+        try:
+            os.remove(socket_path)
+        except OSError as e:
+            log.debug("could not remove stale socket: {}".format(e))
+            return False
+    env = dict(os.environ)
+    package_root = os.path.dirname(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    )
+    env["PYTHONPATH"] = os.pathsep.join(
+        p for p in (package_root, env.get("PYTHONPATH")) if p
+    )
+    try:
+        subprocess.Popen(
+            [sys.executable, "-m", "vit.connection.ssh_control", socket_path],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+            env=env
+        )
+    except OSError as e:
+        log.debug("could not spawn ssh control daemon: {}".format(e))
+        return False
+    deadline = time.time() + SPAWN_TIMEOUT
+    while time.time() < deadline:
+        if _is_socket_served(socket_path):
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def main():
+    from vit.connection.ssh_connection import SSHConnection
+    socket_path = sys.argv[1] if len(sys.argv) > 1 else get_socket_path()
+    SSHControlDaemon(socket_path, SSHConnection).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import time
+import threading
+
+import logging
+log = logging.getLogger()
+
+# Progress of a data transfer with origin, given to the observers
+# registered on the VitConnection (see VitConnection.add_progress_observer).
+# An observer is a callable taking the TransferProgress, called each time
+# data is transferred and once more when the transfer is over.
+#
+# bytes_done counts bytes as sent on the wire: a compressed or delta
+# transfer ends below total, bytes_done is set to total once it succeeded.
+# total is None when the size is not known before the transfer.
+
+
+class TransferProgress(object):
+
+    def __init__(self, direction, src, dst, total, observers):
+        self.direction = direction
+        self.src = src
+        self.dst = dst
+        self.total = total
+        self.observers = list(observers)
+        self.bytes_done = 0
+        self.start_time = time.monotonic()
+        self.end_time = None
+        self.finished = False
+        self.success = False
+        # chunked transfers report from several threads.
+        self.lock = threading.Lock()
+
+    @property
+    def elapsed(self):
+        end_time = self.end_time if self.end_time is not None else time.monotonic()
+        return end_time - self.start_time
+
+    @property
+    def throughput(self):
+        # bytes per second.
+        elapsed = self.elapsed
+        if not elapsed:
+            return 0
+        return self.bytes_done / elapsed
+
+    @property
+    def ratio(self):
+        if not self.total:
+            return None
+        return min(1, self.bytes_done / self.total)
+
+    def update(self, size):
+        with self.lock:
+            self.bytes_done += size
+            self._notify()
+
+    def finish(self, success=True):
+        with self.lock:
+            self.end_time = time.monotonic()
+            self.finished = True
+            self.success = success
+            if success and self.total is not None:
+                self.bytes_done = self.total
+            self._notify()
+
+    def _notify(self):
+        for observer in self.observers:
+            observer(self)
+
+
+def log_transfer_progress(progress):
+    # observer logging a summary of each transfer, for pipeline tools.
+    if not progress.finished:
+        return
+    log.info("{} {} -> {}: {} in {:.2f}s ({}/s){}".format(
+        progress.direction, progress.src, progress.dst,
+        format_size(progress.bytes_done),
+        progress.elapsed,
+        format_size(progress.throughput),
+        "" if progress.success else " FAILED"
+    ))
+
+
+def format_size(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            return "{:.1f}{}".format(size, unit)
+        size /= 1024
+    return "{:.1f}TB".format(size)
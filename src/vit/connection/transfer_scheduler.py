@@ -0,0 +1,264 @@
+import os
+import re
+import json
+import time
+import heapq
+import itertools
+import threading
+import contextlib
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from vit.connection import ssh_control
+
+# Arbitration of transfers with origin:
+#  - a queue with a limited number of transfers running at once, where
+#    interactive transfers (commit, checkout) go before background ones
+#    (fetch, prefetch).
+#  - bandwidth caps as token buckets: per origin and global.
+# Both are shared by all vit processes of the user through files locked in
+# the runtime directory (see ssh_control): a transfer holds the lock of one
+# of the slot files, interactive transfers waiting for a slot hold a shared
+# lock that background transfers wait on, buckets state is a locked file.
+# Without fcntl (Windows), arbitration is process wide.
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_BACKGROUND: "background",
+}
+
+MAX_TRANSFERS = 4
+SLOT_POLL_INTERVAL = 0.05
+
+_current_priority = threading.local()
+
+
+def get_current_priority():
+    return getattr(_current_priority, "value", PRIORITY_INTERACTIVE)
+
+
+@contextlib.contextmanager
+def transfer_priority(priority):
+    # transfers done by this thread within the context use given priority.
+    previous = get_current_priority()
+    _current_priority.value = priority
+    try:
+        yield
+    finally:
+        _current_priority.value = previous
+
+
+def get_lock_dir():
+    if fcntl is None:
+        return None
+    return ssh_control.get_runtime_dir()
+
+
+def _get_lock_file_path(lock_dir, name):
+    if not os.path.exists(lock_dir):
+        os.makedirs(lock_dir, mode=0o700, exist_ok=True)
+    name = re.sub(r"[^\w.-]", "_", name)
+    return os.path.join(lock_dir, "vit-transfer-{}.lock".format(name))
+
+
+class TransferScheduler(object):
+
+    # lock_dir: directory of the lock files shared with other processes,
+    # None for a process wide arbitration.
+
+    def __init__(self, max_transfers=MAX_TRANSFERS, lock_dir=None):
+        self.max_transfers = max_transfers
+        self.lock_dir = lock_dir
+        self.running = 0
+        self.waiting = []
+        self.counter = itertools.count()
+        self.condition = threading.Condition()
+        self.held_slots = threading.local()
+
+    @contextlib.contextmanager
+    def transfer(self, priority=PRIORITY_INTERACTIVE):
+        self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def acquire(self, priority=PRIORITY_INTERACTIVE):
+        with self.condition:
+            entry = (priority, next(self.counter))
+            heapq.heappush(self.waiting, entry)
+            while self.running >= self.max_transfers or self.waiting[0] != entry:
+                self.condition.wait()
+            heapq.heappop(self.waiting)
+            self.running += 1
+            # next in queue may start too if slots remain.
+            self.condition.notify_all()
+        if self.lock_dir is None:
+            return
+        try:
+            slot = self._acquire_shared_slot(priority)
+        except BaseException:
+            self.release()
+            raise
+        self._get_held_slots().append(slot)
+
+    def release(self):
+        if self.lock_dir is not None:
+            held_slots = self._get_held_slots()
+            if held_slots:
+                held_slots.pop().close()
+        with self.condition:
+            self.running -= 1
+            self.condition.notify_all()
+
+    def set_max_transfers(self, max_transfers):
+        with self.condition:
+            self.max_transfers = max(1, max_transfers)
+            self.condition.notify_all()
+
+    def get_queue_depth(self, priority=None):
+        with self.condition:
+            return len([
+                entry for entry in self.waiting
+                if priority is None or entry[0] == priority
+            ])
+
+    def get_queue_status(self):
+        with self.condition:
+            ret = {name: 0 for name in PRIORITY_NAMES.values()}
+            for priority, _ in self.waiting:
+                ret[PRIORITY_NAMES[priority]] += 1
+            ret["running"] = self.running
+            return ret
+
+    def has_interactive_waiting(self):
+        # True when a process waits for a slot for an interactive transfer.
+        with open(self._get_lock_path("interactive"), "a") as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return True
+        return False
+
+    # -- Private -------------------------------------------------------------
+
+    def _get_lock_path(self, name):
+        return _get_lock_file_path(self.lock_dir, name)
+
+    def _get_held_slots(self):
+        if not hasattr(self.held_slots, "value"):
+            self.held_slots.value = []
+        return self.held_slots.value
+
+    def _acquire_shared_slot(self, priority):
+        waiting_file = None
+        if priority == PRIORITY_INTERACTIVE:
+            waiting_file = open(self._get_lock_path("interactive"), "a")
+            fcntl.flock(waiting_file, fcntl.LOCK_SH)
+        try:
+            while True:
+                if priority == PRIORITY_INTERACTIVE or not self.has_interactive_waiting():
+                    slot = self._try_lock_slot()
+                    if slot is not None:
+                        return slot
+                time.sleep(SLOT_POLL_INTERVAL)
+        finally:
+            if waiting_file is not None:
+                waiting_file.close()
+
+    def _try_lock_slot(self):
+        for index in range(self.max_transfers):
+            slot = open(self._get_lock_path("slot-{}".format(index)), "a")
+            try:
+                fcntl.flock(slot, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                slot.close()
+                continue
+            return slot
+        return None
+
+
+class TokenBucket(object):
+
+    # rate in bytes per second, 0 for no limit. Bytes consumed over the
+    # budget are a debt the consumer sleeps off.
+    # state_path: file holding the tokens, shared with other processes.
+
+    def __init__(self, rate=0, burst=None, state_path=None):
+        self.lock = threading.Lock()
+        self.state_path = state_path
+        self.configure(rate, burst)
+
+    def configure(self, rate, burst=None):
+        with self.lock:
+            self.rate = rate
+            self.burst = burst or rate
+            self.tokens = self.burst
+            self.last_time = time.time()
+
+    def consume(self, size):
+        if not self.rate:
+            return
+        with self.lock:
+            if self.state_path is None:
+                wait = self._consume(size)
+            else:
+                with open(self.state_path, "a+") as f:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                    self._load_state(f)
+                    wait = self._consume(size)
+                    f.truncate(0)
+                    f.write(json.dumps([self.tokens, self.last_time]))
+        if wait:
+            time.sleep(wait)
+
+    def _consume(self, size):
+        now = time.time()
+        self.tokens = min(
+            self.burst,
+            self.tokens + max(0, now - self.last_time) * self.rate
+        )
+        self.last_time = now
+        self.tokens -= size
+        return -self.tokens / self.rate if self.tokens < 0 else 0
+
+    def _load_state(self, f):
+        # state left by the last process which consumed the bucket.
+        f.seek(0)
+        try:
+            self.tokens, self.last_time = json.loads(f.read())
+        except ValueError:
+            pass
+
+
+_scheduler = TransferScheduler(lock_dir=get_lock_dir())
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def get_scheduler():
+    return _scheduler
+
+
+def get_bandwidth_bucket(key):
+    with _buckets_lock:
+        if key not in _buckets:
+            lock_dir = get_lock_dir()
+            state_path = None
+            if lock_dir is not None:
+                state_path = _get_lock_file_path(lock_dir, "bandwidth-" + key)
+            _buckets[key] = TokenBucket(state_path=state_path)
+        return _buckets[key]
+
+
+def configure_bandwidth_bucket(key, rate):
+    bucket = get_bandwidth_bucket(key)
+    if bucket.rate != rate:
+        bucket.configure(rate)
+    return bucket
@@ -1,21 +1,46 @@
 import os
+import json
+import shlex
+import time
+import shutil
+import threading
+import contextlib
 from abc import ABC, abstractmethod
 from vit import constants
+from vit import py_helpers
 from vit.path_helpers import localize_path
+from vit.file_handlers import repo_config
+from vit.file_handlers.json_file import get_path_lock
+from vit.file_handlers import json_cache
+from vit.file_handlers import tree_journal
 from vit.file_handlers.stage_metadata import StagedMetadata
 from vit.connection.ssh_connection import SSHConnection
-from vit.custom_exceptions import RepoIsLock_E
+from vit.connection import transfer_scheduler
+from vit.connection.transfer_progress import TransferProgress
+from vit.connection.origin_cache import OriginCache
+from vit.connection import copy_strategy
+from vit.connection import mirror_routing
+from vit.custom_exceptions import (
+    RepoIsLock_E, SSH_OperationInterrupted_E,
+    Mirror_NotFound_E, Mirror_ConnectionError_E
+)
 from vit.vit_lib.misc import file_name_generation
 
 
 import logging
 log = logging.getLogger()
 
+# stage files of transfers, removed once older than stale_transfer_max_age.
+STALE_STAGE_EXTENSIONS = (".part", ".checkpoint.json", ".commit.json", ".delta")
+# waiting for the origin lock held by someone else, in seconds.
+LOCK_TIMEOUT = 5
+LOCK_RETRY_DELAY = 0.2
+
 
 class VitConnection(ABC):
 
     SSHConnection = SSHConnection
-    lock_file_path = os.path.join(constants.VIT_DIR, ".lock")
+    lock_file_path = constants.VIT_LOCK_FILE
     instances = []
 
     def __init__(self, local_path, server, origin_path, user):
@@ -25,24 +50,71 @@ class VitConnection(ABC):
         self.host = server
         self.user = user
         self.ssh_connection = self.SSHConnection(self.host, self.user)
+        self.connection_config = {}
+        self.vit_serve_available = True
+        self.vit_delta_available = True
+        self.stale_transfers_cleaned = False
+        self.progress_observers = []
+        self.origin_cache = OriginCache()
+        # mirror commit files are read from, see mirror_routing.
+        self.read_mirror = None
+        self.read_mirror_selected = False
+        self.read_mirror_lock = threading.Lock()
+        # origin lock is a file: threads of this process sharing the
+        # connection have to take it one after the other.
+        self.lock_mutex = threading.RLock()
+        # only the lock this connection created is removed by it.
+        self.lock_held = False
+        self.lock_depth = 0
         self.lock_manager = ContextManagerWrapper(
-            self.lock,
-            self.unlock
+            self._acquire_lock,
+            self._release_lock
         )
         self.__class__.instances.append(self)
 
     # -- Managing connection -------------------------------------------------
 
     def open_connection(self):
+        self.connection_config = repo_config.get_connection_config(
+            self.local_path
+        )
+        repo_config.check_repository_format(self.local_path)
+        self.ssh_connection.configure_transfer(**self.connection_config)
+        self.origin_cache.ttl = self.connection_config.get("origin_cache_ttl", 0)
+        self.origin_cache.clear()
+        transfer_scheduler.get_scheduler().set_max_transfers(
+            self.connection_config.get(
+                "max_concurrent_transfers",
+                transfer_scheduler.MAX_TRANSFERS
+            )
+        )
         self.ssh_connection.open_connection()
         if self.check_is_lock():
             raise RepoIsLock_E(self.ssh_connection.ssh_link)
+        self._clean_stale_stage_files()
+
+    def _clean_stale_stage_files(self):
+        # partial downloads, checkpoints... of transfers abandoned long ago.
+        max_age = self.connection_config.get("stale_transfer_max_age")
+        stage_dir = self._format_path_local(constants.VIT_STAGE_DIR)
+        if not max_age or not os.path.isdir(stage_dir):
+            return
+        time_limit = time.time() - max_age
+        for file_name in os.listdir(stage_dir):
+            if not file_name.endswith(STALE_STAGE_EXTENSIONS):
+                continue
+            path = os.path.join(stage_dir, file_name)
+            try:
+                if os.path.getmtime(path) < time_limit:
+                    os.remove(path)
+            except OSError as e:
+                log.debug("could not remove {}: {}".format(path, e))
 
     def close_connection(self):
         if not self.check_is_open():
             return
-        if self.check_is_lock():
-            self.unlock()
+        self.unlock()
+        self._close_read_mirror()
         self.ssh_connection.close_connection()
 
     def __enter__(self):
@@ -51,8 +123,16 @@ class VitConnection(ABC):
 
     def __exit__(self, t, value, traceback):
         self.unlock()
+        self._close_read_mirror()
         self.ssh_connection.close_connection()
 
+    def _close_read_mirror(self):
+        with self.read_mirror_lock:
+            if self.read_mirror is not None:
+                self.read_mirror.close()
+            self.read_mirror = None
+            self.read_mirror_selected = False
+
     @property
     def ssh_link(self):
         return self.ssh_connection.ssh_link
@@ -60,17 +140,97 @@ class VitConnection(ABC):
     def check_is_open(self):
         return self.ssh_connection.check_is_open()
 
+    # -- Transfer progress ---------------------------------------------------
+
+    def add_progress_observer(self, observer):
+        # observer: callable taking a TransferProgress, called during each
+        # data transfer with origin (see transfer_progress).
+        self.progress_observers.append(observer)
+
+    def remove_progress_observer(self, observer):
+        self.progress_observers.remove(observer)
+
+    @contextlib.contextmanager
+    def _observe_transfer(self, direction, src, dst, get_total):
+        # yields the on_bytes callback to give to the transfer, None when
+        # nobody observes transfers.
+        if not self.progress_observers:
+            yield None
+            return
+        progress = TransferProgress(
+            direction, src, dst,
+            get_total(),
+            self.progress_observers
+        )
+        success = False
+        try:
+            yield progress.update
+            success = True
+        finally:
+            progress.finish(success)
+
+    def _get_local_size(self, path):
+        path = self._format_path_local(path)
+        if os.path.isdir(path):
+            return py_helpers.get_dir_size(path)
+        return os.path.getsize(path)
+
+    @staticmethod
+    def get_transfer_queue_depth(priority=None):
+        return transfer_scheduler.get_scheduler().get_queue_depth(priority)
+
+    @staticmethod
+    def get_transfer_queue_status():
+        return transfer_scheduler.get_scheduler().get_queue_status()
+
     # -- Managing lock -------------------------------------------------------
 
     def check_is_lock(self):
-        return self.exists_on_origin(self.lock_file_path)
+        # others lock origin too: never answered from cache.
+        return self.exists_on_origin(self.lock_file_path, use_cache=False)
 
     def lock(self):
-        return self._touch(self.lock_file_path)
+        # noclobber: like vit-serve, fails if someone else holds the lock.
+        self.origin_cache.invalidate(self.lock_file_path)
+        status = self.ssh_connection.exec_command_output(
+            "set -C; : > {}".format(
+                shlex.quote(self._format_path_origin(self.lock_file_path))
+            )
+        )[0]
+        if status:
+            self.lock_held = True
+        return status
 
     def unlock(self):
-        if self.check_is_lock():
-            return self._rm(self.lock_file_path)
+        if not self.lock_held:
+            return None
+        self.lock_held = False
+        return self._rm(self.lock_file_path)
+
+    def _acquire_lock(self):
+        self.lock_mutex.acquire()
+        try:
+            if not self.lock_depth:
+                self._wait_lock()
+            self.lock_depth += 1
+        except BaseException:
+            self.lock_mutex.release()
+            raise
+
+    def _release_lock(self):
+        try:
+            self.lock_depth -= 1
+            if not self.lock_depth:
+                self.unlock()
+        finally:
+            self.lock_mutex.release()
+
+    def _wait_lock(self):
+        time_limit = time.time() + LOCK_TIMEOUT
+        while not self.lock():
+            if time.time() > time_limit:
+                raise RepoIsLock_E(self.ssh_link)
+            time.sleep(LOCK_RETRY_DELAY)
 
     # -- Data transfer with origin api ---------------------------------------
 
@@ -80,22 +240,40 @@ class VitConnection(ABC):
             is_editable=False):
         raise NotImplementedError()
 
-    def put_data_to_origin(self, src, dst, is_src_abritrary_path=False):
+    def put_data_to_origin(
+            self, src, dst,
+            is_src_abritrary_path=False,
+            hash_src=False):
+        # hash_src: returns sha256 of src, computed while sending it when
+        # possible.
         raise NotImplementedError()
 
     def put_commit_to_origin(
             self, src, dst,
             keep_file,
             keep_editable,
+            delta_base=None,
             recursive=True):
+        # returns sha256 of the committed file.
         raise NotImplementedError()
 
-    def get_metadata_from_origin(self, metadata_file_path, recursive=False):
-        return self._ssh_get_wrapper(
-            metadata_file_path,
-            metadata_file_path,
-            recursive=recursive
-        )
+    def get_metadata_from_origin(
+            self, metadata_file_path,
+            recursive=False, journal=False):
+        # journal: journal of the file is downloaded too (see tree_journal).
+        with get_path_lock(self._format_path_local(metadata_file_path)):
+            ret = self._ssh_get_wrapper(
+                metadata_file_path,
+                metadata_file_path,
+                recursive=recursive,
+                retry=True
+            )
+            if journal:
+                self._get_journal_from_origin(
+                    metadata_file_path,
+                    metadata_file_path
+                )
+            return ret
 
     def get_metadata_from_origin_as_staged(
             self, metadata_file_path,
@@ -106,8 +284,11 @@ class VitConnection(ABC):
         self._ssh_get_wrapper(
             metadata_file_path,
             stage_file_name,
-            recursive=True
+            recursive=True,
+            retry=True
         )
+        if file_handler_type.journaled:
+            self._get_journal_from_origin(metadata_file_path, stage_file_name)
         stage_file_name_local = localize_path(self.local_path, stage_file_name)
         return StagedMetadata(
             metadata_file_path,
@@ -122,14 +303,35 @@ class VitConnection(ABC):
             recursive=False):
         if not self.check_is_lock():
             raise EnvironmentError()
-        self._ssh_put_wrapper(
-            stage_metadata_wrapper.stage_file_path,
-            stage_metadata_wrapper.meta_data_file_path,
-            recursive=recursive
-        )
+        try:
+            self._ssh_put_wrapper(
+                stage_metadata_wrapper.stage_file_path,
+                stage_metadata_wrapper.meta_data_file_path,
+                recursive=recursive
+            )
+        except SSH_OperationInterrupted_E:
+            # metadata on origin may be partially written: uploading it
+            # again is only safe while nobody else could have updated it,
+            # that is while origin is still locked.
+            if not self.check_is_lock():
+                raise
+            self._ssh_put_wrapper(
+                stage_metadata_wrapper.stage_file_path,
+                stage_metadata_wrapper.meta_data_file_path,
+                recursive=recursive,
+                retry=True
+            )
+        journaled = stage_metadata_wrapper.file_handler.journaled
+        if journaled and not tree_journal.read_journal(
+                stage_metadata_wrapper.stage_file_path_local):
+            # journal on origin is folded in the file sent.
+            self._truncate_journal_at_origin(
+                stage_metadata_wrapper.meta_data_file_path
+            )
         self.get_metadata_from_origin(
             stage_metadata_wrapper.meta_data_file_path,
-            recursive=recursive
+            recursive=recursive,
+            journal=journaled
         )
         if not keep_stage_file:
             stage_metadata_wrapper.remove_stage_metadata()
@@ -137,75 +339,425 @@ class VitConnection(ABC):
     def update_staged_metadata(self, stage_metadata_wrapper):
         self._ssh_get_wrapper(
             stage_metadata_wrapper.meta_data_file_path,
-            stage_metadata_wrapper.stage_file_path
+            stage_metadata_wrapper.stage_file_path,
+            retry=True
+        )
+        if stage_metadata_wrapper.file_handler.journaled:
+            self._get_journal_from_origin(
+                stage_metadata_wrapper.meta_data_file_path,
+                stage_metadata_wrapper.stage_file_path
+            )
+
+    def apply_metadata_operations(self, stage_metadata_wrapper, operations):
+        # applies operations [(method, kargs), ...] of the file handler to
+        # a metadata file on origin: done by vit-serve on origin in one
+        # request if available, else under the lock from the staged file,
+        # operations being appended to the journal of the file on origin
+        # when it has one. returns the result of each operation.
+        results = self._apply_metadata_operations_at_origin(
+            stage_metadata_wrapper,
+            operations
         )
+        if results is not None:
+            stage_metadata_wrapper.remove_stage_metadata()
+            return results
+        with self.lock_manager:
+            self.update_staged_metadata(stage_metadata_wrapper)
+            with stage_metadata_wrapper.file_handler as file_handler:
+                results = [
+                    file_handler.apply_operation(operation, kargs)
+                    for operation, kargs in operations
+                ]
+                append = file_handler.dirty and self._check_journal_append(
+                    file_handler, len(operations)
+                )
+            if not append or not self._append_journal_at_origin(
+                    stage_metadata_wrapper, operations):
+                self.put_metadata_to_origin(stage_metadata_wrapper)
+        return results
 
     # command to be executed on origin ---------------------------------------
 
     def create_dir_at_origin_if_not_exists(self, dir_to_create):
-        if self.exists_on_origin(dir_to_create):
+        return self.create_dirs_at_origin_if_not_exist(dir_to_create)
+
+    def create_dirs_at_origin_if_not_exist(self, *dirs_to_create):
+        exists = self.exists_many_on_origin(dirs_to_create)
+        missing = [d for d in dirs_to_create if not exists[d]]
+        if not missing:
             return True
-        return self._mkdir(dir_to_create, p=True)
+        return self._mkdir(*missing, p=True)
 
     def copy_file_at_origin(self, src, dst, r=False):
         return self._cp(src, dst, r)
 
-    def exists_on_origin(self, path):
+    def exists_on_origin(self, path, use_cache=True):
+        return self.exists_many_on_origin((path,), use_cache)[path]
+
+    def exists_many_on_origin(self, paths, use_cache=True):
+        # use_cache: paths are answered from the origin cache, parent
+        # directories of unknown paths are listed and cached.
+        paths = tuple(dict.fromkeys(paths))
+        if not use_cache or not self.origin_cache.ttl:
+            return self._exists_many_at_origin(paths)
+        ret = {path: self.origin_cache.exists(path) for path in paths}
+        unknown = {
+            path: os.path.split(os.path.normpath(path))
+            for path, exists in ret.items() if exists is None
+        }
+        # origin root can't be found in a listing.
+        not_listable = [
+            path for path, (_, name) in unknown.items()
+            if name in ("", ".")
+        ]
+        ret.update(self._exists_many_at_origin(not_listable))
+        for path in not_listable:
+            del unknown[path]
+        if not unknown:
+            return ret
+        dirs = tuple(dict.fromkeys(dir_path for dir_path, _ in unknown.values()))
+        listings = self._list_dirs_at_origin(dirs)
+        if listings is None:
+            ret.update(self._exists_many_at_origin(tuple(unknown)))
+            return ret
+        for dir_path, names in listings.items():
+            self.origin_cache.set_listing(dir_path, names)
+        for path, (dir_path, name) in unknown.items():
+            ret[path] = name in listings[dir_path]
+        return ret
+
+    def _list_dirs_at_origin(self, dirs):
+        # {dir: set of entry names}, empty for missing dirs. A "/" line,
+        # which can't be a file name, ends each listing.
+        script = "for d in {}; do if [ -d \"$d\" ]; then ls -A \"$d\"; fi; " \
+                 "echo /; done".format(
+                    " ".join(
+                        shlex.quote(self._format_path_origin(d))
+                        for d in dirs
+                    )
+                 )
+        status, lines = self.ssh_connection.exec_command_output(script, retry=True)
+        if not status or lines.count("/") != len(dirs):
+            log.debug("could not list directories on origin.")
+            return None
+        ret = {}
+        names = set()
+        dirs_iter = iter(dirs)
+        for line in lines:
+            if line == "/":
+                ret[next(dirs_iter)] = names
+                names = set()
+            else:
+                names.add(line)
+        return ret
+
+    def _exists_many_at_origin(self, paths):
         # TODO : MAKE THIS WORK ON WINDOWS SHELL won't work on windows shell.
-        return self._ls(path)
+        if not paths:
+            return {}
+        script = "for p in {}; do if [ -e \"$p\" ]; " \
+                 "then echo 1; else echo 0; fi; done".format(
+                    " ".join(
+                        shlex.quote(self._format_path_origin(p))
+                        for p in paths
+                    )
+                 )
+        status, lines = self.ssh_connection.exec_command_output(script, retry=True)
+        if not status or len(lines) != len(paths):
+            log.debug("batched existence check failed, falling back to ls.")
+            return {path: self._ls(path) for path in paths}
+        return {path: line == "1" for path, line in zip(paths, lines)}
+
+    def hash_on_origin(self, path):
+        return self.hash_many_on_origin((path,))[path]
+
+    def hash_many_on_origin(self, paths):
+        # sha256 of files computed on origin, None for missing files.
+        paths = tuple(dict.fromkeys(paths))
+        if not paths:
+            return {}
+        script = "for p in {}; do h=$( (sha256sum \"$p\" || shasum -a 256 \"$p\") " \
+                 "2>/dev/null ) && echo \"${{h%% *}}\" || echo -; done".format(
+                    " ".join(
+                        shlex.quote(self._format_path_origin(p))
+                        for p in paths
+                    )
+                 )
+        status, lines = self.ssh_connection.exec_command_output(script, retry=True)
+        if not status or len(lines) != len(paths):
+            log.debug("could not hash files on origin.")
+            return dict.fromkeys(paths)
+        return {
+            path: None if line == "-" else line
+            for path, line in zip(paths, lines)
+        }
+
+    # -- Replication to mirrors api ------------------------------------------
+
+    def open_mirror(self, name):
+        mirrors = repo_config.get_mirrors(self.local_path)
+        if name not in mirrors:
+            raise Mirror_NotFound_E(name)
+        mirror = mirror_routing.open_mirror(
+            self.SSHConnection, name, mirrors[name],
+            self.connection_config,
+            self.ssh_connection.password
+        )
+        if mirror is None:
+            raise Mirror_ConnectionError_E(name)
+        return mirror
+
+    def list_changed_at_origin(self, since=None):
+        # files of origin whose inode changed after since, in origin clock.
+        # ctime and not mtime: files copied or moved keeping their mtime
+        # (cp -p, rsync -t) are listed too.
+        # returns origin time when listing started, None if it failed, and
+        # {path: (ctime, size)}.
+        command = "cd {} && date +%s.%N && find . -type f".format(
+            shlex.quote(self.origin_path)
+        )
+        if since is not None:
+            command += " -newerct @{}".format(since)
+        command += " -printf '%C@ %s %P\\n'"
+        status, lines = self.ssh_connection.exec_command_output(command, retry=True)
+        if not status or not lines:
+            return None, {}
+        ret = {}
+        for line in lines[1:]:
+            ctime, size, path = line.split(" ", 2)
+            ret[path] = (float(ctime), int(size))
+        return float(lines[0]), ret
+
+    def copy_file_to_mirror(self, mirror, path):
+        # through a stage file of the working copy: origin and mirror may
+        # not reach each other.
+        stage_path = file_name_generation.generate_stage_replication_file_path(path)
+        try:
+            self._ssh_get_wrapper(path, stage_path, retry=True)
+            self._ssh_put_wrapper(stage_path, path, retry=True, mirror=mirror)
+        finally:
+            if os.path.exists(self._format_path_local(stage_path)):
+                os.remove(self._format_path_local(stage_path))
 
     # -- Private -------------------------------------------------------------
 
+    def _apply_metadata_operations_at_origin(
+            self, stage_metadata_wrapper,
+            operations):
+        if not self.vit_serve_available:
+            return None
+        self.origin_cache.invalidate(stage_metadata_wrapper.meta_data_file_path)
+        reply = self._send_vit_serve_request({
+            "root": self.origin_path,
+            "path": stage_metadata_wrapper.meta_data_file_path,
+            "handler": type(stage_metadata_wrapper.file_handler).__name__,
+            "operations": [list(operation) for operation in operations]
+        })
+        if reply is None:
+            log.debug("vit-serve not available on origin.")
+            self.vit_serve_available = False
+            return None
+        if reply["status"] == "locked":
+            raise RepoIsLock_E(self.ssh_link)
+        if reply["status"] != "ok":
+            log.debug("vit-serve error: {}".format(reply.get("error")))
+            return None
+        # reply carries the updated file: no need to download it again.
+        metadata_path_local = self._format_path_local(
+            stage_metadata_wrapper.meta_data_file_path
+        )
+        with get_path_lock(metadata_path_local):
+            py_helpers.write_json(metadata_path_local, reply["data"])
+            tree_journal.truncate_journal(metadata_path_local)
+        return reply["results"]
+
+    def _check_journal_append(self, file_handler, count):
+        # False when the journal would exceed tree_journal_max_records of
+        # the repository: the file is then written again with the journal
+        # folded in.
+        if not file_handler.journaled:
+            return False
+        max_records = repo_config.get_tree_journal_max_records(self.local_path)
+        return file_handler.journal_records + count <= max_records
+
+    def _append_journal_at_origin(self, stage_metadata_wrapper, operations):
+        # stage file holds operations already: it becomes the local copy.
+        journal_path = tree_journal.get_journal_path(
+            stage_metadata_wrapper.meta_data_file_path
+        )
+        # not retried: records may have been appended before the
+        # connection dropped, SSH_OperationInterrupted_E is raised.
+        status = self.ssh_connection.exec_command_output(
+            "printf '%s' {} >> {}".format(
+                shlex.quote(tree_journal.format_records(operations)),
+                shlex.quote(self._format_path_origin(journal_path))
+            )
+        )[0]
+        self.origin_cache.invalidate(journal_path)
+        if not status:
+            return False
+        metadata_path_local = self._format_path_local(
+            stage_metadata_wrapper.meta_data_file_path
+        )
+        with get_path_lock(metadata_path_local):
+            json_cache.get_json_cache().invalidate(metadata_path_local)
+            shutil.copyfile(
+                stage_metadata_wrapper.stage_file_path_local,
+                metadata_path_local
+            )
+            tree_journal.truncate_journal(metadata_path_local)
+        stage_metadata_wrapper.remove_stage_metadata()
+        return True
+
+    def _get_journal_from_origin(self, metadata_file_path, dst_path):
+        # journal read as text in the same round trip whether it exists
+        # or not, local journal removed when there is none on origin.
+        journal_path = tree_journal.get_journal_path(
+            self._format_path_origin(metadata_file_path)
+        )
+        status, lines = self.ssh_connection.exec_command_output(
+            "if [ -e {0} ]; then cat {0}; fi".format(shlex.quote(journal_path)),
+            retry=True
+        )
+        if not status:
+            return False
+        dst_path_local = self._format_path_local(dst_path)
+        if not lines:
+            tree_journal.remove_journal(dst_path_local)
+            return True
+        with open(tree_journal.get_journal_path(dst_path_local), "w") as f:
+            f.write("\n".join(lines) + "\n")
+        return True
+
+    def _truncate_journal_at_origin(self, metadata_file_path):
+        journal_path = shlex.quote(tree_journal.get_journal_path(
+            self._format_path_origin(metadata_file_path)
+        ))
+        return self.ssh_connection.exec_command_output(
+            "if [ -s {0} ]; then : > {0}; fi".format(journal_path),
+            retry=True
+        )[0]
+
+    def _send_vit_serve_request(self, request):
+        command = self.connection_config.get("vit_serve")
+        if not command:
+            return None
+        # not retried: operations may have been applied before the
+        # connection dropped, SSH_OperationInterrupted_E is raised.
+        status, lines = self.ssh_connection.exec_command_output(
+            "printf '%s\\n' {} | {}".format(
+                shlex.quote(json.dumps(request)),
+                command
+            )
+        )
+        if not status or not lines:
+            return None
+        try:
+            return json.loads(lines[-1])
+        except ValueError:
+            return None
+
     def _format_path_origin(self, path):
         return os.path.join(self.origin_path, path)
 
     def _format_path_local(self, path):
         return os.path.join(self.local_path, path)
 
-    def _ssh_get_wrapper(self, src, dst, *args, **kargs):
-        return self.ssh_connection.get(
-            self._format_path_origin(src),
-            self._format_path_local(dst),
-            *args, **kargs
-        )
-
-    def _ssh_put_wrapper(self, src, dst, *args, **kargs):
-        return self.ssh_connection.put(
-            self._format_path_local(src),
-            self._format_path_origin(dst),
-            *args, **kargs
-        )
-
-    def _mkdir(self, path, p=False):
+    # transfers wait their turn in the transfer queue shared by vit
+    # processes, with
+    # the priority of the calling thread (see transfer_scheduler).
+
+    def _ssh_get_wrapper(self, src, dst, *args, mirror=None, **kargs):
+        # mirror: gets src from this mirror instead of origin.
+        priority = transfer_scheduler.get_current_priority()
+        if mirror is None:
+            ssh_connection = self.ssh_connection
+            src = self._format_path_origin(src)
+        else:
+            ssh_connection = mirror.ssh_connection
+            src = mirror.format_path(src)
+        dst = self._format_path_local(dst)
+        try:
+            with transfer_scheduler.get_scheduler().transfer(priority):
+                return ssh_connection.get(
+                    src, dst,
+                    *args, priority=priority, **kargs
+                )
+        finally:
+            json_cache.get_json_cache().invalidate(dst)
+
+    def _ssh_put_wrapper(self, src, dst, *args, mirror=None, **kargs):
+        # mirror: puts dst on this mirror instead of origin.
+        priority = transfer_scheduler.get_current_priority()
+        if mirror is None:
+            ssh_connection = self.ssh_connection
+            self.origin_cache.invalidate(dst)
+            dst = self._format_path_origin(dst)
+        else:
+            ssh_connection = mirror.ssh_connection
+            dst = mirror.format_path(dst)
+        with transfer_scheduler.get_scheduler().transfer(priority):
+            return ssh_connection.put(
+                self._format_path_local(src),
+                dst,
+                *args, priority=priority, **kargs
+            )
+
+    def _mkdir(self, *paths, p=False):
         command = "mkdir "
         if p:
             command += "-p "
-        command += self._format_path_origin(path)
-        return self.ssh_connection.exec_command(command)
+        command += " ".join(self._format_path_origin(path) for path in paths)
+        for path in paths:
+            self.origin_cache.invalidate(path, ancestors=p)
+        return self.ssh_connection.exec_command(command, retry=p)
 
     def _touch(self, path):
-        return self.ssh_connection.exec_command(
+        status = self.ssh_connection.exec_command(
             "touch " + self._format_path_origin(path))
+        if status:
+            self.origin_cache.set_exists(path, True)
+        else:
+            self.origin_cache.invalidate(path)
+        return status
 
     def _rm(self, path, r=False):
         command = "rm "
         if r:
             command += "-r "
         command += self._format_path_origin(path)
+        self.origin_cache.invalidate(path)
         return self.ssh_connection.exec_command(command)
 
     def _cp(self, src, dst, r=False):
+        self.origin_cache.invalidate(dst)
         src = self._format_path_origin(src)
         dst = self._format_path_origin(dst)
-        command = "cp "
         if r:
-            command += "-r "
-        command = "{} {} {}".format(command, src, dst)
-        return self.ssh_connection.exec_command(command)
+            # 'cp -r' again would copy src inside dst.
+            return self.ssh_connection.exec_command(
+                "cp -r {} {}".format(src, dst)
+            )
+        # reflink (GNU cp), then plain cp (which uses copy_file_range when
+        # available). No hardlink: checkouts of local origins are symlinks
+        # to commits, and linking changes the ctime replicate relies on.
+        # Prints the strategy used.
+        src = shlex.quote(src)
+        dst = shlex.quote(dst)
+        command = "{{ cp --reflink=always {0} {1} 2>/dev/null && echo {2}; }}".format(
+            src, dst, copy_strategy.REFLINK
+        )
+        command += " || {{ cp {0} {1} && echo cp; }}".format(src, dst)
+        status, lines = self.ssh_connection.exec_command_output(command, retry=True)
+        if status and lines:
+            copy_strategy.record_copy("origin_" + lines[-1])
+        return status
 
     def _ls(self, path):
         return self.ssh_connection.exec_command(
-            "ls {}".format(self._format_path_origin(path)))
+            "ls {}".format(self._format_path_origin(path)),
+            retry=True
+        )
 
 
 class ContextManagerWrapper(object):
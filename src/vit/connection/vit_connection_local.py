@@ -1,5 +1,8 @@
 import os
 import shutil
+from vit import py_helpers
+from vit import vit_serve
+from vit.connection import copy_strategy
 from vit.connection.vit_connection import VitConnection
 
 
@@ -10,13 +13,31 @@ class VitConnectionLocal(VitConnection):
         self.host = "localhost"
         self.ssh_connection = self.SSHConnection(self.host, self.user)
 
+    def exists_many_on_origin(self, paths, use_cache=True):
+        return {
+            path: os.path.exists(self._format_path_origin(path))
+            for path in paths
+        }
+
+    def _send_vit_serve_request(self, request):
+        # origin is reachable from here: no need for a remote helper.
+        return vit_serve.handle_request(request)
+
+    def hash_many_on_origin(self, paths):
+        ret = {}
+        for path in paths:
+            path_origin = self._format_path_origin(path)
+            if os.path.isfile(path_origin):
+                ret[path] = py_helpers.calculate_file_sha(path_origin)
+            else:
+                ret[path] = None
+        return ret
+
     def get_data_from_origin(
             self, src, dst,
             recursive=False,
             is_editable=False):
 
-        copy_func = shutil.copytree if recursive else shutil.copy
-
         src = self._format_path_origin(src)
         dst = self._format_path_local(dst)
 
@@ -31,43 +52,78 @@ class VitConnectionLocal(VitConnection):
             os.remove(dst)
 
         if is_editable:
-            return copy_func(src, dst)
+            with self._observe_transfer(
+                    "get", src, dst,
+                    lambda: self._get_local_size(src)) as on_bytes:
+                return _copy(src, dst, recursive, on_bytes)
         else:
             return os.symlink(src, dst)
 
     def put_data_to_origin(
             self, src, dst,
             recursive=False,
-            is_src_abritrary_path=False):
+            is_src_abritrary_path=False,
+            hash_src=False):
 
         if is_src_abritrary_path:
             src = os.path.abspath(src)
 
-        copy_func = shutil.copytree if recursive else shutil.copy
-
-        return copy_func(
-            self._format_path_local(src),
-            self._format_path_origin(dst)
-        )
+        src = self._format_path_local(src)
+        dst = self._format_path_origin(dst)
+        with self._observe_transfer(
+                "put", src, dst,
+                lambda: self._get_local_size(src)) as on_bytes:
+            ret = _copy(src, dst, recursive, on_bytes)
+        if hash_src:
+            return py_helpers.calculate_file_sha(dst)
+        return ret
 
     def put_commit_to_origin(
             self, src, dst,
             keep_file,
             keep_editable,
+            delta_base=None,
             recursive=False):
 
         src = self._format_path_local(src)
         dst = self._format_path_origin(dst)
 
-        copy_func = shutil.copytree if recursive else shutil.copy
-        copy_func(src, dst)
+        # src not kept editable is removed right after: dst can take its
+        # inode.
+        with self._observe_transfer(
+                "put", src, dst,
+                lambda: self._get_local_size(src)) as on_bytes:
+            _copy(src, dst, recursive, on_bytes, allow_hardlink=not keep_editable)
+        # reflinks and kernel copies don't read the data: hashed afterward.
+        sha256 = None if recursive else py_helpers.calculate_file_sha(dst)
 
         if keep_editable and not keep_file:
             raise EOFError()
         elif keep_file and keep_editable:
-            return
+            return sha256
         elif keep_file and not keep_editable:
             os.remove(src)
             os.symlink(dst, src)
         else:
             os.remove(src)
+        return sha256
+
+    def _cp(self, src, dst, r=False):
+        self.origin_cache.invalidate(dst)
+        return _copy(
+            self._format_path_origin(src),
+            self._format_path_origin(dst),
+            r, None
+        )
+
+
+
+def _copy(src, dst, recursive, on_bytes, allow_hardlink=False):
+    if not recursive:
+        return copy_strategy.copy_file(src, dst, on_bytes, allow_hardlink)
+    return shutil.copytree(
+        src, dst,
+        copy_function=lambda s, d: copy_strategy.copy_file(
+            s, d, on_bytes, allow_hardlink
+        )
+    )
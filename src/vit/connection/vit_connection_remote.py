@@ -1,5 +1,15 @@
 import os
+import shlex
+from vit import constants
+from vit import py_helpers
+from vit.file_handlers import repo_config
+from vit.connection import delta_transfer
+from vit.connection import mirror_routing
 from vit.connection.vit_connection import VitConnection
+from vit.vit_lib.misc import file_name_generation
+
+import logging
+log = logging.getLogger()
 
 
 class VitConnectionRemote(VitConnection):
@@ -8,16 +18,213 @@ class VitConnectionRemote(VitConnection):
             self, src, dst,
             recursive=False,
             is_editable=False):
-        return self._ssh_get_wrapper(src, dst, recursive=recursive)
+        # commit files are immutable: read from the nearest mirror when it
+        # already has them, else from origin.
+        mirror = self._get_read_mirror()
+        if mirror is not None:
+            try:
+                return self._get_data(src, dst, recursive, mirror)
+            except Exception as e:
+                log.info("could not get {} from mirror {}: {}".format(
+                    src, mirror.name, e
+                ))
+        return self._get_data(src, dst, recursive)
+
+    def _get_data(self, src, dst, recursive, mirror=None):
+        partial, checkpoint = file_name_generation.generate_stage_transfer_file_paths(
+            src, dst
+        )
+        with self._observe_transfer(
+                "get", src, dst,
+                lambda: self._get_size_at_origin(src)) as on_bytes:
+            return self._ssh_get_wrapper(
+                src, dst,
+                recursive=recursive,
+                resume=(
+                    self._format_path_local(partial),
+                    self._format_path_local(checkpoint)
+                ),
+                on_bytes=on_bytes,
+                retry=True,
+                mirror=mirror
+            )
+
+    def _get_read_mirror(self):
+        with self.read_mirror_lock:
+            if not self.read_mirror_selected:
+                self.read_mirror_selected = True
+                self.read_mirror = self._select_read_mirror()
+            return self.read_mirror
+
+    def _select_read_mirror(self):
+        mirrors = repo_config.get_mirrors(self.local_path)
+        config = self.connection_config
+        if not mirrors or not config.get("mirror_reads"):
+            return None
+        key = (self.ssh_link, self.origin_path, tuple(sorted(mirrors)))
+        known, nearest = mirror_routing.get_nearest(key, config["mirror_probe_ttl"])
+        if known:
+            if nearest is None or nearest not in mirrors:
+                return None
+            return self._open_mirror(nearest, mirrors[nearest])
 
-    def put_data_to_origin(self, src, dst, is_src_abritrary_path=False):
+        samples = config["mirror_probe_samples"]
+        latencies = {None: mirror_routing.probe_latency(self.ssh_connection, samples)}
+        opened = {}
+        for name, mirror_link in mirrors.items():
+            mirror = self._open_mirror(name, mirror_link)
+            if mirror is None:
+                continue
+            opened[name] = mirror
+            latencies[name] = mirror_routing.probe_latency(mirror.ssh_connection, samples)
+        nearest = mirror_routing.select_nearest(latencies)
+        mirror_routing.set_nearest(key, nearest)
+        log.debug("latencies to origin and mirrors: {}, reading from {}.".format(
+            latencies, nearest or "origin"
+        ))
+        for name, mirror in opened.items():
+            if name != nearest:
+                mirror.close()
+        return opened.get(nearest)
+
+    def _open_mirror(self, name, mirror_link):
+        return mirror_routing.open_mirror(
+            self.SSHConnection, name, mirror_link,
+            self.connection_config,
+            self.ssh_connection.password
+        )
+
+    def put_data_to_origin(
+            self, src, dst,
+            is_src_abritrary_path=False,
+            hash_src=False):
         if is_src_abritrary_path:
             src = os.path.abspath(src)
-        return self._ssh_put_wrapper(src, dst)
+        _, checkpoint = file_name_generation.generate_stage_transfer_file_paths(
+            src, dst
+        )
+        partial = file_name_generation.generate_origin_transfer_file_path(src, dst)
+        if self._get_local_size(src) >= self.connection_config.get(
+                "resumable_threshold", float("inf")):
+            self._clean_stale_transfers_at_origin()
+        with self._observe_transfer(
+                "put", src, dst,
+                lambda: self._get_local_size(src)) as on_bytes:
+            return self._ssh_put_wrapper(
+                src, dst,
+                resume=(
+                    self._format_path_origin(partial),
+                    self._format_path_local(checkpoint)
+                ),
+                on_bytes=on_bytes,
+                retry=True,
+                hash_src=hash_src
+            )
 
     def put_commit_to_origin(
             self, src, dst,
             keep_file,
             keep_editable,
+            delta_base=None,
             recursive=True):
-        return self.put_data_to_origin(src, dst)
+        if delta_base is not None and self._is_delta_transfer_worth(src):
+            with self._observe_transfer(
+                    "put", src, dst,
+                    lambda: self._get_local_size(src)) as on_bytes:
+                sha256 = self._put_commit_delta_to_origin(
+                    src, dst, delta_base, on_bytes
+                )
+            if sha256 is not None:
+                return sha256
+            log.debug("delta transfer of {} failed, sending whole file.".format(src))
+        return self.put_data_to_origin(src, dst, hash_src=True)
+
+    def _clean_stale_transfers_at_origin(self):
+        # once per connection, before the first resumable upload.
+        if self.stale_transfers_cleaned:
+            return
+        self.stale_transfers_cleaned = True
+        max_age = self.connection_config.get("stale_transfer_max_age")
+        if not max_age:
+            return
+        self.ssh_connection.exec_command_output(
+            "find {} -type f -mmin +{} -delete 2>/dev/null; true".format(
+                shlex.quote(self._format_path_origin(constants.VIT_TRANSFER_DIR)),
+                max(1, int(max_age // 60))
+            ),
+            retry=True
+        )
+
+    def _is_delta_transfer_worth(self, src):
+        config = self.connection_config
+        if not config.get("delta_transfer"):
+            return False
+        return os.path.getsize(self._format_path_local(src)) >= config["delta_threshold"]
+
+    def _get_size_at_origin(self, path):
+        status, lines = self.ssh_connection.exec_command_output(
+            "wc -c < {}".format(shlex.quote(self._format_path_origin(path))),
+            retry=True
+        )
+        if not status or not lines:
+            return None
+        return int(lines[-1].strip())
+
+    def _put_commit_delta_to_origin(self, src, dst, delta_base, on_bytes=None):
+        # returns sha256 of src, None if the delta transfer failed.
+        delta_command = self.connection_config.get("vit_delta")
+        if not delta_command or not self.vit_delta_available:
+            return None
+        delta_path = file_name_generation.generate_stage_delta_file_path(dst)
+        delta_path_origin = file_name_generation.generate_origin_delta_file_path(dst)
+
+        # 1. signature of the base commit, computed on origin.
+        status, lines = self.ssh_connection.exec_command_output(
+            "{} signature {}".format(
+                delta_command,
+                shlex.quote(self._format_path_origin(delta_base))
+            ),
+            retry=True
+        )
+        if not status:
+            # not tried again for this connection.
+            log.debug("vit-delta not available on origin.")
+            self.vit_delta_available = False
+            return None
+        signature = delta_transfer.parse_signature(lines)
+
+        # 2. delta computed locally and sent to origin.
+        with open(self._format_path_local(src), "rb") as f_src, \
+                open(self._format_path_local(delta_path), "wb") as f_delta:
+            f_src = py_helpers.HashingReader(f_src)
+            literal, copied = delta_transfer.write_delta(signature, f_src, f_delta)
+        local_sha = f_src.hexdigest()
+        log.debug("delta of {}: {} bytes sent, {} bytes reused.".format(
+            src, literal, copied
+        ))
+        try:
+            self.create_dir_at_origin_if_not_exists(constants.VIT_TRANSFER_DIR)
+            self._ssh_put_wrapper(
+                delta_path, delta_path_origin,
+                on_bytes=on_bytes,
+                retry=True
+            )
+        finally:
+            os.remove(self._format_path_local(delta_path))
+
+        # 3. file rebuilt on origin and checked against the local one.
+        self.origin_cache.invalidate(dst)
+        status, lines = self.ssh_connection.exec_command_output(
+            "{} patch {} {} {}".format(
+                delta_command,
+                shlex.quote(self._format_path_origin(delta_base)),
+                shlex.quote(self._format_path_origin(delta_path_origin)),
+                shlex.quote(self._format_path_origin(dst))
+            ),
+            retry=True
+        )
+        self._rm(delta_path_origin)
+        if status and lines and lines[-1] == local_sha:
+            return local_sha
+        self._rm(dst)
+        return None
@@ -4,7 +4,12 @@ VIT_DIR = ".vit"
 VIT_CONFIG = join(VIT_DIR, "config.json")
 VIT_PACKAGES = join(VIT_DIR, "packages.json")
 VIT_STAGE_DIR = join(VIT_DIR, "stage")
+VIT_LOCK_FILE = join(VIT_DIR, ".lock")
 VIT_TRACK_FILE = join(VIT_DIR, "tracked_files.json")
 VIT_TEMPLATE_DIR = join(VIT_DIR, "templates")
 VIT_ASSET_TREE_DIR = join(VIT_DIR, "tree")
 VIT_TEMPLATE_CONFIG = join(VIT_DIR, "templates.json")
+VIT_REPLICATION_CURSOR = join(VIT_DIR, "replication.json")
+VIT_METADATA_DB = join(VIT_DIR, "metadata.db")
+# on origin only, partial uploads: out of VIT_DIR, which clients fetch.
+VIT_TRANSFER_DIR = ".vit_transfer"
@@ -33,6 +33,15 @@ class Path_FileNotFoundAtOrigin_E(VitCustomException):
             self.path,
             self.ssh_link)
 
+class Path_FileCorruptedAtOrigin_E(VitCustomException):
+    def __init__(self, path, ssh_link):
+        self.path = path
+        self.ssh_link = ssh_link
+    def __str__(self):
+        return "file {} at origin {} does not match its recorded sha256.".format(
+            self.path,
+            self.ssh_link)
+
 # SSH HANDLING --------------------------------------------------------------
 
 class SSH_ConnectionError_E(VitCustomException):
@@ -47,6 +56,37 @@ class SSH_ConnectionError_E(VitCustomException):
             str(self.exception)
         )
 
+class SSH_OperationInterrupted_E(VitCustomException):
+    def __init__(self, ssh_link, operation):
+        self.ssh_link = ssh_link
+        self.operation = operation
+    def __str__(self):
+        return "connection to {} lost during {}: it may or may not " \
+               "have been done on origin.".format(
+                    self.ssh_link,
+                    self.operation
+               )
+
+class SSH_ControlError_E(VitCustomException):
+    def __init__(self, ssh_link, error):
+        self.ssh_link = ssh_link
+        self.error = error
+    def __str__(self):
+        return "ssh control daemon error for {}: {}".format(
+            self.ssh_link,
+            self.error
+        )
+
+class SSH_TransferVerificationError_E(VitCustomException):
+    def __init__(self, ssh_link, path):
+        self.ssh_link = ssh_link
+        self.path = path
+    def __str__(self):
+        return "transfer of {} with {} is corrupted: checksums differ.".format(
+            self.path,
+            self.ssh_link
+        )
+
 class OriginNotFound_E(VitCustomException):
     def __init__(self, ssh_link):
         self.ssh_link = ssh_link
@@ -60,6 +100,56 @@ class RepoIsLock_E(VitCustomException):
         return "repository is currently updated by someone else. " \
                 "Try in a few seconds.".format(self.ssh_link)
 
+class Repo_FormatNotSupported_E(VitCustomException):
+    def __init__(self, path, version, supported_version):
+        self.path = path
+        self.version = version
+        self.supported_version = supported_version
+    def __str__(self):
+        return "repository {} uses format version {}, this version of vit " \
+               "supports up to {}: vit needs an update.".format(
+                    self.path,
+                    self.version,
+                    self.supported_version
+               )
+
+class Codec_NotAvailable_E(VitCustomException):
+    def __init__(self, codec, module):
+        self.codec = codec
+        self.module = module
+    def __str__(self):
+        return "metadata codec {} needs python module {}, install it " \
+               "with: pip install vit[{}]".format(
+                    self.codec,
+                    self.module,
+                    self.module
+               )
+
+# MIRROR ---------------------------------------------------------------------
+
+class Mirror_NotFound_E(VitCustomException):
+    def __init__(self, mirror_name):
+        self.mirror_name = mirror_name
+    def __str__(self):
+        return "no mirror named {} in repository config.".format(self.mirror_name)
+
+class Mirror_ConnectionError_E(VitCustomException):
+    def __init__(self, mirror_name):
+        self.mirror_name = mirror_name
+    def __str__(self):
+        return "could not connect to mirror {}.".format(self.mirror_name)
+
+class Mirror_ReplicationError_E(VitCustomException):
+    def __init__(self, mirror_name, paths):
+        self.mirror_name = mirror_name
+        self.paths = paths
+    def __str__(self):
+        return "{} files could not be replicated to mirror {}, " \
+                "replication will resume from the same point: {}".format(
+                    len(self.paths),
+                    self.mirror_name,
+                    ", ".join(sorted(self.paths)[:10]))
+
 # TEMPLATE -------------------------------------------------------------------
 
 class Template_AlreadyExists_E(VitCustomException):
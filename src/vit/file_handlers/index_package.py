@@ -17,7 +17,7 @@ class IndexPackage(JsonFile):
     def get_local_index_package(local_path):
         return IndexPackage(localize_path(local_path, constants.VIT_PACKAGES))
 
-    @JsonFile.file_read
+    @JsonFile.file_write
     def set_package(self, package_path, package_tree_file_path):
         self.data[package_path] = package_tree_file_path
 
@@ -22,7 +22,7 @@ class IndexTemplate(JsonFile):
     def __init__(self, path):
         super().__init__(path)
 
-    @JsonFile.file_read
+    @JsonFile.file_write
     def reference_new_template(self, template_id, template_filepath, sha256):
         self.data[template_id] = [template_filepath, sha256]
 
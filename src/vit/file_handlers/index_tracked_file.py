@@ -17,8 +17,9 @@ class IndexTrackedFile(JsonFile):
 
     def __init__(self, path):
         super().__init__(localize_path(path, constants.VIT_TRACK_FILE))
+        self.local_path = path
 
-    @JsonFile.file_read
+    @JsonFile.file_write
     def add_tracked_file(
             self, package_path,
             asset_name,
@@ -47,9 +48,9 @@ class IndexTrackedFile(JsonFile):
                 "origin_file_name": data_in["origin_file_name"],
                 "checkout_type":    data_in["checkout_type"],
                 "checkout_value":   data_in["checkout_value"],
-                "changes": not _is_same_sha(
+                "changes": _has_changed(
                     os.path.join(path, file_path),
-                    data_in["sha256"]
+                    data_in
                 )
             }
         return ret
@@ -71,17 +72,17 @@ class IndexTrackedFile(JsonFile):
             }
         return ret
 
-    @JsonFile.file_read
+    @JsonFile.file_write
     def clean(self):
         self.data = {}
 
-    @JsonFile.file_read
+    @JsonFile.file_write
     def remove_file(self, file_path):
         if file_path not in self.data:
             return
         self.data.pop(file_path, None)
 
-    @JsonFile.file_read
+    @JsonFile.file_write
     def set_new_original_file(self, checkout_path, new_original_file):
         data = self.data.get(checkout_path, None)
         if not data:
@@ -89,14 +90,30 @@ class IndexTrackedFile(JsonFile):
         data["origin_file_name"] = new_original_file
         return True
 
-    @JsonFile.file_read
+    @JsonFile.file_write
     def update_sha(self, checkout_path, sha256):
+        # sha256 has to be the one of the file as it is now: its size and
+        # mtime are stored so later change checks can skip hashing it.
         if not self.data.get(checkout_path, None):
             return False
+        file_stat = os.stat(localize_path(self.local_path, checkout_path))
         self.data[checkout_path]["sha256"] = sha256
+        self.data[checkout_path]["size"] = file_stat.st_size
+        self.data[checkout_path]["mtime_ns"] = file_stat.st_mtime_ns
         return True
 
 
+def _has_changed(file_complete_path, data):
+    # size and mtime are only stored along a sha256 computed from the file.
+    if data["sha256"] and data.get("size") is not None:
+        file_stat = os.stat(file_complete_path)
+        if file_stat.st_size != data["size"]:
+            return True
+        if file_stat.st_mtime_ns == data["mtime_ns"]:
+            return False
+    return not _is_same_sha(file_complete_path, data["sha256"])
+
+
 def _is_same_sha(file_complete_path, current_sha):
     if not current_sha:
         return False
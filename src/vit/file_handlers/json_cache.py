@@ -0,0 +1,96 @@
+import os
+import threading
+import collections
+
+# Process wide cache of parsed json files, shared by every JsonFile: a
+# package or asset tree is parsed once per command instead of once per
+# tracked file. An entry is valid as long as the file has the same
+# (mtime, size, inode), so files written by anyone else (downloads,
+# vit-serve, other processes) are parsed again.
+# Cached data is shared: JsonFile copies it before modifying it, and gives
+# copies out of the handler (JsonFile.get_data_copy). Writers invalidate
+# what they write (JsonFile, py_helpers.write_json, metadata downloads).
+# Bounded by the size of cached files, least recently used dropped first.
+
+DEFAULT_MAX_SIZE = 67108864
+
+
+def get_stamp(path):
+    file_stat = os.stat(path)
+    return file_stat.st_mtime_ns, file_stat.st_size, file_stat.st_ino
+
+
+class JsonCache(object):
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE):
+        self.max_size = max_size
+        self.size = 0
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path, stamp):
+        # None when not cached or file changed since.
+        path = os.path.abspath(path)
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is None or entry[0] != stamp:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(path)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, path, stamp, data):
+        path = os.path.abspath(path)
+        size = stamp[1]
+        with self.lock:
+            self._remove(path)
+            if size > self.max_size:
+                return
+            self.entries[path] = (stamp, data)
+            self.size += size
+            while self.size > self.max_size:
+                self._remove(next(iter(self.entries)))
+
+    def invalidate(self, path):
+        # path may be a directory: drops the files under it too.
+        path = os.path.abspath(path)
+        prefix = os.path.join(path, "")
+        with self.lock:
+            self._remove(path)
+            for key in [key for key in self.entries if key.startswith(prefix)]:
+                self._remove(key)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def set_max_size(self, max_size):
+        with self.lock:
+            self.max_size = max_size
+            while self.entries and self.size > self.max_size:
+                self._remove(next(iter(self.entries)))
+
+    def _remove(self, path):
+        entry = self.entries.pop(path, None)
+        if entry is not None:
+            self.size -= entry[0][1]
+
+
+_json_cache = JsonCache()
+
+
+def get_json_cache():
+    return _json_cache
+
+
+def copy_data(data):
+    # faster than copy.deepcopy for what json.load returns.
+    if isinstance(data, dict):
+        return {key: copy_data(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [copy_data(value) for value in data]
+    return data
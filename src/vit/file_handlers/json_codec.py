@@ -0,0 +1,87 @@
+import os
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+from vit import constants
+from vit.custom_exceptions import Codec_NotAvailable_E
+from vit.file_handlers import json_cache
+
+# Encodings of metadata files, picked by "metadata_codec" in RepoConfig
+# core:
+#   - json: compact json, through orjson when installed.
+#   - json_pretty: indented json, for config and debugging.
+#   - msgpack: binary, needs msgpack (optional dependency: vit[msgpack]).
+# Files are decoded whatever codec wrote them (msgpack files start with a
+# map header, json ones with "{"): the codec of a repository can change
+# at any time, files are converted as they are written.
+# A file is written with the codec of the repository holding it, so a
+# process can work on repositories using different codecs.
+
+JSON = "json"
+JSON_PRETTY = "json_pretty"
+MSGPACK = "msgpack"
+CODECS = (JSON, JSON_PRETTY, MSGPACK)
+DEFAULT_CODEC = JSON
+
+
+def get_repo_codec(path):
+    # "metadata_codec" of the repository holding path (under its .vit
+    # directory), DEFAULT_CODEC for a file out of any repository.
+    parts = os.path.abspath(path).split(os.sep)[:-1]
+    if constants.VIT_DIR not in parts:
+        return DEFAULT_CODEC
+    root = os.sep.join(parts[:len(parts) - 1 - parts[::-1].index(constants.VIT_DIR)])
+    config_path = os.path.join(root or os.sep, constants.VIT_CONFIG)
+    if not os.path.exists(config_path):
+        return DEFAULT_CODEC
+    cache = json_cache.get_json_cache()
+    stamp = json_cache.get_stamp(config_path)
+    config = cache.get(config_path, stamp)
+    if config is None:
+        with open(config_path, "rb") as f:
+            config = decode(f.read())
+        cache.put(config_path, stamp, config)
+    return config.get("core", {}).get("metadata_codec", DEFAULT_CODEC)
+
+
+def encode(data, codec=DEFAULT_CODEC):
+    if codec == JSON:
+        if orjson is not None:
+            return orjson.dumps(data)
+        return json.dumps(data, separators=(",", ":")).encode()
+    if codec == JSON_PRETTY:
+        return json.dumps(data, indent=4).encode()
+    if codec == MSGPACK:
+        check_codec_available(codec)
+        return msgpack.packb(data, use_bin_type=True)
+    raise ValueError("unknown metadata codec {}.".format(codec))
+
+
+def decode(raw):
+    if _is_msgpack(raw):
+        check_codec_available(MSGPACK)
+        return msgpack.unpackb(raw, raw=False)
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def check_codec_available(codec):
+    if codec == MSGPACK and msgpack is None:
+        raise Codec_NotAvailable_E(codec, "msgpack")
+
+
+def _is_msgpack(raw):
+    if not raw:
+        return False
+    first = raw[0]
+    return 0x80 <= first <= 0x8f or first in (0xde, 0xdf)
@@ -1,27 +1,95 @@
-import json
+import os
+import threading
+
+from vit.file_handlers import json_cache
+from vit.file_handlers import json_codec
+
+# one lock per file path: a file is read and written back by only one
+# thread of the process at a time.
+_path_locks = {}
+_path_locks_lock = threading.Lock()
+
+
+def get_path_lock(path):
+    path = os.path.abspath(path)
+    with _path_locks_lock:
+        if path not in _path_locks:
+            _path_locks[path] = threading.RLock()
+        return _path_locks[path]
 
 
 class JsonFile(object):
 
+    # file is only written back on exit of the context manager when data
+    # was modified: by a method decorated with file_write, or by code
+    # calling mark_dirty before changing data itself.
+    # data comes from the process wide json cache (see json_cache) and is
+    # only copied when about to be modified.
+
+    # None: codec of the repository holding the file (see json_codec).
+    codec = None
+    # True when changes can be journaled instead of rewriting the file.
+    journaled = False
+
     def __init__(self, path):
         self.path = path
         self.data = None
+        self.dirty = False
+        self.shared = False
 
     def read_file(self):
-        with open(self.path, "r") as f:
-            self.data = json.load(f)
+        cache = json_cache.get_json_cache()
+        stamp = json_cache.get_stamp(self.path)
+        data = cache.get(self.path, stamp)
+        if data is None:
+            with open(self.path, "rb") as f:
+                data = json_codec.decode(f.read())
+            cache.put(self.path, stamp, data)
+        self.data = data
+        self.shared = True
+        self.dirty = False
 
     def update_data(self):
-        with open(self.path, "w") as f:
-            json.dump(self.data, f, indent=4)
+        cache = json_cache.get_json_cache()
+        cache.invalidate(self.path)
+        with open(self.path, "wb") as f:
+            f.write(json_codec.encode(
+                self.data,
+                self.codec or json_codec.get_repo_codec(self.path)
+            ))
+        cache.put(self.path, json_cache.get_stamp(self.path), self.data)
+        self.shared = True
+        self.dirty = False
+
+    def get_data_copy(self):
+        # data given out of the handler: the caller may modify it without
+        # changing the cached one.
+        if self.data is None:
+            raise JsonFileDataAccessedBeforeRead(self.path)
+        return json_cache.copy_data(self.data)
+
+    def mark_dirty(self):
+        if self.shared:
+            self.data = json_cache.copy_data(self.data)
+            self.shared = False
+        self.dirty = True
 
     def __enter__(self):
-        self.read_file()
+        lock = get_path_lock(self.path)
+        lock.acquire()
+        try:
+            self.read_file()
+        except BaseException:
+            lock.release()
+            raise
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
-        if exc_value is None:
-            self.update_data()
+        try:
+            if exc_value is None and self.dirty:
+                self.update_data()
+        finally:
+            get_path_lock(self.path).release()
 
     @staticmethod
     def file_read(func):
@@ -31,6 +99,15 @@ class JsonFile(object):
             return func(self, *args, **kargs)
         return wrapper
 
+    @staticmethod
+    def file_write(func):
+        def wrapper(self, *args, **kargs):
+            if self.data is None:
+                raise JsonFileDataAccessedBeforeRead(self.path)
+            self.mark_dirty()
+            return func(self, *args, **kargs)
+        return wrapper
+
 class JsonFileDataAccessedBeforeRead(Exception):
     def __init__(self, path):
         self.path = path
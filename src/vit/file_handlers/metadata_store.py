@@ -0,0 +1,277 @@
+import os
+import json
+import sqlite3
+import contextlib
+
+from vit import constants
+from vit.custom_exceptions import *
+from vit.path_helpers import localize_path
+from vit.file_handlers import json_cache
+from vit.file_handlers import tree_journal
+from vit.file_handlers.index_package import IndexPackage
+from vit.file_handlers.tree_package import TreePackage
+from vit.file_handlers.tree_asset import TreeAsset
+
+# SQLite index of the local copy of origin metadata (packages.json and
+# tree files), enabled by "metadata_store": "sqlite" in RepoConfig core.
+# The json files stay the reference: the index is refreshed from them,
+# for trees whose file changed, and answers repo wide queries (listing,
+# status, hierarchy, assets by editor / branch / tag / date) in one query
+# instead of opening every tree file.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, ino INTEGER
+);
+CREATE TABLE IF NOT EXISTS packages (
+    package_path TEXT PRIMARY KEY, tree_path TEXT
+);
+CREATE TABLE IF NOT EXISTS assets (
+    package_path TEXT, asset_name TEXT, tree_path TEXT, data TEXT,
+    PRIMARY KEY (package_path, asset_name)
+);
+CREATE TABLE IF NOT EXISTS commits (
+    package_path TEXT, asset_name TEXT, filepath TEXT, parent TEXT,
+    date REAL, user TEXT, sha256 TEXT, message TEXT
+);
+CREATE INDEX IF NOT EXISTS commits_asset ON commits (package_path, asset_name);
+CREATE INDEX IF NOT EXISTS commits_date ON commits (date);
+CREATE INDEX IF NOT EXISTS commits_user ON commits (user);
+CREATE TABLE IF NOT EXISTS branches (
+    package_path TEXT, asset_name TEXT, branch TEXT, filepath TEXT
+);
+CREATE INDEX IF NOT EXISTS branches_asset ON branches (package_path, asset_name);
+CREATE INDEX IF NOT EXISTS branches_branch ON branches (branch);
+CREATE TABLE IF NOT EXISTS tags (
+    package_path TEXT, asset_name TEXT, tag TEXT, filepath TEXT
+);
+CREATE INDEX IF NOT EXISTS tags_asset ON tags (package_path, asset_name);
+CREATE INDEX IF NOT EXISTS tags_tag ON tags (tag);
+CREATE TABLE IF NOT EXISTS editors (
+    package_path TEXT, asset_name TEXT, filepath TEXT, user TEXT
+);
+CREATE INDEX IF NOT EXISTS editors_asset ON editors (package_path, asset_name);
+CREATE INDEX IF NOT EXISTS editors_user ON editors (user);
+"""
+
+ASSET_TABLES = ("commits", "branches", "tags", "editors")
+
+
+class MetadataStore(object):
+
+    def __init__(self, local_path):
+        self.local_path = local_path
+        self.path = localize_path(local_path, constants.VIT_METADATA_DB)
+        self.db = None
+
+    def __enter__(self):
+        self.db = sqlite3.connect(self.path)
+        self.db.executescript(SCHEMA)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if exc_value is None:
+                self.db.commit()
+            else:
+                self.db.rollback()
+        finally:
+            self.db.close()
+            self.db = None
+
+    # -- Filling from json files ---------------------------------------------
+
+    def refresh(self):
+        # returns number of asset trees indexed again.
+        with IndexPackage.get_local_index_package(self.local_path) as index_package:
+            packages = {
+                package_path: index_package.get_package_tree_file_path(package_path)
+                for package_path in index_package.list_packages()
+            }
+        self.db.execute("DELETE FROM packages")
+        self.db.executemany(
+            "INSERT INTO packages VALUES (?, ?)",
+            packages.items()
+        )
+
+        assets = {}
+        for package_path, tree_path in packages.items():
+            with TreePackage(localize_path(self.local_path, tree_path)) as tree_package:
+                for asset_name in tree_package.list_assets():
+                    assets[(package_path, asset_name)] = \
+                        tree_package.get_asset_tree_file_path(asset_name)
+
+        indexed = {
+            (package_path, asset_name): tree_path
+            for package_path, asset_name, tree_path in self.db.execute(
+                "SELECT package_path, asset_name, tree_path FROM assets"
+            )
+        }
+        for key in set(indexed) - set(assets):
+            self._remove_asset(*key)
+
+        refreshed = 0
+        for (package_path, asset_name), tree_path in assets.items():
+            stamps = self._get_file_stamps(tree_path)
+            if indexed.get((package_path, asset_name)) == tree_path and all(
+                    self._get_stamp(path) == stamp
+                    for path, stamp in stamps.items()):
+                continue
+            self._index_asset(package_path, asset_name, tree_path, stamps)
+            refreshed += 1
+        return refreshed
+
+    def _get_file_stamps(self, tree_path):
+        # of tree file and of its journal (None when it has none).
+        journal_path = tree_journal.get_journal_path(tree_path)
+        journal_path_local = localize_path(self.local_path, journal_path)
+        return {
+            tree_path: json_cache.get_stamp(
+                localize_path(self.local_path, tree_path)
+            ),
+            journal_path: json_cache.get_stamp(journal_path_local)
+            if os.path.exists(journal_path_local) else None
+        }
+
+    def _get_stamp(self, path):
+        row = self.db.execute(
+            "SELECT mtime_ns, size, ino FROM files WHERE path = ?", (path,)
+        ).fetchone()
+        return tuple(row) if row else None
+
+    def _remove_asset(self, package_path, asset_name):
+        row = self.db.execute(
+            "SELECT tree_path FROM assets WHERE package_path = ? AND asset_name = ?",
+            (package_path, asset_name)
+        ).fetchone()
+        if row:
+            self.db.execute(
+                "DELETE FROM files WHERE path IN (?, ?)",
+                (row[0], tree_journal.get_journal_path(row[0]))
+            )
+        for table in ("assets",) + ASSET_TABLES:
+            self.db.execute(
+                "DELETE FROM {} WHERE package_path = ? AND asset_name = ?".format(table),
+                (package_path, asset_name)
+            )
+
+    def _index_asset(self, package_path, asset_name, tree_path, stamps):
+        self._remove_asset(package_path, asset_name)
+        with TreeAsset(localize_path(self.local_path, tree_path)) as tree_asset:
+            data = tree_asset.data
+        key = (package_path, asset_name)
+        self.db.executemany(
+            "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+            ((path,) + stamp for path, stamp in stamps.items() if stamp)
+        )
+        self.db.execute(
+            "INSERT INTO assets VALUES (?, ?, ?, ?)",
+            key + (tree_path, json.dumps(data))
+        )
+        self.db.executemany(
+            "INSERT INTO commits VALUES (?, ?, ?, ?, ?, ?, ?, ?)", (
+                key + (
+                    filepath, commit["parent"], commit["date"],
+                    commit["user"], commit["sha256"], commit["message"]
+                )
+                for filepath, commit in data["commits"].items()
+            )
+        )
+        self.db.executemany(
+            "INSERT INTO branches VALUES (?, ?, ?, ?)",
+            (key + item for item in data["branches"].items())
+        )
+        self.db.executemany(
+            "INSERT INTO tags VALUES (?, ?, ?, ?)", (
+                key + (tag, tag_data if isinstance(tag_data, str) else tag_data["filepath"])
+                for tag, tag_data in data["tags"].items()
+            )
+        )
+        self.db.executemany(
+            "INSERT INTO editors VALUES (?, ?, ?, ?)",
+            (key + item for item in data["editors"].items())
+        )
+
+    # -- Queries -------------------------------------------------------------
+
+    def list_packages(self):
+        return tuple(row[0] for row in self.db.execute(
+            "SELECT package_path FROM packages ORDER BY package_path"
+        ))
+
+    def list_assets_by_package(self):
+        ret = {package_path: () for package_path in self.list_packages()}
+        for package_path, asset_name in self.db.execute(
+                "SELECT package_path, asset_name FROM assets "
+                "ORDER BY package_path, asset_name"):
+            ret[package_path] += (asset_name,)
+        return ret
+
+    def list_assets(self, package_path):
+        if self._get_package_tree_path(package_path) is None:
+            raise Package_NotFound_E(package_path)
+        return tuple(row[0] for row in self.db.execute(
+            "SELECT asset_name FROM assets WHERE package_path = ? "
+            "ORDER BY asset_name", (package_path,)
+        ))
+
+    def get_editor(self, package_path, asset_name, filepath):
+        if self._get_package_tree_path(package_path) is None:
+            raise Package_NotFound_E(package_path)
+        if self.db.execute(
+                "SELECT 1 FROM assets WHERE package_path = ? AND asset_name = ?",
+                (package_path, asset_name)).fetchone() is None:
+            raise Asset_NotFound_E(package_path, asset_name)
+        row = self.db.execute(
+            "SELECT user FROM editors WHERE package_path = ? "
+            "AND asset_name = ? AND filepath = ?",
+            (package_path, asset_name, filepath)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _get_package_tree_path(self, package_path):
+        row = self.db.execute(
+            "SELECT tree_path FROM packages WHERE package_path = ?",
+            (package_path,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def get_all_assets_data(self):
+        ret = {package_path: {} for package_path in self.list_packages()}
+        for package_path, asset_name, data in self.db.execute(
+                "SELECT package_path, asset_name, data FROM assets"):
+            ret[package_path][asset_name] = json.loads(data)
+        return ret
+
+    def find_assets(self, editor=None, branch=None, tag=None, since=None):
+        # (package_path, asset_name) of assets matching all given criteria:
+        # edited by editor, having branch or tag, committed to after since.
+        query = "SELECT package_path, asset_name FROM assets"
+        filters, args = [], []
+        for table, column, value in (
+                ("editors", "user", editor),
+                ("branches", "branch", branch),
+                ("tags", "tag", tag),
+                ("commits", "date", since)):
+            if value is None:
+                continue
+            operator = ">=" if column == "date" else "="
+            filters.append(
+                "(package_path, asset_name) IN (SELECT package_path, asset_name "
+                "FROM {} WHERE {} {} ?)".format(table, column, operator)
+            )
+            args.append(value)
+        if filters:
+            query += " WHERE " + " AND ".join(filters)
+        query += " ORDER BY package_path, asset_name"
+        return tuple(tuple(row) for row in self.db.execute(query, args))
+
+
+@contextlib.contextmanager
+def get_local_metadata_store(local_path):
+    # refreshed before answering: json files are also written by commit,
+    # checkout, tag... or downloaded from origin, only trees whose stamp
+    # changed since are indexed again.
+    with MetadataStore(local_path) as metadata_store:
+        metadata_store.refresh()
+        yield metadata_store
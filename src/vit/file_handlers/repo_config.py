@@ -1,12 +1,107 @@
+import os
 import time
 from vit import constants
 from vit import py_helpers
 from vit import path_helpers
+from vit.custom_exceptions import Repo_FormatNotSupported_E
 from vit.file_handlers.json_file import JsonFile
+from vit.file_handlers import json_codec
+
+# "repository_format_version" of RepoConfig core, raised when a repository
+# starts using what older versions of vit can not read:
+#   0: json metadata files.
+#   1: metadata files may be msgpack encoded (see json_codec), tree asset
+#      files may have a journal (see tree_journal).
+# vit refuses repositories of a higher version than it supports.
+REPOSITORY_FORMAT_VERSION = 1
+FORMAT_VERSION_MSGPACK = 1
+FORMAT_VERSION_TREE_JOURNAL = 1
+
+# tunables of the connection to origin, can be overridden per repository
+# in the "connection" section of the config file.
+DEFAULT_CONNECTION_CONFIG = {
+    # file transport: "scp" or "sftp".
+    "transport": "scp",
+    "sftp_window_size": 67108864,
+    "sftp_max_packet_size": 32768,
+    "sftp_buffer_size": 1048576,
+    "sftp_prefetch_requests": 64,
+    # files bigger than threshold are split in chunks sent over several
+    # streams in parallel, each stream over its own ssh connection.
+    "chunked_threshold": 268435456,
+    "chunked_streams": 4,
+    "chunked_chunk_size": 16777216,
+    # commits and checkouts bigger than threshold are first written to a
+    # partial file in stage dir and can be resumed when interrupted.
+    "resumable_threshold": 67108864,
+    # seconds after which partial transfers and checkpoints left by
+    # abandoned transfers are removed, locally and on origin.
+    "stale_transfer_max_age": 604800,
+    # commits bigger than threshold are sent as a delta against the commit
+    # they are based on, rebuilt on origin by the vit_delta command. Needs
+    # vit installed on origin: off by default. Whole file is sent when it
+    # is not available.
+    "delta_transfer": False,
+    "delta_threshold": 16777216,
+    "vit_delta": "vit-delta",
+    # on the wire compression: "auto" (decided per file from its extension
+    # or from the compression ratio of a sample), "always" or "never".
+    "compression": "auto",
+    "compression_level": 3,
+    "compression_probe_size": 65536,
+    "compression_max_ratio": 0.9,
+    "compression_extensions": [
+        ".ma", ".json", ".obj", ".usda", ".nk", ".txt", ".xml", ".mtlx"
+    ],
+    "no_compression_extensions": [
+        ".exr", ".mov", ".mp4", ".png", ".jpg", ".jpeg", ".tif", ".tiff",
+        ".zip", ".gz", ".7z", ".tx"
+    ],
+    # seconds between ssh keepalive packets, 0 to disable.
+    "keepalive_interval": 30,
+    # when the connection drops, it is opened again and idempotent
+    # operations (gets, existence checks...) are retried up to
+    # retry_attempts times, waiting retry_backoff seconds doubled at each
+    # attempt. Other operations fail with SSH_OperationInterrupted_E.
+    "retry_attempts": 3,
+    "retry_backoff": 1,
+    "retry_max_backoff": 30,
+    # seconds existence of paths on origin is cached for, 0 to disable.
+    # The origin lock is never answered from cache.
+    "origin_cache_ttl": 10,
+    # transfers with origin run at most that many at once for all vit
+    # processes of the user, interactive ones (commit, checkout) before
+    # background ones (fetch), whichever process they come from.
+    "max_concurrent_transfers": 4,
+    # bandwidth caps in bytes per second, 0 for no limit: per origin, for
+    # all origins and for background transfers, shared by all vit processes
+    # of the user.
+    "bandwidth_limit": 0,
+    "global_bandwidth_limit": 0,
+    "background_bandwidth_limit": 0,
+    # command running vit-serve on origin (eg: "vit-serve"), metadata
+    # updates are applied by it in one request. Needs vit installed on
+    # origin: empty by default, metadata updated from local stage.
+    "vit_serve": "",
+    # commit files are read from the nearest of origin and its mirrors
+    # (see "mirrors"), measured with mirror_probe_samples commands and
+    # measured again after mirror_probe_ttl seconds.
+    "mirror_reads": True,
+    "mirror_probe_samples": 3,
+    "mirror_probe_ttl": 600,
+}
 
 
 class RepoConfig(JsonFile):
 
+    # edited by hand.
+    codec = json_codec.JSON_PRETTY
+
+    # settings of this copy only, kept when config of origin is fetched.
+    # Others (format, codec, mirrors...) come from origin.
+    local_keys = ("current_copy", "origin_link", "connection", "last_fetch_time")
+    local_core_keys = ("metadata_store",)
+
     def __init__(self, path):
         super().__init__(
             path_helpers.localize_path(path, constants.VIT_CONFIG)
@@ -22,6 +117,18 @@ class RepoConfig(JsonFile):
             path_helpers.localize_path(path, constants.VIT_CONFIG), {
                 "core": {
                     "repository_format_version": repository_format_version,
+                    # local metadata queried from "json" files only, or
+                    # also from a "sqlite" index filled by fetch.
+                    "metadata_store": "json",
+                    # encoding of metadata files: "json" (compact),
+                    # "msgpack", or "json_pretty" to read them when
+                    # debugging. See json_codec.
+                    "metadata_codec": json_codec.DEFAULT_CODEC,
+                    # tree asset changes are appended to a journal of the
+                    # file on origin (see tree_journal), folded in the file
+                    # once it has more records. 0 to always write the whole
+                    # file. See set_tree_journal_max_records.
+                    "tree_journal_max_records": 0,
                 },
                 "origin_config": {
                 },
@@ -34,11 +141,15 @@ class RepoConfig(JsonFile):
                     "path": None,
                     "username": None,
                 },
+                "mirrors": {
+                },
+                "connection": dict(DEFAULT_CONNECTION_CONFIG),
                 "last_fetch_time": None
-            }
+            },
+            codec=RepoConfig.codec
         )
 
-    @JsonFile.file_read
+    @JsonFile.file_write
     def edit_on_clone(self, origin_host, origin_path, username, is_remote):
         updated_data = {
             "origin_config": {
@@ -56,16 +167,103 @@ class RepoConfig(JsonFile):
         }
         self.data.update(**updated_data)
 
+    @JsonFile.file_write
+    def keep_local_settings(self, local_data):
+        # data is config of origin: local settings are put back from
+        # local_data, config of this copy before the fetch.
+        for key in self.local_keys:
+            if key in local_data:
+                self.data[key] = local_data[key]
+        local_core = local_data.get("core", {})
+        for key in self.local_core_keys:
+            if key in local_core:
+                self.data["core"][key] = local_core[key]
+
     @JsonFile.file_read
     def get_origin_ssh_info(self):
         config_data = self.data["origin_link"]
         return config_data["host"], config_data["path"], config_data["username"]
 
+    @JsonFile.file_read
+    def get_connection_config(self):
+        config = dict(DEFAULT_CONNECTION_CONFIG)
+        config.update(self.data.get("connection", {}))
+        return config
+
+    @JsonFile.file_write
+    def set_connection_config(self, **connection_config):
+        self.data.setdefault("connection", {}).update(connection_config)
+
+    @JsonFile.file_read
+    def get_mirrors(self):
+        # {name: {"host": ..., "path": ..., "username": ...}}, read only
+        # copies of origin.
+        return dict(self.data.get("mirrors", {}))
+
+    @JsonFile.file_write
+    def add_mirror(self, name, host, path, username):
+        self.data.setdefault("mirrors", {})[name] = {
+            "host": host,
+            "path": path,
+            "username": username
+        }
+
+    @JsonFile.file_write
+    def remove_mirror(self, name):
+        return self.data.get("mirrors", {}).pop(name, None) is not None
+
+    @JsonFile.file_read
+    def get_metadata_store(self):
+        return self.data["core"].get("metadata_store", "json")
+
+    @JsonFile.file_write
+    def set_metadata_store(self, metadata_store):
+        self.data["core"]["metadata_store"] = metadata_store
+
+    @JsonFile.file_read
+    def get_metadata_codec(self):
+        return self.data["core"].get("metadata_codec", json_codec.DEFAULT_CODEC)
+
+    @JsonFile.file_write
+    def set_metadata_codec(self, metadata_codec):
+        if metadata_codec not in json_codec.CODECS:
+            raise ValueError("unknown metadata codec {}.".format(metadata_codec))
+        json_codec.check_codec_available(metadata_codec)
+        self.data["core"]["metadata_codec"] = metadata_codec
+        if metadata_codec == json_codec.MSGPACK:
+            self.require_format_version(FORMAT_VERSION_MSGPACK)
+
+    @JsonFile.file_read
+    def get_tree_journal_max_records(self):
+        if self.get_repository_format_version() < FORMAT_VERSION_TREE_JOURNAL:
+            return 0
+        return self.data["core"].get("tree_journal_max_records", 0)
+
+    @JsonFile.file_write
+    def set_tree_journal_max_records(self, max_records):
+        # to set on origin: journals are only read by vit versions
+        # supporting FORMAT_VERSION_TREE_JOURNAL.
+        self.data["core"]["tree_journal_max_records"] = max_records
+        if max_records:
+            self.require_format_version(FORMAT_VERSION_TREE_JOURNAL)
+
+    @JsonFile.file_read
+    def get_repository_format_version(self):
+        return self.data["core"].get("repository_format_version", 0)
+
+    @JsonFile.file_write
+    def require_format_version(self, version):
+        core = self.data["core"]
+        core["repository_format_version"] = max(
+            version,
+            core.get("repository_format_version", 0)
+        )
+
     @JsonFile.file_read
     def get_last_fetch_time(self):
         return self.data["last_fetch_time"]
 
-    @JsonFile.file_read
+    @JsonFile.file_write
     def update_last_fetch_time(self):
         self.data["last_fetch_time"] = time.time()
 
@@ -76,6 +274,50 @@ def get_origin_ssh_info(path):
     return ret
 
 
+def get_connection_config(path):
+    if not os.path.exists(path_helpers.localize_path(path, constants.VIT_CONFIG)):
+        return dict(DEFAULT_CONNECTION_CONFIG)
+    with RepoConfig(path) as repo_config:
+        ret = repo_config.get_connection_config()
+    return ret
+
+
+def get_mirrors(path):
+    with RepoConfig(path) as repo_config:
+        ret = repo_config.get_mirrors()
+    return ret
+
+
+def get_metadata_codec(path):
+    if not os.path.exists(path_helpers.localize_path(path, constants.VIT_CONFIG)):
+        return json_codec.DEFAULT_CODEC
+    with RepoConfig(path) as repo_config:
+        ret = repo_config.get_metadata_codec()
+    return ret
+
+
+def get_tree_journal_max_records(path):
+    with RepoConfig(path) as repo_config:
+        ret = repo_config.get_tree_journal_max_records()
+    return ret
+
+
+def check_repository_format(path):
+    # raises when path uses a format this version of vit can not read.
+    if not os.path.exists(path_helpers.localize_path(path, constants.VIT_CONFIG)):
+        return
+    with RepoConfig(path) as repo_config:
+        version = repo_config.get_repository_format_version()
+    if version > REPOSITORY_FORMAT_VERSION:
+        raise Repo_FormatNotSupported_E(path, version, REPOSITORY_FORMAT_VERSION)
+
+
+def check_uses_metadata_store(path):
+    with RepoConfig(path) as repo_config:
+        ret = repo_config.get_metadata_store() == "sqlite"
+    return ret
+
+
 def check_is_working_copy_remote(path):
     with RepoConfig(path) as repo_config:
         ret = repo_config.data["current_copy"]["is_working_copy_remote"]
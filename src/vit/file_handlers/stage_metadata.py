@@ -1,5 +1,7 @@
 import os
 
+from vit.file_handlers import tree_journal
+
 
 class StagedMetadata(object):
 
@@ -20,8 +22,9 @@ class StagedMetadata(object):
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
-        if exc_value is None:
+        if exc_value is None and self.file_handler.dirty:
             self.file_handler.update_data()
 
     def remove_stage_metadata(self):
         os.remove(self.stage_file_path_local)
+        tree_journal.remove_journal(self.stage_file_path_local)
@@ -0,0 +1,41 @@
+from vit import py_helpers
+from vit.file_handlers.json_file import JsonFile
+
+
+class TransferCheckpoint(JsonFile):
+
+    # manifest of an interrupted transfer: byte ranges already written to
+    # the partial file, valid as long as the source file did not change.
+
+    @staticmethod
+    def create_file(path, src, dst, size, mtime, chunk_size):
+        data = {
+            "src": src,
+            "dst": dst,
+            "size": size,
+            "mtime": mtime,
+            "chunk_size": chunk_size,
+            "done": []
+        }
+        return py_helpers.write_json(path, data)
+
+    def __init__(self, path):
+        super().__init__(path)
+
+    @JsonFile.file_read
+    def check_matches(self, src, dst, size, mtime, chunk_size):
+        return (
+            self.data["src"] == src and
+            self.data["dst"] == dst and
+            self.data["size"] == size and
+            self.data["mtime"] == mtime and
+            self.data["chunk_size"] == chunk_size
+        )
+
+    @JsonFile.file_read
+    def get_done_offsets(self):
+        return set(self.data["done"])
+
+    @JsonFile.file_write
+    def add_done_offset(self, offset):
+        self.data["done"].append(offset)
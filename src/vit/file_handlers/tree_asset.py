@@ -1,5 +1,6 @@
 from vit import py_helpers
 from vit.file_handlers.json_file import JsonFile
+from vit.file_handlers import tree_journal
 from vit.cli import logger
 
 DEFAULT_BRANCH = "base"
@@ -7,6 +8,25 @@ DEFAULT_BRANCH = "base"
 
 class TreeAsset(JsonFile):
 
+    # methods that can be applied as typed operations, eg: by vit-serve.
+    operations = (
+        "add_commit",
+        "set_branch",
+        "set_editor",
+        "remove_editor",
+        "become_editor",
+        "add_tag_lightweight",
+        "add_tag_lightweight_from_branch",
+        "add_tag_annotated",
+        "set_last_auto_tag",
+        "update_on_commit",
+        "create_new_branch_from_commit",
+    )
+
+    # operations can be appended to a journal of the file instead of
+    # rewriting it (see tree_journal).
+    journaled = True
+
     @staticmethod
     def create_file(file_path, asset_name):
         data = {
@@ -22,12 +42,28 @@ class TreeAsset(JsonFile):
 
     def __init__(self, file_path):
         super().__init__(file_path)
+        self.journal_records = 0
+
+    def read_file(self):
+        super().read_file()
+        records = tree_journal.read_journal(self.path)
+        for operation, kargs in records:
+            self.apply_operation(operation, kargs)
+        # data is what file and journal hold: nothing to write back.
+        self.journal_records = len(records)
+        self.dirty = False
+
+    def update_data(self):
+        super().update_data()
+        # journal is folded in the file written.
+        tree_journal.truncate_journal(self.path)
+        self.journal_records = 0
 
     # Services to use within context manager ---------------------------------
 
     # -- base methods.
 
-    @JsonFile.file_read
+    @JsonFile.file_write
     def add_commit(self, filepath, parent, date, user, sha256, commit_mess):
         self.data["commits"].update({
             filepath: {
@@ -52,7 +88,7 @@ class TreeAsset(JsonFile):
     def list_commits(self):
         return tuple(self.data["commits"])
 
-    @JsonFile.file_read
+    @JsonFile.file_write
     def set_branch(self, branch, filepath):
         self.data["branches"][branch] = filepath
 
@@ -60,16 +96,34 @@ class TreeAsset(JsonFile):
     def list_branches(self):
         return tuple(self.data["branches"].keys())
 
+    # tags are never overwritten: adding one returns False when a tag of
+    # that name already exists, True otherwise.
+
     @JsonFile.file_read
     def add_tag_lightweight(self, filepath, tagname):
+        if tagname in self.data["tags"]:
+            return False
+        self.mark_dirty()
         self.data["tags"][tagname] = filepath
+        return True
+
+    @JsonFile.file_read
+    def add_tag_lightweight_from_branch(self, branch, tagname):
+        # None when branch does not exist.
+        filepath = self.get_branch_current_file(branch)
+        if not filepath:
+            return None
+        return self.add_tag_lightweight(filepath, tagname)
 
     @JsonFile.file_read
     def add_tag_annotated(
             self, parent, filepath,
             tagname, date, user,
             message):
+        if tagname in self.data["tags"]:
+            return False
         sha256 = self.get_commit_sha256(parent)
+        self.mark_dirty()
         self.data["tags"][tagname] = {
             "parent": parent,
             "date": date,
@@ -78,6 +132,7 @@ class TreeAsset(JsonFile):
             "message": message,
             "filepath": filepath
         }
+        return True
 
     @JsonFile.file_read
     def get_tag(self, tagname):
@@ -98,7 +153,7 @@ class TreeAsset(JsonFile):
     def get_last_auto_tag(self, branch):
         return self.data["last_auto_tags"].get(branch, None)
 
-    @JsonFile.file_read
+    @JsonFile.file_write
     def set_last_auto_tag(self, branch, tag_name):
         self.data["last_auto_tags"][branch] = tag_name
 
@@ -122,15 +177,24 @@ class TreeAsset(JsonFile):
     def get_editor(self, filepath):
         return self.data["editors"].get(filepath, None)
 
-    @JsonFile.file_read
+    @JsonFile.file_write
     def set_editor(self, filepath, user):
         self.data["editors"][filepath] = user
 
-    @JsonFile.file_read
+    @JsonFile.file_write
     def remove_editor(self, filepath):
         if filepath in self.data["editors"]:
             self.data["editors"].pop(filepath)
 
+    @JsonFile.file_read
+    def become_editor(self, filepath, user):
+        # returns the editor of the file: user unless already edited.
+        editor = self.get_editor(filepath)
+        if editor and editor != user:
+            return editor
+        self.set_editor(filepath, user)
+        return user
+
     @JsonFile.file_read
     def get_commit_sha256(self, filepath):
         return self.data["commits"][filepath]["sha256"]
@@ -148,12 +212,13 @@ class TreeAsset(JsonFile):
 
     # -- on event methods.
 
-    @JsonFile.file_read
+    @JsonFile.file_write
     def update_on_commit(
             self, filepath, new_filepath,
             parent, date, user, commit_mess,
-            keep_editable=False):
-        sha256 = py_helpers.calculate_file_sha(filepath)
+            keep_editable=False, sha256=None):
+        if sha256 is None:
+            sha256 = py_helpers.calculate_file_sha(filepath)
         self.add_commit(new_filepath, parent, date, user, sha256, commit_mess)
         for branch, f in self.data["branches"].items():
             if f == parent:
@@ -199,10 +264,16 @@ class TreeAsset(JsonFile):
     def get_branch_current_file(self, branch):
         return self.data["branches"].get(branch, None)
 
-    @JsonFile.file_read
+    @JsonFile.file_write
     def set_root_commit(self, commit):
         self.data["root_commit"] = commit
 
     @JsonFile.file_read
     def get_root_commit(self):
         return self.data["root_commit"]
+
+    @JsonFile.file_read
+    def apply_operation(self, operation, kargs):
+        if operation not in self.operations:
+            raise ValueError("unknown operation {}.".format(operation))
+        return getattr(self, operation)(**kargs)
@@ -0,0 +1,71 @@
+import os
+import json
+
+# Append only journal of a tree asset file, next to it: one json record
+# [operation, kargs] per line, typed operations of TreeAsset (commit,
+# branch move, editor change, tag...) applied after the file was written.
+# Reading a tree asset replays its journal over the file (the snapshot):
+# a metadata change on origin appends a few hundred bytes instead of
+# rewriting and uploading the whole tree.
+# Opt in per repository ("tree_journal_max_records" of RepoConfig core,
+# which raises its format version): vit versions reading whole files only
+# would miss journaled operations.
+# Compaction writes the snapshot with the journal folded in, then empties
+# the journal. Journals are emptied, never removed, so copies of origin
+# (clones, mirrors) see the change. Operations only set values: replaying
+# records already folded in the snapshot (compaction interrupted before
+# emptying the journal) leaves data unchanged.
+
+JOURNAL_EXTENSION = ".journal"
+
+
+def get_journal_path(file_path):
+    return file_path + JOURNAL_EXTENSION
+
+
+def read_journal(file_path):
+    # records of the journal of file_path, empty when there is none.
+    journal_path = get_journal_path(file_path)
+    if not os.path.exists(journal_path):
+        return []
+    with open(journal_path) as f:
+        lines = [line for line in f.read().split("\n") if line.strip()]
+    records = []
+    for line in lines:
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            # record partially written by an interrupted append: its
+            # writer failed, operations were not applied.
+            continue
+    return records
+
+
+def format_records(operations):
+    return "".join(
+        json.dumps([operation, kargs], separators=(",", ":")) + "\n"
+        for operation, kargs in operations
+    )
+
+
+def append_journal(file_path, operations):
+    records = format_records(operations).encode()
+    with open(get_journal_path(file_path), "ab+") as f:
+        # after a partially written record, start a new line.
+        if f.tell():
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                records = b"\n" + records
+        f.write(records)
+
+
+def truncate_journal(file_path):
+    journal_path = get_journal_path(file_path)
+    if os.path.exists(journal_path) and os.path.getsize(journal_path):
+        open(journal_path, "w").close()
+
+
+def remove_journal(file_path):
+    journal_path = get_journal_path(file_path)
+    if os.path.exists(journal_path):
+        os.remove(journal_path)
@@ -29,6 +29,6 @@ class TreePackage(JsonFile):
     def get_asset_tree_file_path(self, asset_name):
         return self.data["assets"].get(asset_name, None)
 
-    @JsonFile.file_read
+    @JsonFile.file_write
     def set_asset(self, asset_name, asset_tree_file_path):
         self.data["assets"][asset_name] = asset_tree_file_path
@@ -1,27 +1,33 @@
 import os
-import json
 import hashlib
 
+from vit.file_handlers import json_cache
+from vit.file_handlers import json_codec
+
 # Dealing with json files -----------------------------------------------------
 
 
-def write_json(json_file_path, data):
+def write_json(json_file_path, data, codec=None):
+    # codec: see json_codec, codec of the repository holding the file
+    # when None.
     if not os.path.exists(os.path.dirname(json_file_path)):
         return False
-    with open(json_file_path, "w") as f:
-        json.dump(data, f, indent=4)
+    json_cache.get_json_cache().invalidate(json_file_path)
+    with open(json_file_path, "wb") as f:
+        f.write(json_codec.encode(
+            data,
+            codec or json_codec.get_repo_codec(json_file_path)
+        ))
     return True
 
 
 def update_json(json_file_path, data):
     if not os.path.exists(os.path.dirname(json_file_path)):
         return False
-    with open(json_file_path, "r") as f:
-        current_data = json.load(f)
+    with open(json_file_path, "rb") as f:
+        current_data = json_codec.decode(f.read())
     current_data.update(data)
-    with open(json_file_path, "w") as f:
-        json.dump(current_data, f, indent=4)
-    return True
+    return write_json(json_file_path, current_data)
 
 
 def create_empty_json(path):
@@ -29,8 +35,8 @@ def create_empty_json(path):
 
 
 def get_json_main_key(json_file_path, key):
-    with open(json_file_path, "r") as f:
-        data = json.load(f)
+    with open(json_file_path, "rb") as f:
+        data = json_codec.decode(f.read())
     return data.get(key, None)
 
 
@@ -38,10 +44,40 @@ def get_json_main_key(json_file_path, key):
 
 
 def calculate_file_sha(filepath):
+    sha = hashlib.sha256()
     with open(filepath, "rb") as f:
-        b = f.read()
-        readable_hash = hashlib.sha256(b).hexdigest()
-    return readable_hash
+        while True:
+            b = f.read(1048576)
+            if not b:
+                break
+            sha.update(b)
+    return sha.hexdigest()
+
+
+class HashingReader(object):
+
+    # file object wrapper computing sha256 of what is read through it, for
+    # files read once from start to end.
+
+    def __init__(self, file_object):
+        self.file_object = file_object
+        self.sha = hashlib.sha256()
+
+    def read(self, size=-1):
+        data = self.file_object.read(size)
+        self.sha.update(data)
+        return data
+
+    def hexdigest(self):
+        return self.sha.hexdigest()
+
+
+def get_dir_size(path):
+    return sum(
+        os.path.getsize(os.path.join(dir_path, file_name))
+        for dir_path, _, file_names in os.walk(path)
+        for file_name in file_names
+    )
 
 
 def get_current_path():
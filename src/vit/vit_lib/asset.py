@@ -10,6 +10,7 @@ from vit.vit_lib.misc import (
 )
 from vit.custom_exceptions import *
 from vit.file_handlers import repo_config
+from vit.file_handlers.metadata_store import get_local_metadata_store
 from vit.file_handlers.index_template import IndexTemplate
 from vit.file_handlers.tree_asset import TreeAsset
 from vit.file_handlers.tree_package import TreePackage
@@ -86,6 +87,9 @@ def create_asset_from_template(
 
 
 def list_assets(local_path, package_path):
+    if repo_config.check_uses_metadata_store(local_path):
+        with get_local_metadata_store(local_path) as metadata_store:
+            return metadata_store.list_assets(package_path)
     tree_package, _ = tree_func.get_local_tree_package(
         local_path,
         package_path
@@ -102,7 +106,7 @@ def get_asset_tree_info(local_path, package_path, asset_name):
         asset_name
     )
     with tree:
-        ret = tree.data
+        ret = tree.get_data_copy()
     return ret
 
 # - PRIVATE ------------------------------------------------------------------
@@ -173,9 +177,6 @@ def _update_origin_metadata(
             tree_asset.set_branch("base", asset_file_path)
             tree_asset.set_root_commit(asset_file_path)
 
-        vit_connection.create_dir_at_origin_if_not_exists(
-            os.path.dirname(tree_asset_path)
-        )
         vit_connection.create_dir_at_origin_if_not_exists(
             os.path.dirname(tree_asset_path)
         )
@@ -0,0 +1,53 @@
+from vit.vit_lib import checkout, commit, tag
+
+# awaitable counterparts of vit_lib workflows: each one runs in the
+# executor of an AsyncVitConnection, several of them can be fanned out
+# concurrently on the same connection.
+
+
+async def checkout_asset_by_branch(async_vit_connection, *args, **kargs):
+    return await async_vit_connection.run_workflow(
+        checkout.checkout_asset_by_branch, *args, **kargs
+    )
+
+
+async def checkout_asset_by_commit(async_vit_connection, *args, **kargs):
+    return await async_vit_connection.run_workflow(
+        checkout.checkout_asset_by_commit, *args, **kargs
+    )
+
+
+async def checkout_asset_by_tag(async_vit_connection, *args, **kargs):
+    return await async_vit_connection.run_workflow(
+        checkout.checkout_asset_by_tag, *args, **kargs
+    )
+
+
+async def commit_file(async_vit_connection, *args, **kargs):
+    return await async_vit_connection.run_workflow(
+        commit.commit_file, *args, **kargs
+    )
+
+
+async def release_editable(async_vit_connection, *args, **kargs):
+    return await async_vit_connection.run_workflow(
+        commit.release_editable, *args, **kargs
+    )
+
+
+async def create_tag_light_from_branch(async_vit_connection, *args, **kargs):
+    return await async_vit_connection.run_workflow(
+        tag.create_tag_light_from_branch, *args, **kargs
+    )
+
+
+async def create_tag_annotated_from_branch(async_vit_connection, *args, **kargs):
+    return await async_vit_connection.run_workflow(
+        tag.create_tag_annotated_from_branch, *args, **kargs
+    )
+
+
+async def create_tag_auto_from_branch(async_vit_connection, *args, **kargs):
+    return await async_vit_connection.run_workflow(
+        tag.create_tag_auto_from_branch, *args, **kargs
+    )
@@ -54,23 +54,17 @@ def create_branch(
 
     # 3. update origin metadatas
 
-    with vit_connection.lock_manager:
-        vit_connection.update_staged_metadata(staged_asset_tree)
-
-        with staged_asset_tree.file_handler as tree_asset:
-
-            if tree_asset.get_branch_current_file(branch_new):
-                raise Branch_AlreadyExist_E(asset_name, branch_new)
-
-            tree_asset.create_new_branch_from_commit(
-                new_file_path,
-                commit_parent,
-                branch_new,
-                time.time(),
-                user
-            )
-
-        vit_connection.put_metadata_to_origin(staged_asset_tree)
+    is_created, = vit_connection.apply_metadata_operations(staged_asset_tree, (
+        ("create_new_branch_from_commit", {
+            "filepath": new_file_path,
+            "commit_parent": commit_parent,
+            "branch_new": branch_new,
+            "date": time.time(),
+            "user": user
+        }),
+    ))
+    if not is_created:
+        raise Branch_AlreadyExist_E(asset_name, branch_new)
 
     # 4. misc.
 
@@ -1,5 +1,6 @@
 import os
 from vit import path_helpers
+from vit.vit_lib import verify
 from vit.vit_lib.misc import (
     tree_fetch,
     file_name_generation,
@@ -17,34 +18,34 @@ from vit.file_handlers.index_tracked_file import IndexTrackedFile
 
 def checkout_asset_by_branch(
         vit_connection, package_path, asset_name,
-        branch, editable=False, rebase=False):
+        branch, editable=False, rebase=False, verify_file=False):
     checkout = Checkout(CheckoutType.branch, branch)
     return _checkout_asset(
         vit_connection,
         package_path, asset_name,
-        checkout, editable, rebase
+        checkout, editable, rebase, verify_file
     )
 
 
 def checkout_asset_by_commit(
         vit_connection, package_path, asset_name,
-        commit_file_name, rebase=False):
+        commit_file_name, rebase=False, verify_file=False):
     checkout = Checkout(CheckoutType.commit, commit_file_name)
     return _checkout_asset(
         vit_connection,
         package_path, asset_name,
-        checkout, rebase=rebase
+        checkout, rebase=rebase, verify_file=verify_file
     )
 
 
 def checkout_asset_by_tag(
         vit_connection, package_path,
-        asset_name, tag, rebase=False):
+        asset_name, tag, rebase=False, verify_file=False):
     checkout = Checkout(CheckoutType.tag, tag)
     return _checkout_asset(
         vit_connection,
         package_path, asset_name,
-        checkout, rebase=rebase
+        checkout, rebase=rebase, verify_file=verify_file
     )
 
 # -----------------------------------------------------------------------------
@@ -55,7 +56,8 @@ def _checkout_asset(
         package_path, asset_name,
         checkout,
         editable=False,
-        rebase=False):
+        rebase=False,
+        verify_file=False):
 
     # 1. checks and gather infos.
 
@@ -69,7 +71,7 @@ def _checkout_asset(
 
         asset_origin_path, sha256 = _get_asset_origin_path(
             vit_connection, tree_asset,
-            asset_name, checkout
+            asset_name, checkout, verify_file
         )
 
         if editable:
@@ -99,7 +101,7 @@ def _checkout_asset(
     # 2. data transfer.
 
     if not os.path.exists(package_local_path):
-        os.makedirs(package_local_path)
+        os.makedirs(package_local_path, exist_ok=True)
 
     if rebase or editable or not os.path.exists(asset_checkout_path_local):
         do_copy_origin_file = True
@@ -116,14 +118,11 @@ def _checkout_asset(
     # 3. update origin metadatas
 
     if editable:
-        with vit_connection.lock_manager:
-            vit_connection.update_staged_metadata(staged_asset_tree)
-            with staged_asset_tree.file_handler as tree_asset:
-                tree_func.become_editor_of_asset(
-                    tree_asset, asset_name,
-                    asset_origin_path, user
-                )
-            vit_connection.put_metadata_to_origin(staged_asset_tree)
+        editor, = vit_connection.apply_metadata_operations(staged_asset_tree, (
+            ("become_editor", {"filepath": asset_origin_path, "user": user}),
+        ))
+        if editor != user:
+            raise Asset_AlreadyEdited_E(asset_name, editor)
 
     # 4. update local metadatas.
 
@@ -142,7 +141,7 @@ def _checkout_asset(
 
 def _get_asset_origin_path(
         vit_connection, tree_asset,
-        asset_name, checkout):
+        asset_name, checkout, verify_file=False):
     func, exception = {
         CheckoutType.tag: (TreeAsset.get_tag, Tag_NotFound_E),
         CheckoutType.branch: (TreeAsset.get_branch_current_file, Branch_NotFound_E),
@@ -158,7 +157,9 @@ def _get_asset_origin_path(
         asset_file_path = asset_file_path.get("filepath")
     else: 
         sha256 = tree_asset.get_commit_sha256(asset_file_path)
-    if not vit_connection.exists_on_origin(asset_file_path):
+    if verify_file:
+        verify.check_file_at_origin(vit_connection, asset_file_path, sha256)
+    elif not vit_connection.exists_on_origin(asset_file_path):
         raise Path_FileNotFoundAtOrigin_E(
             asset_file_path,
             vit_connection.ssh_link
@@ -1,6 +1,8 @@
+import os
+import json
 import time
-from vit import path_helpers
 from vit import py_helpers
+from vit import path_helpers
 from vit.vit_lib.misc import (
     tree_func, tree_fetch,
     file_name_generation,
@@ -35,40 +37,42 @@ def commit_file(
             checkout_file
         )
 
-    new_file_path = file_name_generation.generate_unique_asset_file_path(
-        file_track_data["package_path"],
-        file_track_data["asset_name"],
-        py_helpers.get_file_extension(checkout_file)
+    new_file_path = _get_new_file_path(
+        vit_connection.local_path,
+        checkout_file,
+        file_track_data
     )
 
     # 2. data transfer.
 
-    vit_connection.put_commit_to_origin(
+    # sha256 is computed while sending the file, and reused below.
+    sha256 = vit_connection.put_commit_to_origin(
         checkout_file, new_file_path,
-        keep_file, keep_editable
+        keep_file, keep_editable,
+        delta_base=file_track_data["origin_file_name"]
     )
 
     # 3. update origin metadatas.
 
-    with vit_connection.lock_manager:
-        vit_connection.update_staged_metadata(staged_tree_asset)
-        with staged_tree_asset.file_handler as tree_asset:
-            tree_asset.update_on_commit(
-                path_helpers.localize_path(
-                    vit_connection.local_path,
-                    checkout_file),
-                new_file_path,
-                file_track_data["origin_file_name"],
-                time.time(),
-                user,
-                commit_mess,
-                keep_editable
-            )
-
-        vit_connection.put_metadata_to_origin(staged_tree_asset)
+    vit_connection.apply_metadata_operations(staged_tree_asset, (
+        ("update_on_commit", {
+            "filepath": checkout_file,
+            "new_filepath": new_file_path,
+            "parent": file_track_data["origin_file_name"],
+            "date": time.time(),
+            "user": user,
+            "commit_mess": commit_mess,
+            "keep_editable": keep_editable,
+            "sha256": sha256
+        }),
+    ))
 
     # 4. update local metadatas.
 
+    os.remove(path_helpers.localize_path(
+        vit_connection.local_path,
+        file_name_generation.generate_stage_commit_file_path(checkout_file)
+    ))
     if not keep_file:
         tracked_file_func.remove_tracked_file(
             vit_connection.local_path,
@@ -77,7 +81,9 @@ def commit_file(
     else:
         tracked_file_func.update_tracked_file(
             vit_connection.local_path,
-            checkout_file, new_file_path)
+            checkout_file, new_file_path,
+            sha256=sha256
+        )
     return new_file_path
 
 # FIXME: does this need to be done offline? with local cache like other listing?
@@ -125,6 +131,37 @@ def release_editable(vit_connection, checkout_file):
 
 # -----------------------------------------------------------------------------
 
+def _get_new_file_path(local_path, checkout_file, file_track_data):
+    # origin path of the commit is kept in stage until the commit is done:
+    # when the commit of an unchanged file is retried, it is sent to the
+    # same path and an interrupted upload is resumed.
+    pending_commit_path = path_helpers.localize_path(
+        local_path,
+        file_name_generation.generate_stage_commit_file_path(checkout_file)
+    )
+    file_stat = os.stat(path_helpers.localize_path(local_path, checkout_file))
+    pending_commit = {
+        "origin_file_name": file_track_data["origin_file_name"],
+        "size": file_stat.st_size,
+        "mtime_ns": file_stat.st_mtime_ns
+    }
+    if os.path.exists(pending_commit_path):
+        with open(pending_commit_path) as f:
+            previous_commit = json.load(f)
+        new_file_path = previous_commit.pop("new_file_path", None)
+        if new_file_path and previous_commit == pending_commit:
+            return new_file_path
+    new_file_path = file_name_generation.generate_unique_asset_file_path(
+        file_track_data["package_path"],
+        file_track_data["asset_name"],
+        py_helpers.get_file_extension(checkout_file)
+    )
+    pending_commit["new_file_path"] = new_file_path
+    with open(pending_commit_path, "w") as f:
+        json.dump(pending_commit, f)
+    return new_file_path
+
+
 def _raise_if_file_is_not_to_commit(file_track_data, tree_asset_open,
                                    user, checkout_file):
     if tree_asset_open.get_editor(file_track_data["origin_file_name"]) != user:
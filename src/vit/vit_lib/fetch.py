@@ -6,38 +6,67 @@ from vit.file_handlers.index_package import IndexPackage
 from vit.file_handlers.tree_package import TreePackage
 from vit.file_handlers.tree_asset import TreeAsset
 from vit.file_handlers.repo_config import RepoConfig
+from vit.file_handlers import repo_config as repo_config_func
+from vit.file_handlers.metadata_store import (
+    MetadataStore, get_local_metadata_store
+)
+from vit.connection import transfer_scheduler
 
 
 def fetch(vit_connection):
-    vit_connection.get_metadata_from_origin(constants.VIT_DIR, recursive=True)
+    # config of origin comes along the metadata (mirrors, format...), with
+    # the settings of this copy put back.
     with RepoConfig(vit_connection.local_path) as repo_config:
+        local_config = repo_config.get_data_copy()
+    with transfer_scheduler.transfer_priority(
+            transfer_scheduler.PRIORITY_BACKGROUND):
+        vit_connection.get_metadata_from_origin(constants.VIT_DIR, recursive=True)
+    with RepoConfig(vit_connection.local_path) as repo_config:
+        repo_config.keep_local_settings(local_config)
         repo_config.update_last_fetch_time()
+    if repo_config_func.check_uses_metadata_store(vit_connection.local_path):
+        with MetadataStore(vit_connection.local_path) as metadata_store:
+            metadata_store.refresh()
 
 
 def get_repo_hierarchy(local_path):
     ret = {}
+    if repo_config_func.check_uses_metadata_store(local_path):
+        with get_local_metadata_store(local_path) as metadata_store:
+            assets_by_package = metadata_store.list_assets_by_package()
+        for package_path in sorted(assets_by_package):
+            _get_hierarchy_package(ret, package_path)["assets"] = \
+                assets_by_package[package_path]
+        return ret
     with IndexPackage.get_local_index_package(local_path) as package_index:
         package_path_list = sorted(package_index.list_packages())
     for package_path in package_path_list:
-        single_package_list = package_path.split("/")
-        dict_to_update = ret
-        for i in range(len(single_package_list) - 1):
-            dict_to_update = dict_to_update[single_package_list[i]]["packages"]
-        dict_to_update[single_package_list[-1]] = {
-            "packages": {},
-            "assets": {}
-        }
-
+        package_dict = _get_hierarchy_package(ret, package_path)
         tree_package_path = path_helpers.localize_path(
             local_path,
             file_name_generation.generate_package_tree_file_path(package_path)
         )
         with TreePackage(tree_package_path) as tree_package:
-            dict_to_update[single_package_list[-1]]["assets"] = tree_package.list_assets()
+            package_dict["assets"] = tree_package.list_assets()
     return ret
 
 
+def _get_hierarchy_package(hierarchy, package_path):
+    single_package_list = package_path.split("/")
+    dict_to_update = hierarchy
+    for i in range(len(single_package_list) - 1):
+        dict_to_update = dict_to_update[single_package_list[i]]["packages"]
+    dict_to_update[single_package_list[-1]] = {
+        "packages": {},
+        "assets": {}
+    }
+    return dict_to_update[single_package_list[-1]]
+
+
 def get_all_assets_info(local_path):
+    if repo_config_func.check_uses_metadata_store(local_path):
+        with get_local_metadata_store(local_path) as metadata_store:
+            return metadata_store.get_all_assets_data()
     ret = {}
     with IndexPackage.get_local_index_package(local_path) as package_index:
         package_list = package_index.list_packages()
@@ -57,7 +86,7 @@ def get_all_assets_info(local_path):
                     )
                 )
                 with TreeAsset(asset_tree_path) as tree_asset:
-                    ret[package_path][asset] = tree_asset.data
+                    ret[package_path][asset] = tree_asset.get_data_copy()
     return ret
 
 
@@ -1,5 +1,7 @@
 from vit.custom_exceptions import *
 from vit.file_handlers.repo_config import RepoConfig
+from vit.file_handlers import repo_config as repo_config_func
+from vit.file_handlers.metadata_store import get_local_metadata_store
 from vit.connection.connection_utils import ssh_connect_auto
 from vit.vit_lib.misc import (
     tree_func,
@@ -35,11 +37,10 @@ def get_info_from_all_ref_files(local_path):
         "readonly": {}
     }
 
+    editable_files = _get_editable_files(local_path, tracked_info, user)
     for file_path, data in tracked_info.items():
 
-        editable = is_file_editable_by_user(
-            local_path, data, user
-        )
+        editable = editable_files[file_path]
 
         dict_key = "editable" if editable else "readonly"
         dict_level1 = output_dict[dict_key]
@@ -65,7 +66,7 @@ def get_info_from_all_ref_files(local_path):
 
 def get_vit_config(local_path):
     with RepoConfig(local_path) as config:
-        data = config.data
+        data = config.get_data_copy()
     return data
 
 
@@ -73,8 +74,9 @@ def get_track_info_neovit(local_path):
     with RepoConfig(local_path) as repo_config:
         _, _, user = repo_config.get_origin_ssh_info()
     tracked_info = tracked_file_func.get_all_files_track_data(local_path)
+    editable_files = _get_editable_files(local_path, tracked_info, user)
     for file, data in tracked_info.items():
-        data["editable"] = is_file_editable_by_user(local_path, data, user)
+        data["editable"] = editable_files[file]
     return tracked_info
 
 
@@ -87,3 +89,21 @@ def is_file_editable_by_user(local_path, file_track_data, user):
     with tree_asset:
         ret = tree_asset.get_editor(file_track_data["origin_file_name"]) == user
     return ret
+
+
+def _get_editable_files(local_path, tracked_info, user):
+    # editors of all tracked files in one store, when the repository has one.
+    if not repo_config_func.check_uses_metadata_store(local_path):
+        return {
+            file_path: is_file_editable_by_user(local_path, data, user)
+            for file_path, data in tracked_info.items()
+        }
+    with get_local_metadata_store(local_path) as metadata_store:
+        return {
+            file_path: metadata_store.get_editor(
+                data["package_path"],
+                data["asset_name"],
+                data["origin_file_name"]
+            ) == user
+            for file_path, data in tracked_info.items()
+        }
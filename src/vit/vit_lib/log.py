@@ -42,5 +42,5 @@ def _get_tree_data(local_path, package_path, asset_name):
     tree_asset, _ = tree_func.get_local_tree_asset(
             local_path, package_path, asset_name)
     with tree_asset:
-        tree_data = tree_asset.data
+        tree_data = tree_asset.get_data_copy()
     return tree_data
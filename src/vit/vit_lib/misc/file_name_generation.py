@@ -2,6 +2,7 @@ from vit import py_helpers
 from vit import constants
 import uuid
 import time
+import hashlib
 import os
 
 
@@ -61,10 +62,63 @@ def generate_stage_metadata_file_path(metadata_file_path):
     file_name, extension = py_helpers.get_file_name_and_extension_from_path(
         metadata_file_path
     )
-    file_name = "{}_{}{}".format(
+    file_name = "{}_{}_{}{}".format(
         file_name,
         str(int(time.time())),
+        uuid.uuid4().hex[:8],
         extension
     )
     file_path = os.path.join(constants.VIT_STAGE_DIR, file_name)
     return file_path
+
+
+def generate_stage_transfer_file_paths(src, dst):
+    transfer_id = _get_transfer_id(src, dst)
+    partial_file_path = os.path.join(
+        constants.VIT_STAGE_DIR,
+        "{}.part".format(transfer_id)
+    )
+    checkpoint_file_path = os.path.join(
+        constants.VIT_STAGE_DIR,
+        "{}.checkpoint.json".format(transfer_id)
+    )
+    return partial_file_path, checkpoint_file_path
+
+
+def generate_origin_transfer_file_path(src, dst):
+    return os.path.join(
+        constants.VIT_TRANSFER_DIR,
+        "{}.part".format(_get_transfer_id(src, dst))
+    )
+
+
+def generate_stage_commit_file_path(checkout_file):
+    return os.path.join(
+        constants.VIT_STAGE_DIR,
+        "{}.commit.json".format(hashlib.sha1(checkout_file.encode()).hexdigest())
+    )
+
+
+def generate_stage_delta_file_path(dst):
+    return os.path.join(
+        constants.VIT_STAGE_DIR,
+        "{}.delta".format(hashlib.sha1(dst.encode()).hexdigest())
+    )
+
+
+def generate_origin_delta_file_path(dst):
+    return os.path.join(
+        constants.VIT_TRANSFER_DIR,
+        "{}.delta".format(hashlib.sha1(dst.encode()).hexdigest())
+    )
+
+
+def generate_stage_replication_file_path(path):
+    return os.path.join(
+        constants.VIT_STAGE_DIR,
+        "{}.replica".format(hashlib.sha1(path.encode()).hexdigest())
+    )
+
+
+def _get_transfer_id(src, dst):
+    return hashlib.sha1("{}:{}".format(src, dst).encode()).hexdigest()
@@ -29,10 +29,13 @@ def remove_tracked_file(local_path, checkout_file):
 
 def update_tracked_file(
         local_path, checkout_file,
-        new_original_file, update_sha=True):
-    sha256 = py_helpers.calculate_file_sha(
-        path_helpers.localize_path(local_path, checkout_file)
-    )
+        new_original_file, update_sha=True,
+        sha256=None):
+    # sha256: of the file if already known.
+    if update_sha and sha256 is None:
+        sha256 = py_helpers.calculate_file_sha(
+            path_helpers.localize_path(local_path, checkout_file)
+        )
     with IndexTrackedFile(local_path) as index_tracked_file:
         index_tracked_file.set_new_original_file(
             checkout_file,
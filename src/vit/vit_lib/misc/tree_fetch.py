@@ -70,5 +70,9 @@ def _fetch_tree_asset_path_from_package_and_asset_name(
         package_path,
         asset_name
     )
-    vit_connection.get_metadata_from_origin(tree_asset_path, recursive=True)
+    vit_connection.get_metadata_from_origin(
+        tree_asset_path,
+        recursive=True,
+        journal=True
+    )
     return tree_asset_path
@@ -31,7 +31,10 @@ def create_package(vit_connection, package_path, force_subtree=False):
                 package_asset_file_name
             )
 
-            if not vit_connection.exists_on_origin(origin_parent_dir):
+            exists_on_origin = vit_connection.exists_many_on_origin(
+                (origin_parent_dir, origin_package_dir)
+            )
+            if not exists_on_origin[origin_parent_dir]:
                 if not force_subtree:
                     raise Path_ParentDirNotExist_E(origin_parent_dir)
 
@@ -44,7 +47,8 @@ def create_package(vit_connection, package_path, force_subtree=False):
                 package_name=package_path
             )
 
-            vit_connection.create_dir_at_origin_if_not_exists(origin_package_dir)
+            if not exists_on_origin[origin_package_dir]:
+                vit_connection.create_dirs_at_origin_if_not_exist(origin_package_dir)
 
         vit_connection.put_metadata_to_origin(staged_index)
         vit_connection.put_metadata_to_origin(stage_package, recursive=True)
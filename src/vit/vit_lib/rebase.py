@@ -1,6 +1,7 @@
 import time
 from vit.file_handlers.tree_asset import TreeAsset
 from vit import py_helpers
+from vit.vit_lib import verify
 from vit.vit_lib.misc import (
     tree_fetch,
     file_name_generation,
@@ -12,7 +13,8 @@ from vit.file_handlers import repo_config
 def rebase_from_commit(
         vit_connection,
         package_path, asset_name,
-        branch, commit_to_rebase_from):
+        branch, commit_to_rebase_from,
+        verify_commit=False):
 
     # 1. checks and gather infos.
 
@@ -37,7 +39,13 @@ def rebase_from_commit(
             if not commit_to_rebase_from_data:
                 raise Commit_NotFound_E(asset_name, commit_to_rebase_from)
 
-            if not vit_connection.exists_on_origin(commit_to_rebase_from):
+            if verify_commit:
+                verify.check_file_at_origin(
+                    vit_connection,
+                    commit_to_rebase_from,
+                    commit_to_rebase_from_data["sha256"]
+                )
+            elif not vit_connection.exists_on_origin(commit_to_rebase_from):
                 raise Path_FileNotFoundAtOrigin_E(
                     commit_to_rebase_from,
                     vit_connection.ssh_link
@@ -0,0 +1,110 @@
+import os
+import concurrent.futures
+
+from vit import constants
+from vit.custom_exceptions import *
+from vit.connection import transfer_scheduler
+
+import logging
+log = logging.getLogger()
+
+# Incremental copy of origin to one of its mirrors. Commit files are
+# immutable: only files changed since the last replication are listed and
+# copied. The cursor (origin time when the last complete replication
+# started) is stored on the mirror, and only moved forward once every file
+# has been copied.
+
+MAX_WORKERS = 8
+
+
+def replicate(vit_connection, mirror_name, max_workers=MAX_WORKERS):
+    # returns number of files copied to the mirror.
+    mirror = vit_connection.open_mirror(mirror_name)
+    try:
+        return _replicate(vit_connection, mirror, max_workers)
+    finally:
+        mirror.close()
+
+
+def _replicate(vit_connection, mirror, max_workers):
+    cursor = mirror.read_json(constants.VIT_REPLICATION_CURSOR) or {}
+    since = cursor.get("origin_time")
+
+    # 1. everything changed since last replication, without locking origin:
+    # commit files first, so mirror metadata never refers to a commit file
+    # the mirror does not have.
+    copied = _list_changed(vit_connection, mirror, since)[1]
+    data, metadata = _split_metadata(copied)
+    _copy_files(vit_connection, mirror, data, max_workers)
+    _copy_files(vit_connection, mirror, metadata, max_workers)
+
+    # 2. origin locked, what changed during step 1.
+    with vit_connection.lock_manager:
+        origin_time, changed = _list_changed(vit_connection, mirror, since)
+        changed = {
+            path: stat for path, stat in changed.items()
+            if copied.get(path) != stat
+        }
+        data, metadata = _split_metadata(changed)
+        _copy_files(vit_connection, mirror, data, max_workers)
+        _copy_files(vit_connection, mirror, metadata, max_workers)
+
+    mirror.write_json(constants.VIT_REPLICATION_CURSOR, {
+        "origin_time": origin_time,
+        "origin": vit_connection.ssh_link
+    })
+    log.debug("{} files replicated to mirror {}.".format(
+        len(copied) + len(changed), mirror.name
+    ))
+    return len(copied) + len(changed)
+
+
+def _list_changed(vit_connection, mirror, since):
+    origin_time, changed = vit_connection.list_changed_at_origin(since)
+    if origin_time is None:
+        raise Mirror_ReplicationError_E(mirror.name, [vit_connection.origin_path])
+    return origin_time, {
+        path: stat for path, stat in changed.items()
+        if not _is_excluded(path)
+    }
+
+
+def _is_excluded(path):
+    return path in (constants.VIT_LOCK_FILE, constants.VIT_REPLICATION_CURSOR) \
+        or path.startswith(constants.VIT_STAGE_DIR + "/") \
+        or path.startswith(constants.VIT_TRANSFER_DIR + "/")
+
+
+def _split_metadata(files):
+    data, metadata = {}, {}
+    for path, stat in files.items():
+        if path.startswith(constants.VIT_DIR + "/"):
+            metadata[path] = stat
+        else:
+            data[path] = stat
+    return data, metadata
+
+
+def _copy_files(vit_connection, mirror, files, max_workers):
+    if not files:
+        return
+    if not mirror.mkdirs(os.path.dirname(path) or "." for path in files):
+        raise Mirror_ReplicationError_E(mirror.name, list(files))
+
+    def copy(path):
+        # priority is per thread.
+        with transfer_scheduler.transfer_priority(
+                transfer_scheduler.PRIORITY_BACKGROUND):
+            vit_connection.copy_file_to_mirror(mirror, path)
+
+    failed = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+        futures = {executor.submit(copy, path): path for path in files}
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                log.warning("could not replicate {}: {}".format(futures[future], e))
+                failed.append(futures[future])
+    if failed:
+        raise Mirror_ReplicationError_E(mirror.name, failed)
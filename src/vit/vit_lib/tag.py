@@ -25,18 +25,14 @@ def create_tag_light_from_branch(
         vit_connection, package_path, asset_name
     )
 
-    # 2. update origin metadata
-    with vit_connection.lock_manager:
-
-        with staged_asset_tree.file_handler as tree_asset:
-            branch_ref = tree_asset.get_branch_current_file(branch)
-            if not branch_ref:
-                raise Branch_NotFound_E(asset_name, branch)
-            if tree_asset.get_tag(tag_name):
-                raise Tag_AlreadyExists_E(asset_name, tag_name)
-            tree_asset.add_tag_lightweight(branch_ref, tag_name)
-
-        vit_connection.put_metadata_to_origin(staged_asset_tree)
+    # 2. update origin metadata: branch and tag checked under origin lock.
+    created, = vit_connection.apply_metadata_operations(staged_asset_tree, (
+        ("add_tag_lightweight_from_branch", {"branch": branch, "tagname": tag_name}),
+    ))
+    if created is None:
+        raise Branch_NotFound_E(asset_name, branch)
+    if not created:
+        raise Tag_AlreadyExists_E(asset_name, tag_name)
 
 
 def create_tag_annotated_from_branch(
@@ -72,15 +68,18 @@ def create_tag_annotated_from_branch(
     vit_connection.copy_file_at_origin(asset_parent_path, new_file_path)
 
     # 3. update origin metadata
-    with vit_connection.lock_manager:
-        with staged_asset_tree.file_handler as tree_asset:
-            tree_asset.add_tag_annotated(
-                asset_parent_path,
-                new_file_path,
-                tag_name, time.time(),
-                user, message
-            )
-        vit_connection.put_metadata_to_origin(staged_asset_tree)
+    created, = vit_connection.apply_metadata_operations(staged_asset_tree, (
+        ("add_tag_annotated", {
+            "parent": asset_parent_path,
+            "filepath": new_file_path,
+            "tagname": tag_name,
+            "date": time.time(),
+            "user": user,
+            "message": message
+        }),
+    ))
+    if not created:
+        raise Tag_AlreadyExists_E(asset_name, tag_name)
 
 
 def create_tag_auto_from_branch(
@@ -132,17 +131,19 @@ def create_tag_auto_from_branch(
     vit_connection.copy_file_at_origin(asset_parent_path, new_file_path)
 
     # 3. update origin metadata
-    with vit_connection.lock_manager:
-        vit_connection.update_staged_metadata(staged_asset_tree)
-        with staged_asset_tree.file_handler as tree_asset:
-            tree_asset.set_last_auto_tag(branch, tag_name)
-            tree_asset.add_tag_annotated(
-                asset_parent_path,
-                new_file_path,
-                tag_name, time.time(),
-                user, message
-            )
-        vit_connection.put_metadata_to_origin(staged_asset_tree)
+    _, created = vit_connection.apply_metadata_operations(staged_asset_tree, (
+        ("set_last_auto_tag", {"branch": branch, "tag_name": tag_name}),
+        ("add_tag_annotated", {
+            "parent": asset_parent_path,
+            "filepath": new_file_path,
+            "tagname": tag_name,
+            "date": time.time(),
+            "user": user,
+            "message": message
+        }),
+    ))
+    if not created:
+        raise Tag_AlreadyExists_E(asset_name, tag_name)
 
 
 def list_tags(local_path, package_path, asset_name):
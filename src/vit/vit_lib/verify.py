@@ -0,0 +1,46 @@
+from vit.vit_lib.misc import tree_fetch
+from vit.custom_exceptions import *
+
+FILE_OK = "ok"
+FILE_MISSING = "missing"
+FILE_CORRUPTED = "corrupted"
+FILE_NOT_VERIFIED = "not verified"
+
+
+def verify_asset(vit_connection, package_path, asset_name):
+    # checks every commit of an asset against its recorded sha256, files
+    # are hashed on origin: nothing is downloaded.
+    tree_asset, _ = tree_fetch.fetch_up_to_date_tree_asset(
+        vit_connection, package_path, asset_name
+    )
+    with tree_asset:
+        commits = {
+            commit: tree_asset.get_commit_sha256(commit)
+            for commit in tree_asset.list_commits()
+        }
+    origin_sha256s = vit_connection.hash_many_on_origin(commits)
+    not_hashed = [c for c, sha256 in origin_sha256s.items() if sha256 is None]
+    exists = vit_connection.exists_many_on_origin(not_hashed, use_cache=False)
+    ret = {}
+    for commit, sha256 in commits.items():
+        origin_sha256 = origin_sha256s[commit]
+        if origin_sha256 is None:
+            ret[commit] = FILE_NOT_VERIFIED if exists[commit] else FILE_MISSING
+        elif sha256 is None:
+            ret[commit] = FILE_NOT_VERIFIED
+        elif sha256 != origin_sha256:
+            ret[commit] = FILE_CORRUPTED
+        else:
+            ret[commit] = FILE_OK
+    return ret
+
+
+def check_file_at_origin(vit_connection, file_path, sha256):
+    # same cost as an existence check: one command on origin.
+    origin_sha256 = vit_connection.hash_on_origin(file_path)
+    if origin_sha256 is None:
+        if not vit_connection.exists_on_origin(file_path, use_cache=False):
+            raise Path_FileNotFoundAtOrigin_E(file_path, vit_connection.ssh_link)
+        return
+    if sha256 is not None and sha256 != origin_sha256:
+        raise Path_FileCorruptedAtOrigin_E(file_path, vit_connection.ssh_link)
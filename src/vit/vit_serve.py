@@ -0,0 +1,129 @@
+import os
+import sys
+import json
+import time
+
+from vit import constants
+from vit import py_helpers
+from vit.custom_exceptions import Repo_FormatNotSupported_E
+from vit.file_handlers import repo_config
+from vit.file_handlers import tree_journal
+from vit.file_handlers.tree_asset import TreeAsset
+
+# Helper run on origin host, reached through the ssh channel: applies typed
+# operations to a metadata file under the repository lock and answers with
+# the updated data. A metadata change costs one request instead of lock,
+# download, edit, upload and download again. Changes to tree assets are
+# appended to their journal when the repository uses one (see tree_journal).
+#
+# One json request per line on stdin, one json reply per line on stdout.
+# request: {
+#   "root": origin repository path,
+#   "path": metadata file path relative to root,
+#   "handler": file handler type, eg: "TreeAsset",
+#   "operations": [[method name, kargs], ...]
+# }
+# reply: {"status": "ok", "results": [...], "data": {...}}
+#        {"status": "locked"} or {"status": "error", "error": "..."}
+
+FILE_HANDLERS = {
+    "TreeAsset": TreeAsset,
+}
+LOCK_TIMEOUT = 5
+LOCK_RETRY_DELAY = 0.05
+
+
+def handle_request(request):
+    handler_type = FILE_HANDLERS.get(request.get("handler"))
+    if handler_type is None:
+        return _error("unknown file handler {}.".format(request.get("handler")))
+    root = request["root"]
+    file_path = os.path.join(root, request["path"])
+    lock_path = os.path.join(root, constants.VIT_LOCK_FILE)
+    if not _is_in_root(root, file_path):
+        return _error("{} is outside of {}.".format(request["path"], root))
+    if not os.path.exists(file_path):
+        return _error("{} not found.".format(file_path))
+    try:
+        repo_config.check_repository_format(root)
+    except Repo_FormatNotSupported_E as e:
+        return _error(str(e))
+    if not _acquire_lock(lock_path):
+        return {"status": "locked"}
+    try:
+        file_handler = handler_type(file_path)
+        file_handler.read_file()
+        results = [
+            file_handler.apply_operation(operation, kargs)
+            for operation, kargs in request["operations"]
+        ]
+        if file_handler.dirty:
+            _write_changes(root, file_path, file_handler, request["operations"])
+    except Exception as e:
+        return _error(str(e))
+    finally:
+        os.remove(lock_path)
+    return {"status": "ok", "results": results, "data": file_handler.data}
+
+
+def _acquire_lock(lock_path):
+    # O_EXCL: unlike 'touch', fails if someone else holds the lock.
+    time_limit = time.time() + LOCK_TIMEOUT
+    while True:
+        try:
+            os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            if time.time() > time_limit:
+                return False
+            time.sleep(LOCK_RETRY_DELAY)
+
+
+def _is_in_root(root, file_path):
+    # requests name files of the repository only, links resolved.
+    root = os.path.realpath(root)
+    file_path = os.path.realpath(file_path)
+    return file_path != root and os.path.commonpath((root, file_path)) == root
+
+
+def _write_changes(root, file_path, file_handler, operations):
+    # appended to the journal of the file while it is short enough, else
+    # the file is written with the journal folded in (compaction).
+    if file_handler.journaled:
+        max_records = repo_config.get_tree_journal_max_records(root)
+        if file_handler.journal_records + len(operations) <= max_records:
+            tree_journal.append_journal(file_path, operations)
+            return
+    _write_atomic(
+        file_path, file_handler.data,
+        repo_config.get_metadata_codec(root)
+    )
+    tree_journal.truncate_journal(file_path)
+
+
+def _write_atomic(file_path, data, codec):
+    tmp_path = "{}.{}.tmp".format(file_path, os.getpid())
+    py_helpers.write_json(tmp_path, data, codec)
+    os.replace(tmp_path, file_path)
+
+
+def _error(message):
+    return {"status": "error", "error": message}
+
+
+def main():
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            reply = _error(str(e))
+        else:
+            reply = handle_request(request)
+        sys.stdout.write(json.dumps(reply) + "\n")
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 import os
 import shutil
 import subprocess
+from vit import py_helpers
 
 import logging
 log = logging.getLogger()
@@ -8,6 +9,11 @@ log = logging.getLogger()
 
 class FakeSSHConnection(object):
 
+    control_methods = (
+        "put", "get",
+        "exec_command", "exec_command_output",
+    )
+
     def __init__(self, server, user):
         self.server = server
         self.user = user
@@ -16,6 +22,8 @@ class FakeSSHConnection(object):
             self.server
         )
         self._open = False
+        self.password = None
+        self.transfer_config = {}
 
     def __enter__(self):
         status = self.open_connection()
@@ -24,7 +32,7 @@ class FakeSSHConnection(object):
     def __exit__(self, t, value, traceback):
         self.close_connection()
 
-    def open_connection(self):
+    def open_connection(self, password=None):
         self._open = True
         return True
 
@@ -32,19 +40,28 @@ class FakeSSHConnection(object):
         self._open = False
         return
 
+    def configure_transfer(self, **transfer_config):
+        self.transfer_config = transfer_config
+
     def check_is_open(self):
         return self._open
 
     def check_is_lock(self):
         return self.exists(self.lock_file_path)
 
-    def put(self, src, dst, recursive=False):
-        self.copy(src, dst, recursive)
+    def put(
+            self, src, dst, recursive=False, resume=None,
+            priority=None, on_bytes=None, retry=False, hash_src=False):
+        self.copy(src, dst, recursive, on_bytes)
+        if hash_src:
+            return py_helpers.calculate_file_sha(src)
 
-    def get(self, src, dst, recursive=False):
-        self.copy(src, dst, recursive)
+    def get(
+            self, src, dst, recursive=False, resume=None,
+            priority=None, on_bytes=None, retry=False):
+        self.copy(src, dst, recursive, on_bytes)
 
-    def copy(self, src, dst, recursive=False):
+    def copy(self, src, dst, recursive=False, on_bytes=None):
         if recursive:
             parent_dir = os.path.dirname(dst)
             if not os.path.exists(parent_dir):
@@ -53,8 +70,10 @@ class FakeSSHConnection(object):
             shutil.copytree(src, dst, dirs_exist_ok=True)
         else:
             shutil.copy(src, dst)
+            if on_bytes is not None:
+                on_bytes(os.path.getsize(dst))
 
-    def exec_command(self, cmd):
+    def exec_command(self, cmd, retry=False):
         cmd_as_list = [i for i in cmd.split(" ") if i != ""]
         try:
             ret = subprocess.run(cmd_as_list, capture_output=True)
@@ -62,3 +81,7 @@ class FakeSSHConnection(object):
             return False
         else:
             return not bool(ret.returncode)
+
+    def exec_command_output(self, cmd, retry=False):
+        ret = subprocess.run(["sh", "-c", cmd], capture_output=True)
+        return not bool(ret.returncode), ret.stdout.decode().splitlines()
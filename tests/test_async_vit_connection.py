@@ -0,0 +1,85 @@
+import os
+import asyncio
+import unittest
+
+from vit.vit_lib import asset, async_workflows
+from vit.vit_lib.misc import tracked_file_func
+
+from tests import vit_test_repo as repo
+from vit.connection.connection_utils import (
+    ssh_connect_auto,
+    async_ssh_connect_auto
+)
+
+
+class TestAsyncVitConnection(unittest.TestCase):
+
+    asset_names = ["asset_{}".format(i) for i in range(6)]
+
+    def setUp(self):
+        repo.setup_test_repo("repo_template_package")
+        with ssh_connect_auto(repo.test_local_path_1) as vit_connection:
+            for asset_name in self.asset_names:
+                asset.create_asset_from_template(
+                    vit_connection,
+                    repo.package_ok,
+                    asset_name,
+                    repo.template_id
+                )
+
+    def tearDown(self):
+        repo.dispose_test_repo()
+
+    def test_exists_many_on_origin(self):
+        async def run():
+            async with async_ssh_connect_auto(repo.test_local_path_1) as connection:
+                return await asyncio.gather(
+                    connection.exists_on_origin(repo.package_ok),
+                    connection.exists_on_origin("not/a/path")
+                )
+        self.assertEqual([True, False], asyncio.run(run()))
+
+    def test_concurrent_checkout_and_commit(self):
+        async def run():
+            async with async_ssh_connect_auto(
+                    repo.test_local_path_1,
+                    max_workers=4) as connection:
+                checkout_files = await asyncio.gather(*(
+                    async_workflows.checkout_asset_by_branch(
+                        connection, repo.package_ok,
+                        asset_name, "base", editable=True
+                    )
+                    for asset_name in self.asset_names
+                ))
+                for checkout_file in checkout_files:
+                    path = os.path.join(repo.test_local_path_1, checkout_file)
+                    with open(path, "a") as f:
+                        f.write("ouiii")
+                new_files = await asyncio.gather(*(
+                    async_workflows.commit_file(
+                        connection, checkout_file, "new commit",
+                        keep_file=True
+                    )
+                    for checkout_file in checkout_files
+                ))
+                return checkout_files, new_files
+
+        checkout_files, new_files = asyncio.run(run())
+        self.assertEqual(len(self.asset_names), len(set(new_files)))
+        for checkout_file, new_file in zip(checkout_files, new_files):
+            file_track_data = tracked_file_func.get_file_track_data(
+                repo.test_local_path_1, checkout_file
+            )
+            self.assertEqual(new_file, file_track_data["origin_file_name"])
+            self.assertTrue(os.path.exists(
+                os.path.join(repo.test_origin_path_ok, new_file)
+            ))
+        for asset_name, new_file in zip(self.asset_names, new_files):
+            info = asset.get_asset_tree_info(
+                repo.test_local_path_1, repo.package_ok, asset_name
+            )
+            self.assertEqual(new_file, info["branches"]["base"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,15 @@
 import os
+import sys
 import shutil
 import unittest
+from unittest import mock
 
+import vit
+from vit import constants
+from vit import py_helpers
 from vit.custom_exceptions import *
+from vit.file_handlers.repo_config import RepoConfig
+from vit.vit_lib.misc import tracked_file_func, tree_func
 from vit.vit_lib import (
     checkout, commit
 )
@@ -208,6 +215,148 @@ class TestCommit(unittest.TestCase):
                     "new commit"
                 )
 
+    def test_commit_as_delta(self):
+        with RepoConfig(repo.test_local_path_1) as repo_config:
+            repo_config.set_connection_config(
+                delta_transfer=True,
+                delta_threshold=0,
+                vit_delta="PYTHONPATH={} {} -m vit.connection.delta_transfer".format(
+                    os.path.dirname(os.path.dirname(vit.__file__)),
+                    sys.executable
+                )
+            )
+        with ssh_connect_auto(repo.test_local_path_1) as vit_connection:
+            checkout_file = checkout.checkout_asset_by_branch(
+                vit_connection,
+                repo.package_ok,
+                repo.asset_ok,
+                "base",
+                editable=True
+            )
+            self._append_line_to_file(repo.checkout_path_repo_1, "ouiii")
+            with open(repo.checkout_path_repo_1, "rb") as f:
+                data = f.read()
+            with mock.patch.object(
+                    vit_connection, "put_data_to_origin",
+                    side_effect=AssertionError("whole file sent")):
+                new_file_path = commit.commit_file(
+                    vit_connection,
+                    checkout_file,
+                    "new commit"
+                )
+        with open(os.path.join(repo.test_origin_path_ok, new_file_path), "rb") as f:
+            self.assertEqual(data, f.read())
+        for stage_dir in (
+                os.path.join(repo.test_origin_path_ok, constants.VIT_STAGE_DIR),
+                os.path.join(repo.test_origin_path_ok, constants.VIT_TRANSFER_DIR),
+                os.path.join(repo.test_local_path_1, constants.VIT_STAGE_DIR)):
+            self.assertFalse(any(f.endswith(".delta") for f in os.listdir(stage_dir)))
+
+    def test_commit_without_vit_delta(self):
+        with RepoConfig(repo.test_local_path_1) as repo_config:
+            repo_config.set_connection_config(
+                delta_transfer=True,
+                delta_threshold=0,
+                vit_delta="false"
+            )
+        with ssh_connect_auto(repo.test_local_path_1) as vit_connection:
+            checkout_file = checkout.checkout_asset_by_branch(
+                vit_connection,
+                repo.package_ok,
+                repo.asset_ok,
+                "base",
+                editable=True
+            )
+            self._append_line_to_file(repo.checkout_path_repo_1, "ouiii")
+            commit.commit_file(
+                vit_connection,
+                checkout_file,
+                "new commit",
+                keep_file=True,
+                keep_editable=True
+            )
+            # whole file sent, helper not asked again on this connection.
+            self.assertFalse(vit_connection.vit_delta_available)
+
+    def test_commit_hashes_file_once(self):
+        with ssh_connect_auto(repo.test_local_path_1) as vit_connection:
+            checkout_file = checkout.checkout_asset_by_branch(
+                vit_connection,
+                repo.package_ok,
+                repo.asset_ok,
+                "base",
+                editable=True
+            )
+            self._append_line_to_file(repo.checkout_path_repo_1, "ouiii")
+            sha256 = py_helpers.calculate_file_sha(repo.checkout_path_repo_1)
+            with mock.patch.object(
+                    py_helpers, "calculate_file_sha",
+                    wraps=py_helpers.calculate_file_sha) as calculate_file_sha:
+                new_file_path = commit.commit_file(
+                    vit_connection,
+                    checkout_file,
+                    "new commit",
+                    keep_file=True,
+                    keep_editable=True
+                )
+            # once for change detection, once while sending the file.
+            self.assertEqual(2, calculate_file_sha.call_count)
+        tree_asset, _ = tree_func.get_local_tree_asset(
+            repo.test_local_path_1, repo.package_ok, repo.asset_ok
+        )
+        with tree_asset:
+            self.assertEqual(sha256, tree_asset.get_commit_sha256(new_file_path))
+
+        # file unchanged since commit: size and mtime spare hashing it.
+        with mock.patch.object(
+                py_helpers, "calculate_file_sha",
+                side_effect=AssertionError("file hashed")):
+            file_track_data = tracked_file_func.get_file_track_data(
+                repo.test_local_path_1, checkout_file
+            )
+        self.assertFalse(file_track_data["changes"])
+        self._append_line_to_file(repo.checkout_path_repo_1, "non")
+        file_track_data = tracked_file_func.get_file_track_data(
+            repo.test_local_path_1, checkout_file
+        )
+        self.assertTrue(file_track_data["changes"])
+
+    def test_retried_commit_resumes(self):
+        with ssh_connect_auto(repo.test_local_path_1) as vit_connection:
+            checkout_file = checkout.checkout_asset_by_branch(
+                vit_connection,
+                repo.package_ok,
+                repo.asset_ok,
+                "base",
+                editable=True
+            )
+            self._append_line_to_file(repo.checkout_path_repo_1, "ouiii")
+            put_commit_to_origin = vit_connection.put_commit_to_origin
+            sent_to = []
+
+            def interrupted_put(src, dst, *args, **kargs):
+                sent_to.append(dst)
+                raise SSH_OperationInterrupted_E(vit_connection.ssh_link, "upload")
+            with mock.patch.object(
+                    vit_connection, "put_commit_to_origin",
+                    side_effect=interrupted_put):
+                with self.assertRaises(SSH_OperationInterrupted_E):
+                    commit.commit_file(vit_connection, checkout_file, "new commit")
+
+            def put(src, dst, *args, **kargs):
+                sent_to.append(dst)
+                return put_commit_to_origin(src, dst, *args, **kargs)
+            with mock.patch.object(
+                    vit_connection, "put_commit_to_origin",
+                    side_effect=put):
+                new_file_path = commit.commit_file(
+                    vit_connection, checkout_file, "new commit"
+                )
+        # same origin path: the upload can resume where it stopped.
+        self.assertEqual([new_file_path] * 2, sent_to)
+        stage_dir = os.path.join(repo.test_local_path_1, constants.VIT_STAGE_DIR)
+        self.assertFalse(any(f.endswith(".commit.json") for f in os.listdir(stage_dir)))
+
     @staticmethod
     def _rm_dir(directory):
         if os.path.exists(directory):
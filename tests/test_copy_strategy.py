@@ -0,0 +1,59 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from vit.connection import copy_strategy
+
+
+class TestCopyStrategy(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.src = os.path.join(self.tmp_dir, "src.ma")
+        self.dst = os.path.join(self.tmp_dir, "dst.ma")
+        self.data = os.urandom(3000000)
+        with open(self.src, "wb") as f:
+            f.write(self.data)
+        copy_strategy.reset_copy_stats()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _check_copy(self):
+        with open(self.dst, "rb") as f:
+            self.assertEqual(self.data, f.read())
+
+    def test_copy(self):
+        copied = []
+        strategy = copy_strategy.copy_file(self.src, self.dst, copied.append)
+        self._check_copy()
+        self.assertNotEqual(copy_strategy.HARDLINK, strategy)
+        self.assertEqual(len(self.data), sum(copied))
+        self.assertEqual(
+            {strategy: {"files": 1, "bytes": len(self.data)}},
+            copy_strategy.get_copy_stats()
+        )
+
+    def test_hardlink(self):
+        with mock.patch.object(copy_strategy, "fcntl", None):
+            strategy = copy_strategy.copy_file(
+                self.src, self.dst,
+                allow_hardlink=True
+            )
+        self.assertEqual(copy_strategy.HARDLINK, strategy)
+        self.assertTrue(os.path.samefile(self.src, self.dst))
+
+    def test_fallbacks(self):
+        failing = mock.Mock(side_effect=OSError("not supported"))
+        with mock.patch.object(copy_strategy, "_reflink", failing), \
+                mock.patch.object(copy_strategy, "_copy_file_range", failing), \
+                mock.patch.object(copy_strategy, "_sendfile", failing):
+            strategy = copy_strategy.copy_file(self.src, self.dst)
+        self.assertEqual(copy_strategy.SHUTIL, strategy)
+        self._check_copy()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,11 @@
 import unittest
 
 from vit.custom_exceptions import *
-from vit.vit_lib import (asset_template, package, asset, fetch)
+from vit.vit_lib import (
+    asset_template, package, asset, fetch, checkout, infos
+)
+from vit.file_handlers.repo_config import RepoConfig
+from vit.file_handlers.metadata_store import get_local_metadata_store
 
 from tests import vit_test_repo as repo
 from vit.connection.connection_utils import ssh_connect_auto
@@ -20,6 +24,20 @@ class TestFetch(unittest.TestCase):
         with ssh_connect_auto(repo.test_local_path_1) as vit_connection:
             fetch.fetch(vit_connection)
 
+    def test_fetch_config(self):
+        with RepoConfig(repo.test_origin_path_ok) as repo_config:
+            repo_config.add_mirror("mirror", "localhost", "/mirror", "user1")
+        with RepoConfig(repo.test_local_path_1) as repo_config:
+            repo_config.set_metadata_store("sqlite")
+            local_origin_link = repo_config.get_origin_ssh_info()
+        with ssh_connect_auto(repo.test_local_path_1) as vit_connection:
+            fetch.fetch(vit_connection)
+        with RepoConfig(repo.test_local_path_1) as repo_config:
+            self.assertEqual(["mirror"], list(repo_config.get_mirrors()))
+            self.assertEqual(local_origin_link, repo_config.get_origin_ssh_info())
+            self.assertEqual("sqlite", repo_config.get_metadata_store())
+            self.assertFalse(repo_config.data["current_copy"]["is_origin"])
+
     def test_get_repo_hierarchy(self):
 
         with ssh_connect_auto(repo.test_local_path_1) as vit_connection:
@@ -52,6 +70,47 @@ class TestFetch(unittest.TestCase):
             fetch.fetch(vit_connection)
         result = fetch.get_all_assets_info(repo.test_local_path_1)
 
+    def test_metadata_store(self):
+        with ssh_connect_auto(repo.test_local_path_1) as vit_connection:
+            fetch.fetch(vit_connection)
+        expected_hierarchy = fetch.get_repo_hierarchy(repo.test_local_path_1)
+        expected_assets_info = fetch.get_all_assets_info(repo.test_local_path_1)
+
+        with RepoConfig(repo.test_local_path_1) as repo_config:
+            repo_config.set_metadata_store("sqlite")
+        with ssh_connect_auto(repo.test_local_path_1) as vit_connection:
+            fetch.fetch(vit_connection)
+        self.assertEqual(
+            expected_hierarchy,
+            fetch.get_repo_hierarchy(repo.test_local_path_1)
+        )
+        self.assertEqual(
+            expected_assets_info,
+            fetch.get_all_assets_info(repo.test_local_path_1)
+        )
+
+        # no fetch: store refreshed from the tree checkout wrote.
+        with ssh_connect_auto(repo.test_local_path_1) as vit_connection:
+            checkout_file = checkout.checkout_asset_by_branch(
+                vit_connection, "package2", "asset4", "base", editable=True
+            )
+        status = infos.get_info_from_all_ref_files(repo.test_local_path_1)
+        self.assertIn(checkout_file, status["editable"]["package2"]["asset4"])
+        self.assertEqual(
+            ("asset4",),
+            asset.list_assets(repo.test_local_path_1, "package2")
+        )
+        with self.assertRaises(Package_NotFound_E):
+            asset.list_assets(repo.test_local_path_1, "nope")
+        with get_local_metadata_store(repo.test_local_path_1) as metadata_store:
+            self.assertEqual(0, metadata_store.refresh())
+            self.assertEqual(
+                (("package2", "asset4"),),
+                metadata_store.find_assets(editor="user1", branch="base")
+            )
+            self.assertEqual(4, len(metadata_store.find_assets(branch="base")))
+            self.assertEqual((), metadata_store.find_assets(tag="nope"))
+
     def _init_repos(self):
         with ssh_connect_auto(repo.test_local_path_1) as vit_connection:
             asset_template.create_asset_template(
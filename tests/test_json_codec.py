@@ -0,0 +1,146 @@
+import os
+import unittest
+from unittest import mock
+
+from vit.custom_exceptions import Repo_FormatNotSupported_E, Codec_NotAvailable_E
+from vit.file_handlers import json_codec
+from vit.file_handlers import repo_config as repo_config_func
+from vit.file_handlers.repo_config import RepoConfig
+from vit.file_handlers.tree_asset import TreeAsset
+from vit.vit_lib import checkout, commit
+
+from tests import vit_test_repo as repo
+from vit.connection.connection_utils import ssh_connect_auto
+
+DATA = {
+    "asset_name": "asset_ok",
+    "root_commit": None,
+    "commits": {
+        "commit-{}.ma".format(i): {
+            "parent": None if i == 0 else "commit-{}.ma".format(i - 1),
+            "date": 1700000000.5 + i,
+            "user": "user{}".format(i % 3),
+            "sha256": "a" * 64,
+            "message": "é" * i * 20,
+        } for i in range(20)
+    },
+    "numbers": [0, 127, 128, 255, 65536, 2 ** 40, -1, -32, -33, -200, -70000, -(2 ** 40)],
+    "flags": [True, False],
+    "big_list": list(range(70000)),
+}
+
+
+HAS_MSGPACK = json_codec.msgpack is not None
+
+
+class TestJsonCodec(unittest.TestCase):
+
+    def test_round_trip(self):
+        for codec in json_codec.CODECS:
+            if codec == json_codec.MSGPACK and not HAS_MSGPACK:
+                continue
+            self.assertEqual(DATA, json_codec.decode(json_codec.encode(DATA, codec)))
+
+    @unittest.skipUnless(HAS_MSGPACK, "msgpack not installed")
+    def test_compact(self):
+        self.assertLess(
+            len(json_codec.encode(DATA, json_codec.MSGPACK)),
+            len(json_codec.encode(DATA, json_codec.JSON)))
+        self.assertLess(
+            len(json_codec.encode(DATA, json_codec.JSON)),
+            len(json_codec.encode(DATA, json_codec.JSON_PRETTY)))
+
+    def test_unknown_codec(self):
+        with self.assertRaises(ValueError):
+            json_codec.encode(DATA, "xml")
+
+    def test_msgpack_not_installed(self):
+        repo.setup_test_repo("repo_base")
+        try:
+            with mock.patch.object(json_codec, "msgpack", None):
+                with self.assertRaises(Codec_NotAvailable_E):
+                    json_codec.encode(DATA, json_codec.MSGPACK)
+                with self.assertRaises(Codec_NotAvailable_E):
+                    json_codec.decode(b"\x81\xa1a\x01")
+                with self.assertRaises(Codec_NotAvailable_E):
+                    with RepoConfig(repo.test_local_path_1) as repo_config:
+                        repo_config.set_metadata_codec(json_codec.MSGPACK)
+            self.assertEqual(
+                json_codec.DEFAULT_CODEC,
+                repo_config_func.get_metadata_codec(repo.test_local_path_1)
+            )
+        finally:
+            repo.dispose_test_repo()
+
+
+@unittest.skipUnless(HAS_MSGPACK, "msgpack not installed")
+class TestRepoCodec(unittest.TestCase):
+
+    def setUp(self):
+        repo.setup_test_repo("repo_base")
+        with RepoConfig(repo.test_local_path_1) as repo_config:
+            repo_config.set_metadata_codec(json_codec.MSGPACK)
+
+    def tearDown(self):
+        repo.dispose_test_repo()
+
+    def test_codec_per_repository(self):
+        self.assertEqual(
+            json_codec.MSGPACK,
+            json_codec.get_repo_codec(os.path.join(
+                repo.test_local_path_1, ".vit", "tree", "asset.json"
+            ))
+        )
+        self.assertEqual(
+            json_codec.JSON,
+            json_codec.get_repo_codec(os.path.join(
+                repo.test_local_path_2, ".vit", "tree", "asset.json"
+            ))
+        )
+        self.assertEqual(
+            json_codec.DEFAULT_CODEC,
+            json_codec.get_repo_codec(os.path.join(repo.test_local_path_1, "a.json"))
+        )
+
+    def test_format_version(self):
+        with RepoConfig(repo.test_local_path_1) as repo_config:
+            self.assertEqual(
+                repo_config_func.FORMAT_VERSION_MSGPACK,
+                repo_config.get_repository_format_version()
+            )
+            repo_config.require_format_version(
+                repo_config_func.REPOSITORY_FORMAT_VERSION + 1
+            )
+        with self.assertRaises(Repo_FormatNotSupported_E):
+            with ssh_connect_auto(repo.test_local_path_1):
+                pass
+
+    def test_commit_msgpack(self):
+        with ssh_connect_auto(repo.test_local_path_1) as vit_connection:
+            checkout_file = checkout.checkout_asset_by_branch(
+                vit_connection,
+                repo.package_ok,
+                repo.asset_ok,
+                "base",
+                editable=True
+            )
+            with open(repo.checkout_path_repo_1, "a") as f:
+                f.write("new line\n")
+            commit.commit_file(vit_connection, checkout_file, "new commit")
+
+        tree_asset_path = None
+        for root, _, files in os.walk(os.path.join(repo.test_origin_path_ok, ".vit", "tree")):
+            if "{}.json".format(repo.asset_ok) in files:
+                tree_asset_path = os.path.join(root, "{}.json".format(repo.asset_ok))
+        with open(tree_asset_path, "rb") as f:
+            self.assertTrue(json_codec._is_msgpack(f.read()))
+        with TreeAsset(tree_asset_path) as tree_asset:
+            messages = [
+                tree_asset.get_commit_data(c)["message"]
+                for c in tree_asset.list_commits()
+            ]
+        self.assertIn("new commit", messages)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+from vit import py_helpers
+from vit.file_handlers import json_cache
+from vit.file_handlers.tree_package import TreePackage
+
+
+class TestJsonFile(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, "package.json")
+        TreePackage.create_file(self.path, "package")
+        # compact: any rewrite by JsonFile would change it.
+        with open(self.path) as f:
+            data = json.load(f)
+        with open(self.path, "w") as f:
+            json.dump(data, f)
+        with open(self.path) as f:
+            self.content = f.read()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _is_rewritten(self):
+        with open(self.path) as f:
+            return f.read() != self.content
+
+    def test_read_does_not_write(self):
+        with TreePackage(self.path) as tree_package:
+            tree_package.list_assets()
+            tree_package.has_asset("asset")
+        self.assertFalse(self._is_rewritten())
+
+    def test_file_write_writes(self):
+        with TreePackage(self.path) as tree_package:
+            tree_package.set_asset("asset", "asset.json")
+        self.assertTrue(self._is_rewritten())
+        with TreePackage(self.path) as tree_package:
+            self.assertEqual("asset.json", tree_package.get_asset_tree_file_path("asset"))
+
+    def test_mark_dirty(self):
+        with TreePackage(self.path) as tree_package:
+            tree_package.mark_dirty()
+            tree_package.data["assets"]["asset"] = "asset.json"
+        self.assertTrue(self._is_rewritten())
+
+    def test_no_write_on_error(self):
+        with self.assertRaises(ValueError):
+            with TreePackage(self.path) as tree_package:
+                tree_package.set_asset("asset", "asset.json")
+                raise ValueError()
+        self.assertFalse(self._is_rewritten())
+
+
+    def test_parsed_once(self):
+        cache = json_cache.get_json_cache()
+        with TreePackage(self.path) as tree_package:
+            tree_package.list_assets()
+        hits = cache.hits
+        with TreePackage(self.path) as tree_package:
+            tree_package.list_assets()
+        self.assertEqual(hits + 1, cache.hits)
+
+    def test_cache_invalidated_by_others_writes(self):
+        with TreePackage(self.path) as tree_package:
+            tree_package.list_assets()
+        with open(self.path, "w") as f:
+            json.dump({"package_name": "package", "assets": {"asset": "a.json"}}, f)
+        with TreePackage(self.path) as tree_package:
+            self.assertEqual(("asset",), tree_package.list_assets())
+
+    def test_cache_not_modified_on_error(self):
+        with self.assertRaises(ValueError):
+            with TreePackage(self.path) as tree_package:
+                tree_package.set_asset("asset", "asset.json")
+                raise ValueError()
+        with TreePackage(self.path) as tree_package:
+            self.assertFalse(tree_package.has_asset("asset"))
+
+    def test_cache_invalidated_by_write_json(self):
+        with TreePackage(self.path) as tree_package:
+            data = tree_package.get_data_copy()
+        py_helpers.write_json(self.path, data)
+        with TreePackage(self.path) as tree_package:
+            tree_package.list_assets()
+        stamp = json_cache.get_stamp(self.path)
+        data["package_name"] = "renamed"
+        py_helpers.write_json(self.path, data)
+        # same stamp as the cached data: only invalidation tells it changed.
+        os.utime(self.path, ns=(stamp[0], stamp[0]))
+        self.assertEqual(stamp, json_cache.get_stamp(self.path))
+        with TreePackage(self.path) as tree_package:
+            self.assertEqual("renamed", tree_package.get_data_copy()["package_name"])
+
+    def test_data_copy(self):
+        with TreePackage(self.path) as tree_package:
+            data = tree_package.get_data_copy()
+        data["assets"]["asset"] = "asset.json"
+        with TreePackage(self.path) as tree_package:
+            self.assertFalse(tree_package.has_asset("asset"))
+
+    def test_cache_max_size(self):
+        cache = json_cache.JsonCache(max_size=100)
+        cache.put("a", (0, 60, 0), {"a": 1})
+        cache.put("b", (0, 60, 0), {"b": 1})
+        self.assertIsNone(cache.get("a", (0, 60, 0)))
+        self.assertEqual({"b": 1}, cache.get("b", (0, 60, 0)))
+
+
+if __name__ == "__main__":
+    unittest.main()
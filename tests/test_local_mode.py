@@ -134,6 +134,23 @@ class TestLocalMode(unittest.TestCase):
             self.assertTrue(os.path.exists(repo.checkout_path_repo_1))
             self.assertTrue(os.path.islink(repo.checkout_path_repo_1))
 
+    def test_origin_copies_not_hardlinked(self):
+        # checkouts are symlinks to origin files: a shared inode would be
+        # modified through them.
+        origin_path_abs = os.path.abspath(repo.test_origin_path_ok)
+        with open(os.path.join(origin_path_abs, "a_commit"), "w") as f:
+            f.write("data")
+        vit_connection = VitConnectionLocal(
+            repo.test_local_path_1, "prout",
+            origin_path_abs, "user1"
+        )
+        with vit_connection:
+            vit_connection.copy_file_at_origin("a_commit", "a_copy")
+        self.assertFalse(os.path.samefile(
+            os.path.join(origin_path_abs, "a_commit"),
+            os.path.join(origin_path_abs, "a_copy")
+        ))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,73 @@
+import os
+import shutil
+import unittest
+from unittest import mock
+
+from vit.file_handlers.repo_config import RepoConfig
+from vit.connection import mirror_routing
+from vit.vit_lib import checkout
+
+from tests import vit_test_repo as repo
+from vit.connection.connection_utils import ssh_connect_auto
+
+test_mirror_path = "tests/mirror_repo"
+mirror_marker = "// from mirror\n"
+
+
+class TestMirrorRouting(unittest.TestCase):
+
+    def setUp(self):
+        repo.setup_test_repo("repo_base")
+        mirror_routing.reset_nearest()
+        shutil.copytree(repo.test_origin_path_ok, test_mirror_path)
+        with RepoConfig(repo.test_local_path_1) as repo_config:
+            repo_config.add_mirror(
+                "site2", "localhost",
+                os.path.abspath(test_mirror_path),
+                "user1"
+            )
+        for root, _, files in os.walk(os.path.join(test_mirror_path, repo.package_ok)):
+            for f in files:
+                with open(os.path.join(root, f), "a") as f_mirror:
+                    f_mirror.write(mirror_marker)
+
+    def tearDown(self):
+        mirror_routing.reset_nearest()
+        shutil.rmtree(test_mirror_path, ignore_errors=True)
+        repo.dispose_test_repo()
+
+    def test_read_from_nearest_mirror(self):
+        with mock.patch.object(mirror_routing, "probe_latency", side_effect=[0.1, 0.01]):
+            self.assertTrue(self._checkout().endswith(mirror_marker))
+
+    def test_read_from_nearest_origin(self):
+        with mock.patch.object(mirror_routing, "probe_latency", side_effect=[0.01, 0.1]):
+            self.assertFalse(self._checkout().endswith(mirror_marker))
+
+    def test_fallback_to_origin(self):
+        shutil.rmtree(os.path.join(test_mirror_path, repo.package_ok))
+        with mock.patch.object(mirror_routing, "probe_latency", side_effect=[0.1, 0.01]):
+            self.assertFalse(self._checkout().endswith(mirror_marker))
+
+    def test_select_nearest(self):
+        self.assertEqual("site2", mirror_routing.select_nearest(
+            {None: 0.1, "site2": 0.01, "site3": None}
+        ))
+        self.assertIsNone(mirror_routing.select_nearest({None: 0.1, "site2": 0.1}))
+        self.assertIsNone(mirror_routing.select_nearest({None: None}))
+
+    @staticmethod
+    def _checkout():
+        with ssh_connect_auto(repo.test_local_path_1) as vit_connection:
+            checkout.checkout_asset_by_branch(
+                vit_connection,
+                repo.package_ok,
+                repo.asset_ok,
+                "base"
+            )
+        with open(repo.checkout_path_repo_1) as f:
+            return f.read()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import os
+import shutil
+import unittest
+from unittest import mock
+
+from vit import constants
+from vit.custom_exceptions import *
+from vit.file_handlers.repo_config import RepoConfig
+from vit.vit_lib import checkout, commit, replicate
+
+from tests import vit_test_repo as repo
+from vit.connection.connection_utils import ssh_connect_auto
+
+test_mirror_path = "tests/mirror_repo"
+
+
+class TestReplicate(unittest.TestCase):
+
+    def setUp(self):
+        repo.setup_test_repo("repo_base")
+        os.makedirs(test_mirror_path)
+        with RepoConfig(repo.test_local_path_1) as repo_config:
+            repo_config.add_mirror(
+                "site2", "localhost",
+                os.path.abspath(test_mirror_path),
+                "user1"
+            )
+
+    def tearDown(self):
+        shutil.rmtree(test_mirror_path, ignore_errors=True)
+        repo.dispose_test_repo()
+
+    def test_replicate(self):
+        with ssh_connect_auto(repo.test_local_path_1) as vit_connection:
+            copied = replicate.replicate(vit_connection, "site2")
+        self.assertGreater(copied, 0)
+        self._check_mirror_up_to_date()
+
+    def test_replicate_incremental(self):
+        with ssh_connect_auto(repo.test_local_path_1) as vit_connection:
+            first_copied = replicate.replicate(vit_connection, "site2")
+            checkout_file = checkout.checkout_asset_by_branch(
+                vit_connection,
+                repo.package_ok,
+                repo.asset_ok,
+                "base",
+                editable=True
+            )
+            with open(repo.checkout_path_repo_1, "a") as f:
+                f.write("new line\n")
+            commit.commit_file(vit_connection, checkout_file, "new commit")
+            copied = replicate.replicate(vit_connection, "site2")
+        self.assertLess(copied, first_copied)
+        self._check_mirror_up_to_date()
+
+    def test_replicate_failure_keeps_cursor(self):
+        copy_file_to_mirror = mock.Mock(side_effect=OSError("disk full"))
+        with ssh_connect_auto(repo.test_local_path_1) as vit_connection:
+            with mock.patch.object(vit_connection, "copy_file_to_mirror", copy_file_to_mirror):
+                with self.assertRaises(Mirror_ReplicationError_E):
+                    replicate.replicate(vit_connection, "site2")
+            self.assertFalse(os.path.exists(
+                os.path.join(test_mirror_path, constants.VIT_REPLICATION_CURSOR)
+            ))
+            replicate.replicate(vit_connection, "site2")
+        self._check_mirror_up_to_date()
+
+    def test_replicate_unknown_mirror(self):
+        with self.assertRaises(Mirror_NotFound_E):
+            with ssh_connect_auto(repo.test_local_path_1) as vit_connection:
+                replicate.replicate(vit_connection, "site3")
+
+    def _check_mirror_up_to_date(self):
+        excluded = (constants.VIT_LOCK_FILE, constants.VIT_REPLICATION_CURSOR)
+        for root, _, files in os.walk(repo.test_origin_path_ok):
+            for f in files:
+                path = os.path.relpath(os.path.join(root, f), repo.test_origin_path_ok)
+                if path in excluded or path.startswith(constants.VIT_STAGE_DIR):
+                    continue
+                with open(os.path.join(root, f), "rb") as f_origin, \
+                        open(os.path.join(test_mirror_path, path), "rb") as f_mirror:
+                    self.assertEqual(f_origin.read(), f_mirror.read(), path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+
+from vit.custom_exceptions import *
+from vit.connection.vit_connection import VitConnection
+from vit.file_handlers.repo_config import RepoConfig
+from vit.vit_lib import checkout, commit, fetch
+
+from tests import vit_test_repo as repo
+from tests.wan_ssh_connection import WanSSHConnection, WanProfile
+from vit.connection.connection_utils import ssh_connect_auto
+
+# round trips made with origin by vit_lib operations, as counted by
+# WanSSHConnection. Budgets are what operations cost today: lower them when
+# an operation gets cheaper, do not raise them without a reason.
+# Checkout and commit read the journal of the tree asset (one command),
+# metadata changes append to it instead of an upload and a download
+# (repository opted in to tree journals).
+OPEN_CLOSE_BUDGET = 3
+FETCH_BUDGET = 1
+CHECKOUT_BUDGET = 15
+COMMIT_BUDGET = 13
+
+
+class TestRoundTrips(unittest.TestCase):
+
+    def setUp(self):
+        repo.setup_test_repo("repo_base")
+        for path in (repo.test_origin_path_ok, repo.test_local_path_1):
+            with RepoConfig(path) as repo_config:
+                repo_config.set_tree_journal_max_records(200)
+        VitConnection.SSHConnection = WanSSHConnection
+        WanSSHConnection.profile = WanProfile(rtt=0.1, seed=0)
+        WanSSHConnection.stats.reset()
+
+    def tearDown(self):
+        WanSSHConnection.profile = WanProfile()
+        WanSSHConnection.stats.reset()
+        repo.dispose_test_repo()
+
+    def test_open_close(self):
+        with ssh_connect_auto(repo.test_local_path_1):
+            pass
+        self.assertLessEqual(WanSSHConnection.stats.round_trips, OPEN_CLOSE_BUDGET)
+
+    def test_fetch(self):
+        with ssh_connect_auto(repo.test_local_path_1) as vit_connection:
+            WanSSHConnection.stats.reset()
+            fetch.fetch(vit_connection)
+            self.assertLessEqual(WanSSHConnection.stats.round_trips, FETCH_BUDGET)
+
+    def test_checkout(self):
+        with ssh_connect_auto(repo.test_local_path_1) as vit_connection:
+            WanSSHConnection.stats.reset()
+            self._checkout(vit_connection)
+            self.assertLessEqual(WanSSHConnection.stats.round_trips, CHECKOUT_BUDGET)
+
+    def test_commit(self):
+        with ssh_connect_auto(repo.test_local_path_1) as vit_connection:
+            checkout_file = self._checkout(vit_connection)
+            with open(repo.checkout_path_repo_1, "a") as f:
+                f.write("new line\n")
+            WanSSHConnection.stats.reset()
+            commit.commit_file(vit_connection, checkout_file, "new commit")
+            self.assertLessEqual(WanSSHConnection.stats.round_trips, COMMIT_BUDGET)
+
+    def test_bandwidth(self):
+        WanSSHConnection.profile = WanProfile(rtt=0, bandwidth=1000)
+        with ssh_connect_auto(repo.test_local_path_1) as vit_connection:
+            WanSSHConnection.stats.reset()
+            fetch.fetch(vit_connection)
+        stats = WanSSHConnection.stats
+        self.assertGreater(stats.bytes_received, 0)
+        self.assertAlmostEqual(stats.bytes_received / 1000, stats.simulated_time)
+
+    def test_jitter(self):
+        WanSSHConnection.profile = WanProfile(rtt=0.1, jitter=0.5, seed=0)
+        with ssh_connect_auto(repo.test_local_path_1):
+            pass
+        stats = WanSSHConnection.stats
+        delays = stats.round_trips + stats.channel_opens
+        self.assertGreaterEqual(stats.simulated_time, delays * 0.05)
+        self.assertLessEqual(stats.simulated_time, delays * 0.15)
+        self.assertNotAlmostEqual(stats.simulated_time, delays * 0.1)
+
+    def test_failure_injection(self):
+        WanSSHConnection.profile = WanProfile(rtt=0, failure_rate=1)
+        ssh_connection = WanSSHConnection("localhost", "user1")
+        ssh_connection.configure_transfer(retry_attempts=2)
+        with self.assertRaises(SSH_OperationInterrupted_E):
+            ssh_connection.exec_command_output("echo 1")
+        self.assertEqual(1, WanSSHConnection.stats.failures)
+        with self.assertRaises(SSH_ConnectionError_E):
+            ssh_connection.exec_command_output("echo 1", retry=True)
+        self.assertEqual(4, WanSSHConnection.stats.failures)
+
+    @staticmethod
+    def _checkout(vit_connection):
+        return checkout.checkout_asset_by_branch(
+            vit_connection,
+            repo.package_ok,
+            repo.asset_ok,
+            "base",
+            editable=True
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
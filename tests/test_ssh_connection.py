@@ -0,0 +1,400 @@
+import io
+import os
+import hashlib
+import select
+import shutil
+import socket
+import tempfile
+import subprocess
+import unittest
+from unittest import mock
+
+from vit.custom_exceptions import (
+    SSH_ConnectionError_E,
+    SSH_OperationInterrupted_E
+)
+from vit.connection.ssh_connection import RemoteShell, SSHConnection
+from vit.connection.chunked_transfer import ChunkedTransfer, split_byte_ranges
+from vit.connection import delta_transfer
+from vit.connection import compression
+
+
+class _LocalChannel(object):
+
+    # mimics the subset of paramiko.Channel used by RemoteShell and
+    # compressed transfers.
+
+    def __init__(self):
+        self.process = None
+        self.timeout = None
+
+    def exec_command(self, command):
+        self.process = subprocess.Popen(
+            command,
+            shell=True,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE
+        )
+
+    def settimeout(self, timeout):
+        self.timeout = timeout
+
+    def sendall(self, data):
+        self.process.stdin.write(data)
+        self.process.stdin.flush()
+
+    def recv(self, size):
+        ready, _, _ = select.select([self.process.stdout], [], [], self.timeout)
+        if not ready:
+            raise socket.timeout()
+        return os.read(self.process.stdout.fileno(), size)
+
+    def recv_stderr_ready(self):
+        ready, _, _ = select.select([self.process.stderr], [], [], 0)
+        return bool(ready)
+
+    def recv_stderr(self, size):
+        return os.read(self.process.stderr.fileno(), size)
+
+    def shutdown_write(self):
+        self.process.stdin.close()
+
+    def recv_exit_status(self):
+        return self.process.wait()
+
+    def makefile(self, mode):
+        return self.process.stdout
+
+    def close(self):
+        if not self.process.stdin.closed:
+            self.process.stdin.close()
+        self.process.stdout.close()
+        self.process.stderr.close()
+        self.process.wait()
+
+
+class _LocalTransport(object):
+
+    def open_session(self):
+        return _LocalChannel()
+
+
+class TestRemoteShell(unittest.TestCase):
+
+    def setUp(self):
+        self.shell = RemoteShell(_LocalTransport())
+
+    def tearDown(self):
+        self.shell.close()
+
+    def test_run(self):
+        self.assertEqual((0, ["a", "b"]), self.shell.run("echo a; echo b"))
+        self.assertEqual((0, []), self.shell.run("true"))
+        self.assertEqual((0, ["no eol"]), self.shell.run("printf 'no eol'"))
+
+    def test_exit_code(self):
+        exit_code, _ = self.shell.run("ls /not/a/path")
+        self.assertNotEqual(0, exit_code)
+        self.assertEqual((3, []), self.shell.run("exit 3"))
+        self.assertEqual((0, ["still alive"]), self.shell.run("echo still alive"))
+
+    def test_command_does_not_consume_next_commands(self):
+        self.assertEqual((0, []), self.shell.run("cat"))
+        self.assertEqual((0, ["next"]), self.shell.run("echo next"))
+
+
+class TestChunkedTransfer(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.src = os.path.join(self.tmp_dir, "src.bin")
+        self.dst = os.path.join(self.tmp_dir, "dst.bin")
+        with open(self.src, "wb") as f:
+            f.write(os.urandom(100003))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_split_byte_ranges(self):
+        self.assertEqual(
+            [(0, 4), (4, 4), (8, 2)],
+            split_byte_ranges(10, 4)
+        )
+        self.assertEqual([], split_byte_ranges(0, 4))
+
+    def test_transfer(self):
+        size = os.path.getsize(self.src)
+        with open(self.dst, "wb") as f:
+            f.truncate(size)
+        ChunkedTransfer(
+            lambda idx: open(self.src, "rb"),
+            lambda idx: open(self.dst, "r+b"),
+            streams=3,
+            chunk_size=7000,
+            buffer_size=1000
+        ).run(size)
+        with open(self.src, "rb") as f_src, open(self.dst, "rb") as f_dst:
+            self.assertEqual(f_src.read(), f_dst.read())
+
+    def test_resume_interrupted_transfer(self):
+        size = os.path.getsize(self.src)
+        checkpoint_path = os.path.join(self.tmp_dir, "stage", "checkpoint.json")
+        ssh_connection = SSHConnection("localhost", "user1")
+        ssh_connection.transfer_config = {
+            "chunked_streams": 1,
+            "chunked_chunk_size": 10000,
+        }
+        written_offsets = []
+        fail_at_write = 4
+
+        def create_target():
+            with open(self.dst, "wb") as f:
+                f.truncate(size)
+
+        def open_dst_failing(idx):
+            f_dst = open(self.dst, "r+b")
+            write = f_dst.write
+
+            def failing_write(chunk):
+                written_offsets.append(f_dst.tell())
+                if len(written_offsets) == fail_at_write:
+                    raise EOFError("connection lost")
+                return write(chunk)
+            f_dst.write = failing_write
+            return f_dst
+
+        def transfer(open_dst):
+            ssh_connection._transfer_ranges(
+                lambda idx: open(self.src, "rb"), open_dst,
+                self.src, self.dst, size, os.path.getmtime(self.src),
+                lambda: os.path.exists(self.dst),
+                create_target, checkpoint_path
+            )
+
+        with self.assertRaises(EOFError):
+            transfer(open_dst_failing)
+        self.assertTrue(os.path.exists(checkpoint_path))
+
+        written_offsets = []
+        fail_at_write = None
+        transfer(open_dst_failing)
+        self.assertEqual(30000, written_offsets[0])
+        with open(self.src, "rb") as f_src, open(self.dst, "rb") as f_dst:
+            self.assertEqual(f_src.read(), f_dst.read())
+
+    def test_streams_have_their_own_connection(self):
+        ssh_connection = SSHConnection("localhost", "user1")
+        ssh_connection.ssh_client = mock.Mock()
+        ssh_connection.transfer_config = {"chunked_streams": 3}
+        with mock.patch("paramiko.SSHClient") as ssh_client_type, \
+                mock.patch("paramiko.SFTPClient.from_transport") as from_transport:
+            ssh_client_type.side_effect = lambda: mock.Mock()
+            ssh_connection._get_chunked_sftp_clients()
+        transports = [c[0][0] for c in from_transport.call_args_list]
+        self.assertEqual(3, len(set(map(id, transports))))
+        self.assertIs(ssh_connection.ssh_client.get_transport(), transports[0])
+        self.assertEqual(2, len(ssh_connection.stream_ssh_clients))
+        ssh_connection._close_chunked_sftp_clients()
+        self.assertEqual([], ssh_connection.stream_ssh_clients)
+
+    def test_stream_connection_refused(self):
+        ssh_connection = SSHConnection("localhost", "user1")
+        ssh_connection.ssh_client = mock.Mock()
+        ssh_connection.transfer_config = {"chunked_streams": 2}
+        with mock.patch("paramiko.SSHClient") as ssh_client_type, \
+                mock.patch("paramiko.SFTPClient.from_transport") as from_transport:
+            ssh_client_type.return_value.connect.side_effect = EOFError()
+            ssh_connection._get_chunked_sftp_clients()
+        transports = [c[0][0] for c in from_transport.call_args_list]
+        self.assertEqual([ssh_connection.ssh_client.get_transport()] * 2, transports)
+
+class TestCompression(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.ssh_connection = SSHConnection("localhost", "user1")
+        self.ssh_connection.transfer_config = {
+            "compression": "auto",
+            "compression_extensions": [".ma"],
+            "no_compression_extensions": [".exr"],
+        }
+        self.ssh_connection._open_exec_channel = self._open_local_channel
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    @staticmethod
+    def _open_local_channel(command):
+        channel = _LocalChannel()
+        channel.exec_command(command)
+        return channel
+
+    def _write_file(self, name, data):
+        path = os.path.join(self.tmp_dir, name)
+        if not os.path.exists(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_is_worth_compressing(self):
+        config = self.ssh_connection.transfer_config
+        text = self._write_file("scene.unknown", b"setAttr \".tx\" 0;\n" * 10000)
+        noise = self._write_file("noise.unknown", os.urandom(100000))
+        read = compression.read_local_sample
+        self.assertTrue(compression.is_worth_compressing("a.ma", read, config))
+        self.assertFalse(compression.is_worth_compressing("a.exr", read, config))
+        self.assertTrue(compression.is_worth_compressing(text, read, config))
+        self.assertFalse(compression.is_worth_compressing(noise, read, config))
+        config["compression"] = "never"
+        self.assertFalse(compression.is_worth_compressing("a.ma", read, config))
+        config["compression"] = "always"
+        self.assertTrue(compression.is_worth_compressing(noise, read, config))
+
+    def test_put_and_get_compressed(self):
+        data = b"setAttr \".tx\" 0;\n" * 10000
+        src = self._write_file("src.ma", data)
+        origin = os.path.join(self.tmp_dir, "origin.ma")
+        dst = os.path.join(self.tmp_dir, "dst.ma")
+        self.assertTrue(self.ssh_connection._put_compressed(src, origin))
+        self.assertTrue(self.ssh_connection._get_compressed(origin, dst, False))
+        with open(dst, "rb") as f:
+            self.assertEqual(data, f.read())
+
+    def test_put_compressed_hash_src(self):
+        data = b"setAttr \".tx\" 0;\n" * 10000
+        src = self._write_file("src.ma", data)
+        origin = os.path.join(self.tmp_dir, "origin.ma")
+        self.assertEqual(
+            hashlib.sha256(data).hexdigest(),
+            self.ssh_connection._put_compressed(src, origin, hash_src=True)
+        )
+
+    def test_get_compressed_dir(self):
+        self._write_file("origin/a.json", b"{}")
+        self._write_file("origin/sub/b.json", b"[]")
+        dst = os.path.join(self.tmp_dir, "dst")
+        self._write_file("dst/local.json", b"{}")
+        self.assertTrue(self.ssh_connection._get_compressed(
+            os.path.join(self.tmp_dir, "origin"), dst, True
+        ))
+        for path in ("a.json", "sub/b.json", "local.json"):
+            self.assertTrue(os.path.exists(os.path.join(dst, path)))
+
+    def test_get_compressed_missing_file(self):
+        dst = os.path.join(self.tmp_dir, "dst.ma")
+        self.assertFalse(self.ssh_connection._get_compressed(
+            os.path.join(self.tmp_dir, "not_a_file.ma"), dst, False
+        ))
+        self.assertEqual([], os.listdir(self.tmp_dir))
+
+
+class TestDeltaTransfer(unittest.TestCase):
+
+    def setUp(self):
+        self.basis = b"".join(
+            "setAttr \".attr{}\" -type double {};\n".format(i, i * 7).encode()
+            for i in range(100000)
+        )
+
+    def _delta(self, data):
+        signature = io.StringIO()
+        delta_transfer.write_signature(io.BytesIO(self.basis), signature)
+        delta = io.BytesIO()
+        stats = delta_transfer.write_delta(
+            delta_transfer.parse_signature(signature.getvalue().splitlines()),
+            io.BytesIO(data), delta
+        )
+        output = io.BytesIO()
+        delta.seek(0)
+        delta_transfer.apply_delta(io.BytesIO(self.basis), delta, output)
+        self.assertEqual(data, output.getvalue())
+        return stats
+
+    def test_chunks_cover_file(self):
+        chunks = list(delta_transfer.iter_chunks(io.BytesIO(self.basis)))
+        self.assertEqual(self.basis, b"".join(chunk for _, chunk in chunks))
+        offset = 0
+        for chunk_offset, chunk in chunks:
+            self.assertEqual(offset, chunk_offset)
+            offset += len(chunk)
+
+    def test_chunks_across_reads(self):
+        # cut points do not depend on where reads of the file end.
+        chunks = list(delta_transfer.iter_chunks(io.BytesIO(self.basis)))
+        for read_size in (7, 36, 4096):
+            with mock.patch.object(delta_transfer, "READ_SIZE", read_size):
+                self.assertEqual(
+                    chunks,
+                    list(delta_transfer.iter_chunks(io.BytesIO(self.basis)))
+                )
+
+    def test_lightly_modified_file(self):
+        data = self.basis[:1000] + b"createNode mesh;\n" + self.basis[1200:]
+        literal, copied = self._delta(data)
+        self.assertLess(literal, len(data) // 100)
+        self.assertEqual(len(data), literal + copied)
+
+    def test_unrelated_file(self):
+        data = os.urandom(300000)
+        literal, copied = self._delta(data)
+        self.assertEqual((len(data), 0), (literal, copied))
+
+
+class TestRetry(unittest.TestCase):
+
+    def setUp(self):
+        self.ssh_connection = SSHConnection("localhost", "user1")
+        self.ssh_connection.transfer_config = {
+            "retry_attempts": 2,
+            "retry_backoff": 0,
+        }
+        self.alive = False
+        self.ssh_connection.check_is_alive = lambda: self.alive
+        self.ssh_connection.reconnect = mock.Mock()
+        self.calls = 0
+
+    def _drop_connection(self, drop_number):
+        def func():
+            self.calls += 1
+            if self.calls <= drop_number:
+                raise EOFError("connection dropped")
+            return "done"
+        return func
+
+    def test_retry_idempotent(self):
+        self.assertEqual("done", self.ssh_connection._call_with_retry(
+            "get", True, self._drop_connection(2)
+        ))
+        self.assertEqual(3, self.calls)
+        self.assertEqual(2, self.ssh_connection.reconnect.call_count)
+
+    def test_retry_attempts_exhausted(self):
+        with self.assertRaises(SSH_ConnectionError_E):
+            self.ssh_connection._call_with_retry(
+                "get", True, self._drop_connection(3)
+            )
+        self.assertEqual(3, self.calls)
+
+    def test_no_retry_when_not_idempotent(self):
+        with self.assertRaises(SSH_OperationInterrupted_E):
+            self.ssh_connection._call_with_retry(
+                "put", False, self._drop_connection(1)
+            )
+        self.assertEqual(1, self.calls)
+        # connection is opened again for next operations.
+        self.assertEqual(1, self.ssh_connection.reconnect.call_count)
+
+    def test_error_with_live_connection(self):
+        self.alive = True
+        with self.assertRaises(EOFError):
+            self.ssh_connection._call_with_retry(
+                "get", True, self._drop_connection(1)
+            )
+        self.ssh_connection.reconnect.assert_not_called()
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,205 @@
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from vit.connection import ssh_control
+from vit.connection.ssh_control import SSHControlClient, SSHControlDaemon
+from vit.custom_exceptions import *
+
+from tests.fake_ssh_connection import FakeSSHConnection
+
+
+class TestSSHControl(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.tmp_dir, "control.sock")
+        self.daemon = SSHControlDaemon(
+            self.socket_path,
+            FakeSSHConnection,
+            health_check_interval=3600
+        )
+        self.thread = threading.Thread(target=self.daemon.serve_forever)
+        self.thread.start()
+        while not os.path.exists(self.socket_path):
+            pass
+
+    def tearDown(self):
+        self.daemon.shutdown()
+        self.thread.join()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _get_client(self):
+        return SSHControlClient(self.socket_path, "localhost", 22, "user1")
+
+    def test_session_is_shared_between_clients(self):
+        client_1 = self._get_client()
+        self.assertFalse(client_1.call("status"))
+        client_1.call("open", "password")
+        client_1.close()
+
+        client_2 = self._get_client()
+        self.assertTrue(client_2.call("status"))
+        self.assertTrue(client_2.call("exec_command", "ls " + self.tmp_dir))
+        client_2.close()
+        self.assertEqual(1, len(self.daemon.sessions))
+
+    def test_session_per_transfer_config(self):
+        clients = []
+        for transport in ("scp", "sftp", "sftp"):
+            client = SSHControlClient(
+                self.socket_path, "localhost", 22, "user1",
+                transfer_config={"transport": transport}
+            )
+            if not client.call("status"):
+                client.call("open", "password")
+            clients.append(client)
+        self.assertEqual(2, len(self.daemon.sessions))
+        self.assertEqual(
+            [{"transport": "scp"}, {"transport": "sftp"}],
+            sorted(
+                (session.connection.transfer_config
+                 for session in self.daemon.sessions.values()),
+                key=lambda config: config["transport"]
+            )
+        )
+        for client in clients:
+            client.close()
+
+    def test_call_without_session(self):
+        client = self._get_client()
+        with self.assertRaises(SSH_ControlError_E):
+            client.call("exec_command", "ls")
+        client.close()
+
+    def test_method_not_allowed(self):
+        client = self._get_client()
+        client.call("open", "password")
+        with self.assertRaises(SSH_ControlError_E):
+            client.call("close_connection")
+        client.close()
+
+    def test_exception_type_kept(self):
+        client = self._get_client()
+        client.call("open", "password")
+        session = next(iter(self.daemon.sessions.values()))
+
+        def interrupted_put(*args, **kargs):
+            raise SSH_OperationInterrupted_E("user1@localhost", "upload")
+        session.connection.put = interrupted_put
+        with self.assertRaises(SSH_OperationInterrupted_E) as context:
+            client.call("put", "src", "dst")
+        self.assertEqual("upload", context.exception.operation)
+        client.close()
+
+    def test_transfer_progress(self):
+        src = os.path.join(self.tmp_dir, "src")
+        with open(src, "w") as f:
+            f.write("some data")
+        client = self._get_client()
+        client.call("open", "password")
+        sizes = []
+        client.call(
+            "put", src, os.path.join(self.tmp_dir, "dst"),
+            on_bytes=sizes.append
+        )
+        self.assertEqual([9], sizes)
+        # next call on the same client is answered normally.
+        self.assertTrue(client.call("status"))
+        client.close()
+
+    def test_calls_run_at_once(self):
+        client_1 = self._get_client()
+        client_1.call("open", "password")
+        session = next(iter(self.daemon.sessions.values()))
+        put_started = threading.Event()
+        put_done = threading.Event()
+
+        def long_put(*args, **kargs):
+            put_started.set()
+            put_done.wait(10)
+        session.connection.put = long_put
+        thread = threading.Thread(
+            target=client_1.call,
+            args=("put", "src", "dst")
+        )
+        thread.start()
+        put_started.wait(10)
+        # commands of other clients are answered during the transfer.
+        client_2 = self._get_client()
+        self.assertTrue(client_2.call("exec_command", "ls " + self.tmp_dir))
+        self.daemon.idle_timeout = 0
+        self.daemon.reap_sessions()
+        self.assertEqual(1, len(self.daemon.sessions))
+        put_done.set()
+        thread.join()
+        client_1.close()
+        client_2.close()
+
+    def test_idle_session_reaped(self):
+        client = self._get_client()
+        client.call("open", "password")
+        self.daemon.idle_timeout = 0
+        self.assertTrue(self.daemon.reap_sessions())
+        self.assertFalse(client.call("status"))
+        client.close()
+
+    def test_attach(self):
+        client = self._get_client()
+        client.call("open", "password")
+        client.close()
+        client = ssh_control.attach(
+            "localhost", 22, "user1",
+            socket_path=self.socket_path
+        )
+        self.assertTrue(client.call("status"))
+        client.close()
+
+
+class TestSSHControlSpawn(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.tmp_dir, "control.sock")
+        self.daemon = None
+        self.thread = None
+
+    def tearDown(self):
+        if self.daemon is not None:
+            self.daemon.shutdown()
+            self.thread.join()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _start_daemon(self, *args, **kargs):
+        self.daemon = SSHControlDaemon(
+            self.socket_path,
+            FakeSSHConnection,
+            health_check_interval=3600
+        )
+        self.thread = threading.Thread(target=self.daemon.serve_forever)
+        self.thread.start()
+
+    def test_stale_socket_replaced(self):
+        # socket file of a daemon gone without removing it.
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(self.socket_path)
+        stale.close()
+        with mock.patch.object(
+                ssh_control.subprocess, "Popen",
+                side_effect=self._start_daemon), \
+                mock.patch.object(ssh_control, "getpass", return_value="password"):
+            client = ssh_control.attach(
+                "localhost", 22, "user1",
+                socket_path=self.socket_path
+            )
+        self.assertIsNotNone(self.daemon)
+        self.assertTrue(client.call("status"))
+        client.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
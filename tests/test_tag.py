@@ -1,7 +1,9 @@
 import unittest
+from unittest import mock
 
 from vit.custom_exceptions import *
 from vit.vit_lib import (tag, branch, fetch)
+from vit.vit_lib.misc import tree_fetch
 
 from tests import vit_test_repo as repo
 from vit.connection.connection_utils import ssh_connect_auto
@@ -71,6 +73,38 @@ class TestTag(unittest.TestCase):
                     "my_tag_1"
                 )
 
+    def test_create_tag_light_concurrently(self):
+        fetch_stage = tree_fetch.fetch_up_to_date_stage_tree_asset
+
+        def fetch_then_tag_from_other_clone(*args):
+            # other user creates the tag once this one fetched its stage.
+            staged_asset_tree = fetch_stage(*args)
+            patched.stop()
+            with ssh_connect_auto(repo.test_local_path_2) as vit_connection:
+                tag.create_tag_light_from_branch(
+                    vit_connection,
+                    repo.package_ok,
+                    repo.asset_ok,
+                    "base",
+                    "my_tag_1"
+                )
+            return staged_asset_tree
+
+        patched = mock.patch.object(
+            tree_fetch, "fetch_up_to_date_stage_tree_asset",
+            side_effect=fetch_then_tag_from_other_clone
+        )
+        with ssh_connect_auto(repo.test_local_path_1) as vit_connection:
+            patched.start()
+            with self.assertRaises(Tag_AlreadyExists_E):
+                tag.create_tag_light_from_branch(
+                    vit_connection,
+                    repo.package_ok,
+                    repo.asset_ok,
+                    "base",
+                    "my_tag_1"
+                )
+
     def test_create_annotated_tag_from_branch(self):
         with ssh_connect_auto(repo.test_local_path_1) as vit_connection:
             tag.create_tag_annotated_from_branch(
@@ -0,0 +1,154 @@
+import os
+import time
+import shutil
+import tempfile
+import threading
+import unittest
+
+from vit.connection import transfer_scheduler
+from vit.connection.ssh_connection import SSHConnection
+from vit.connection.transfer_scheduler import (
+    TransferScheduler, TokenBucket,
+    PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
+)
+
+
+class TestTransferScheduler(unittest.TestCase):
+
+    def _start(self, scheduler, priority, name, done):
+        def transfer():
+            with scheduler.transfer(priority):
+                done.append(name)
+        thread = threading.Thread(target=transfer)
+        thread.start()
+        return thread
+
+    def _wait_queue_depth(self, scheduler, depth):
+        while scheduler.get_queue_depth() != depth:
+            time.sleep(0.01)
+
+    def test_interactive_before_background(self):
+        scheduler = TransferScheduler(max_transfers=1)
+        done = []
+        scheduler.acquire()
+        threads = [
+            self._start(scheduler, PRIORITY_BACKGROUND, "fetch_1", done)
+        ]
+        self._wait_queue_depth(scheduler, 1)
+        threads.append(
+            self._start(scheduler, PRIORITY_BACKGROUND, "fetch_2", done)
+        )
+        self._wait_queue_depth(scheduler, 2)
+        threads.append(
+            self._start(scheduler, PRIORITY_INTERACTIVE, "checkout", done)
+        )
+        self._wait_queue_depth(scheduler, 3)
+        self.assertEqual(
+            {"interactive": 1, "background": 2, "running": 1},
+            scheduler.get_queue_status()
+        )
+        self.assertEqual(2, scheduler.get_queue_depth(PRIORITY_BACKGROUND))
+        scheduler.release()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(["checkout", "fetch_1", "fetch_2"], done)
+        self.assertEqual(0, scheduler.get_queue_depth())
+
+    def test_max_transfers(self):
+        scheduler = TransferScheduler(max_transfers=2)
+        scheduler.acquire()
+        scheduler.acquire()
+        done = []
+        thread = self._start(scheduler, PRIORITY_INTERACTIVE, "commit", done)
+        self._wait_queue_depth(scheduler, 1)
+        self.assertEqual([], done)
+        scheduler.set_max_transfers(3)
+        thread.join()
+        self.assertEqual(["commit"], done)
+
+    def test_shared_between_processes(self):
+        # schedulers sharing lock files, as schedulers of two processes.
+        lock_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, lock_dir)
+        checkout_process = TransferScheduler(max_transfers=1, lock_dir=lock_dir)
+        fetch_process = TransferScheduler(max_transfers=1, lock_dir=lock_dir)
+        done = []
+        checkout_process.acquire()
+        fetch_thread = self._start(fetch_process, PRIORITY_BACKGROUND, "fetch", done)
+        time.sleep(0.2)
+        self.assertEqual([], done)
+        commit_process = TransferScheduler(max_transfers=1, lock_dir=lock_dir)
+        commit_thread = self._start(commit_process, PRIORITY_INTERACTIVE, "commit", done)
+        while not fetch_process.has_interactive_waiting():
+            time.sleep(0.01)
+        checkout_process.release()
+        commit_thread.join()
+        fetch_thread.join()
+        self.assertEqual(["commit", "fetch"], done)
+        self.assertFalse(fetch_process.has_interactive_waiting())
+
+    def test_current_priority(self):
+        self.assertEqual(
+            PRIORITY_INTERACTIVE,
+            transfer_scheduler.get_current_priority()
+        )
+        with transfer_scheduler.transfer_priority(PRIORITY_BACKGROUND):
+            self.assertEqual(
+                PRIORITY_BACKGROUND,
+                transfer_scheduler.get_current_priority()
+            )
+        self.assertEqual(
+            PRIORITY_INTERACTIVE,
+            transfer_scheduler.get_current_priority()
+        )
+
+
+class TestBandwidthLimit(unittest.TestCase):
+
+    def test_token_bucket(self):
+        bucket = TokenBucket(rate=100000)
+        start = time.monotonic()
+        for _ in range(4):
+            bucket.consume(50000)
+        # first 100000 bytes are the burst, 100000 more take a second.
+        self.assertGreaterEqual(time.monotonic() - start, 0.9)
+
+    def test_shared_token_bucket(self):
+        lock_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, lock_dir)
+        state_path = os.path.join(lock_dir, "bucket")
+        buckets = [
+            TokenBucket(rate=100000, state_path=state_path)
+            for _ in range(2)
+        ]
+        start = time.monotonic()
+        for bucket in buckets:
+            bucket.consume(100000)
+        # second bucket finds the burst consumed by the first one.
+        self.assertGreaterEqual(time.monotonic() - start, 0.9)
+
+    def test_no_limit(self):
+        bucket = TokenBucket()
+        start = time.monotonic()
+        bucket.consume(10 ** 12)
+        self.assertLess(time.monotonic() - start, 0.1)
+
+    def test_bandwidth_callback(self):
+        ssh_connection = SSHConnection("localhost", "user_bandwidth")
+        ssh_connection.configure_transfer()
+        self.assertIsNone(ssh_connection._get_bandwidth_callback(
+            PRIORITY_BACKGROUND
+        ))
+        ssh_connection.configure_transfer(background_bandwidth_limit=100000)
+        self.assertIsNone(ssh_connection._get_bandwidth_callback(
+            PRIORITY_INTERACTIVE
+        ))
+        on_bytes = ssh_connection._get_bandwidth_callback(PRIORITY_BACKGROUND)
+        start = time.monotonic()
+        on_bytes(200000)
+        self.assertGreaterEqual(time.monotonic() - start, 0.9)
+        ssh_connection.configure_transfer()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,171 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from vit import vit_serve
+from vit.file_handlers import tree_journal
+from vit.file_handlers import repo_config as repo_config_func
+from vit.file_handlers.repo_config import RepoConfig
+from vit.file_handlers.tree_asset import TreeAsset
+from vit.vit_lib import checkout, commit, fetch
+from vit.vit_lib.misc import file_name_generation
+
+from tests import vit_test_repo as repo
+from vit.connection.connection_utils import ssh_connect_auto
+
+
+class TestTreeJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, "asset.json")
+        TreeAsset.create_file(self.path, "asset")
+        with open(self.path, "rb") as f:
+            self.content = f.read()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_replay(self):
+        tree_journal.append_journal(self.path, (
+            ("set_branch", {"branch": "base", "filepath": "a_file"}),
+            ("set_editor", {"filepath": "a_file", "user": "user1"}),
+        ))
+        tree_journal.append_journal(self.path, (
+            ("add_tag_lightweight", {"filepath": "a_file", "tagname": "tag"}),
+        ))
+        with TreeAsset(self.path) as tree_asset:
+            self.assertEqual(3, tree_asset.journal_records)
+            self.assertEqual("a_file", tree_asset.get_branch_current_file("base"))
+            self.assertEqual("user1", tree_asset.get_editor("a_file"))
+            self.assertEqual("a_file", tree_asset.get_tag("tag"))
+        # replayed data is not written back.
+        with open(self.path, "rb") as f:
+            self.assertEqual(self.content, f.read())
+
+    def test_write_folds_journal(self):
+        tree_journal.append_journal(self.path, (
+            ("set_branch", {"branch": "base", "filepath": "a_file"}),
+        ))
+        with TreeAsset(self.path) as tree_asset:
+            tree_asset.set_editor("a_file", "user1")
+        self.assertEqual([], tree_journal.read_journal(self.path))
+        self.assertEqual(0, os.path.getsize(tree_journal.get_journal_path(self.path)))
+        with TreeAsset(self.path) as tree_asset:
+            self.assertEqual(0, tree_asset.journal_records)
+            self.assertEqual("a_file", tree_asset.get_branch_current_file("base"))
+            self.assertEqual("user1", tree_asset.get_editor("a_file"))
+
+    def test_partial_record(self):
+        with open(tree_journal.get_journal_path(self.path), "w") as f:
+            f.write('["set_branch", {"branch": "base", "filep')
+        tree_journal.append_journal(self.path, (
+            ("set_branch", {"branch": "dev", "filepath": "a_file"}),
+        ))
+        with TreeAsset(self.path) as tree_asset:
+            self.assertEqual(("dev",), tree_asset.list_branches())
+
+
+class TestTreeJournalOrigin(unittest.TestCase):
+
+    def setUp(self):
+        repo.setup_test_repo("repo_base")
+        self.tree_asset_path = file_name_generation.generate_asset_tree_file_path(
+            repo.package_ok, repo.asset_ok
+        )
+        self.origin_tree_asset_path = os.path.join(
+            repo.test_origin_path_ok, self.tree_asset_path
+        )
+        with open(self.origin_tree_asset_path, "rb") as f:
+            self.content = f.read()
+
+    def tearDown(self):
+        repo.dispose_test_repo()
+
+    def _enable_journal(self, max_records=200):
+        # set on origin, clones get it by fetching.
+        with RepoConfig(repo.test_origin_path_ok) as repo_config:
+            repo_config.set_tree_journal_max_records(max_records)
+        with ssh_connect_auto(repo.test_local_path_1) as vit_connection:
+            fetch.fetch(vit_connection)
+
+    def _commit(self):
+        with ssh_connect_auto(repo.test_local_path_1) as vit_connection:
+            checkout_file = checkout.checkout_asset_by_branch(
+                vit_connection,
+                repo.package_ok,
+                repo.asset_ok,
+                "base",
+                editable=True
+            )
+            with open(repo.checkout_path_repo_1, "a") as f:
+                f.write("new line\n")
+            return commit.commit_file(
+                vit_connection,
+                checkout_file,
+                "new commit"
+            )
+
+    def _is_rewritten(self):
+        with open(self.origin_tree_asset_path, "rb") as f:
+            return f.read() != self.content
+
+    def test_journal_opt_in(self):
+        # repositories do not journal unless enabled: vit versions without
+        # journal support keep reading whole files.
+        with RepoConfig(repo.test_origin_path_ok) as repo_config:
+            self.assertEqual(0, repo_config.get_repository_format_version())
+        self._commit()
+        self.assertTrue(self._is_rewritten())
+        self.assertEqual([], tree_journal.read_journal(self.origin_tree_asset_path))
+        self._enable_journal()
+        with RepoConfig(repo.test_local_path_1) as repo_config:
+            self.assertEqual(
+                repo_config_func.FORMAT_VERSION_TREE_JOURNAL,
+                repo_config.get_repository_format_version()
+            )
+            self.assertEqual(200, repo_config.get_tree_journal_max_records())
+
+    def test_commit_appends_to_journal(self):
+        self._enable_journal()
+        new_file_path = self._commit()
+        self.assertFalse(self._is_rewritten())
+        journal_path = tree_journal.get_journal_path(self.origin_tree_asset_path)
+        self.assertLess(os.path.getsize(journal_path), 1024)
+        self.assertEqual(
+            ["become_editor", "update_on_commit"],
+            [r[0] for r in tree_journal.read_journal(self.origin_tree_asset_path)]
+        )
+        with ssh_connect_auto(repo.test_local_path_2) as vit_connection:
+            checkout.checkout_asset_by_branch(
+                vit_connection,
+                repo.package_ok,
+                repo.asset_ok,
+                "base"
+            )
+        local_tree_asset = TreeAsset(
+            os.path.join(repo.test_local_path_2, self.tree_asset_path)
+        )
+        with local_tree_asset:
+            self.assertEqual(new_file_path, local_tree_asset.get_branch_current_file("base"))
+
+    def test_compaction(self):
+        self._enable_journal(max_records=2)
+        for user in ("user1", "user2", "user3"):
+            reply = vit_serve.handle_request({
+                "root": os.path.abspath(repo.test_origin_path_ok),
+                "path": self.tree_asset_path,
+                "handler": "TreeAsset",
+                "operations": [["set_editor", {"filepath": "a_file", "user": user}]]
+            })
+            self.assertEqual("ok", reply["status"])
+        # third record exceeds tree_journal_max_records: folded in the file.
+        self.assertTrue(self._is_rewritten())
+        self.assertEqual([], tree_journal.read_journal(self.origin_tree_asset_path))
+        with TreeAsset(self.origin_tree_asset_path) as tree_asset:
+            self.assertEqual("user3", tree_asset.get_editor("a_file"))
+
+
+if __name__ == "__main__":
+    unittest.main()
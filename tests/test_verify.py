@@ -0,0 +1,97 @@
+import os
+import unittest
+
+from vit.custom_exceptions import *
+from vit.vit_lib import (
+    checkout, commit,
+    rebase, verify
+)
+
+from tests import vit_test_repo as repo
+from vit.connection.connection_utils import ssh_connect_auto
+
+
+class TestVerify(unittest.TestCase):
+
+    def setUp(self):
+        repo.setup_test_repo("repo_base")
+        with ssh_connect_auto(repo.test_local_path_1) as vit_connection:
+            checkout_file = checkout.checkout_asset_by_branch(
+                vit_connection,
+                repo.package_ok,
+                repo.asset_ok,
+                "base",
+                editable=True
+            )
+            with open(repo.checkout_path_repo_1, "a") as f:
+                f.write("ouiii")
+            self.commit_file = commit.commit_file(
+                vit_connection,
+                checkout_file,
+                "new commit"
+            )
+
+    def tearDown(self):
+        repo.dispose_test_repo()
+
+    def _corrupt_commit_at_origin(self):
+        with open(os.path.join(repo.test_origin_path_ok, self.commit_file), "a") as f:
+            f.write("corrupted")
+
+    def test_hash_many_on_origin(self):
+        with ssh_connect_auto(repo.test_local_path_1) as vit_connection:
+            ret = vit_connection.hash_many_on_origin(
+                (self.commit_file, "not/a/file")
+            )
+        self.assertIsNone(ret["not/a/file"])
+        self.assertEqual(64, len(ret[self.commit_file]))
+
+    def test_verify_asset(self):
+        with ssh_connect_auto(repo.test_local_path_1) as vit_connection:
+            ret = verify.verify_asset(vit_connection, repo.package_ok, repo.asset_ok)
+        self.assertTrue(ret)
+        self.assertEqual({verify.FILE_OK}, set(ret.values()))
+
+    def test_verify_asset_corrupted_and_missing(self):
+        self._corrupt_commit_at_origin()
+        with ssh_connect_auto(repo.test_local_path_1) as vit_connection:
+            ret = verify.verify_asset(vit_connection, repo.package_ok, repo.asset_ok)
+        self.assertEqual(verify.FILE_CORRUPTED, ret[self.commit_file])
+        os.remove(os.path.join(repo.test_origin_path_ok, self.commit_file))
+        with ssh_connect_auto(repo.test_local_path_1) as vit_connection:
+            ret = verify.verify_asset(vit_connection, repo.package_ok, repo.asset_ok)
+        self.assertEqual(verify.FILE_MISSING, ret[self.commit_file])
+
+    def test_checkout_corrupted_file(self):
+        self._corrupt_commit_at_origin()
+        with ssh_connect_auto(repo.test_local_path_1) as vit_connection:
+            with self.assertRaises(Path_FileCorruptedAtOrigin_E):
+                checkout.checkout_asset_by_branch(
+                    vit_connection,
+                    repo.package_ok,
+                    repo.asset_ok,
+                    "base",
+                    verify_file=True
+                )
+            checkout.checkout_asset_by_branch(
+                vit_connection,
+                repo.package_ok,
+                repo.asset_ok,
+                "base"
+            )
+
+    def test_rebase_from_corrupted_commit(self):
+        self._corrupt_commit_at_origin()
+        with ssh_connect_auto(repo.test_local_path_1) as vit_connection:
+            with self.assertRaises(Path_FileCorruptedAtOrigin_E):
+                rebase.rebase_from_commit(
+                    vit_connection,
+                    repo.package_ok,
+                    repo.asset_ok,
+                    "base", self.commit_file,
+                    verify_commit=True
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
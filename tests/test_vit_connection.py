@@ -0,0 +1,241 @@
+import os
+import time
+import unittest
+from unittest import mock
+
+from vit import constants
+from vit.custom_exceptions import *
+from vit.file_handlers.repo_config import RepoConfig
+
+from vit.connection.origin_cache import OriginCache
+from vit.connection import vit_connection as vit_connection_module
+
+from tests import vit_test_repo as repo
+from vit.connection.connection_utils import ssh_connect_auto
+
+
+class TestVitConnection(unittest.TestCase):
+
+    def setUp(self):
+        repo.setup_test_repo("repo_template_package")
+
+    def tearDown(self):
+        repo.dispose_test_repo()
+
+    def test_exists_many_on_origin(self):
+        with ssh_connect_auto(repo.test_local_path_1) as vit_connection:
+            ret = vit_connection.exists_many_on_origin((
+                constants.VIT_PACKAGES,
+                repo.package_ok,
+                "not/a/path",
+                "with space/and'quote"
+            ))
+        self.assertEqual({
+            constants.VIT_PACKAGES: True,
+            repo.package_ok: True,
+            "not/a/path": False,
+            "with space/and'quote": False
+        }, ret)
+
+    def test_create_dirs_at_origin_if_not_exist(self):
+        with ssh_connect_auto(repo.test_local_path_1) as vit_connection:
+            vit_connection.create_dirs_at_origin_if_not_exist(
+                repo.package_ok, "dir_a/sub", "dir_b"
+            )
+            self.assertTrue(all(
+                vit_connection.exists_many_on_origin(
+                    (repo.package_ok, "dir_a/sub", "dir_b")
+                ).values()
+            ))
+
+    def test_transfer_config_from_repo_config(self):
+        with RepoConfig(repo.test_local_path_1) as repo_config:
+            repo_config.set_connection_config(transport="sftp")
+        with ssh_connect_auto(repo.test_local_path_1) as vit_connection:
+            transfer_config = vit_connection.ssh_connection.transfer_config
+        self.assertEqual("sftp", transfer_config["transport"])
+        self.assertIn("sftp_buffer_size", transfer_config)
+
+    def test_progress_observer(self):
+        progress_list = []
+        events = []
+
+        def observer(progress):
+            if progress not in progress_list:
+                progress_list.append(progress)
+            events.append((progress.direction, progress.finished))
+
+        src = os.path.join(repo.test_local_path_1, "data.bin")
+        with open(src, "wb") as f:
+            f.write(os.urandom(5000))
+        with ssh_connect_auto(repo.test_local_path_1) as vit_connection:
+            vit_connection.add_progress_observer(observer)
+            vit_connection.put_data_to_origin("data.bin", "data.bin")
+            vit_connection.get_data_from_origin("data.bin", "data_back.bin")
+        self.assertEqual(
+            [("put", False), ("put", True), ("get", False), ("get", True)],
+            events
+        )
+        for progress in progress_list:
+            self.assertEqual(5000, progress.total)
+            self.assertEqual(5000, progress.bytes_done)
+        self.assertTrue(progress_list[-1].success)
+        self.assertGreater(progress_list[-1].throughput, 0)
+
+
+    def test_put_metadata_interrupted(self):
+        with ssh_connect_auto(repo.test_local_path_1) as vit_connection:
+            put = vit_connection.ssh_connection.put
+            calls = []
+            lost_lock = []
+
+            def put_dropping_connection(*args, **kargs):
+                calls.append(kargs.get("retry", False))
+                if len(calls) == 1:
+                    if lost_lock:
+                        vit_connection.unlock()
+                    raise SSH_OperationInterrupted_E(
+                        vit_connection.ssh_link, "upload"
+                    )
+                return put(*args, **kargs)
+
+            vit_connection.ssh_connection.put = put_dropping_connection
+            staged = vit_connection.get_metadata_from_origin_as_staged(
+                constants.VIT_CONFIG, RepoConfig
+            )
+            # origin still locked: uploaded again.
+            with vit_connection.lock_manager:
+                vit_connection.put_metadata_to_origin(staged, keep_stage_file=True)
+            self.assertEqual([False, True], calls)
+
+            # lock lost meanwhile: not retried.
+            calls.clear()
+            lost_lock.append(True)
+            vit_connection.lock()
+            with self.assertRaises(SSH_OperationInterrupted_E):
+                vit_connection.put_metadata_to_origin(staged)
+            self.assertEqual([False], calls)
+
+    def test_lock_held_by_someone_else(self):
+        lock_path = os.path.join(repo.test_origin_path_ok, constants.VIT_LOCK_FILE)
+        with ssh_connect_auto(repo.test_local_path_1) as vit_connection:
+            open(lock_path, "w").close()
+            self.assertFalse(vit_connection.lock())
+            with mock.patch.object(vit_connection_module, "LOCK_TIMEOUT", 0.1):
+                with self.assertRaises(RepoIsLock_E):
+                    with vit_connection.lock_manager:
+                        pass
+            # not created by this connection: left on origin.
+            vit_connection.unlock()
+            self.assertTrue(os.path.exists(lock_path))
+            os.remove(lock_path)
+
+            with vit_connection.lock_manager:
+                with vit_connection.lock_manager:
+                    self.assertTrue(os.path.exists(lock_path))
+                self.assertTrue(os.path.exists(lock_path))
+            self.assertFalse(os.path.exists(lock_path))
+
+    def test_stale_stage_files_removed(self):
+        stage_dir = os.path.join(repo.test_local_path_1, constants.VIT_STAGE_DIR)
+        stale = os.path.join(stage_dir, "stale.part")
+        recent = os.path.join(stage_dir, "recent.checkpoint.json")
+        for path in (stale, recent):
+            open(path, "w").close()
+        old = time.time() - 30 * 86400
+        os.utime(stale, (old, old))
+        with ssh_connect_auto(repo.test_local_path_1):
+            pass
+        self.assertFalse(os.path.exists(stale))
+        self.assertTrue(os.path.exists(recent))
+
+    def test_exists_from_origin_cache(self):
+        with ssh_connect_auto(repo.test_local_path_1) as vit_connection:
+            vit_connection.origin_cache.ttl = 60
+            exec_command_output = vit_connection.ssh_connection.exec_command_output
+            commands = []
+
+            def exec_command_output_counted(command, retry=False):
+                commands.append(command)
+                return exec_command_output(command, retry)
+
+            vit_connection.ssh_connection.exec_command_output = exec_command_output_counted
+            ret = vit_connection.exists_many_on_origin((
+                os.path.join(repo.package_ok, "a"),
+                os.path.join(repo.package_ok, "b")
+            ))
+            self.assertEqual([False, False], list(ret.values()))
+            self.assertFalse(
+                vit_connection.exists_on_origin(os.path.join(repo.package_ok, "c"))
+            )
+            self.assertEqual(1, len(commands))
+
+            # vit writing on origin invalidates the cache.
+            vit_connection.create_dirs_at_origin_if_not_exist(
+                os.path.join(repo.package_ok, "a")
+            )
+            self.assertTrue(
+                vit_connection.exists_on_origin(os.path.join(repo.package_ok, "a"))
+            )
+
+            # origin lock is always checked on origin.
+            commands.clear()
+            vit_connection.check_is_lock()
+            vit_connection.check_is_lock()
+            self.assertEqual(2, len(commands))
+
+
+class TestOriginCache(unittest.TestCase):
+
+    def test_listing(self):
+        cache = OriginCache(ttl=60)
+        self.assertIsNone(cache.exists("dir/a"))
+        cache.set_listing("dir", ["a"])
+        self.assertTrue(cache.exists("dir/a"))
+        self.assertFalse(cache.exists("dir/b"))
+        self.assertIsNone(cache.exists("other/a"))
+
+    def test_invalidate(self):
+        cache = OriginCache(ttl=60)
+        cache.set_listing("dir", ["a"])
+        cache.set_listing("dir/a", ["file"])
+        cache.invalidate("dir/a")
+        self.assertIsNone(cache.exists("dir/a"))
+        self.assertIsNone(cache.exists("dir/a/file"))
+        cache.set_exists("dir/b", True)
+        self.assertTrue(cache.exists("dir/b"))
+
+    def test_invalidate_ancestors(self):
+        cache = OriginCache(ttl=60)
+        cache.set_listing("", ["other"])
+        cache.set_listing("dir", [])
+        cache.set_exists("dir/a", False)
+        cache.invalidate("dir/a/b", ancestors=True)
+        self.assertIsNone(cache.exists("dir"))
+        self.assertIsNone(cache.exists("dir/a"))
+        self.assertIsNone(cache.exists("dir/a/b"))
+
+    def test_mkdir_invalidates_ancestors(self):
+        repo.setup_test_repo("repo_template_package")
+        self.addCleanup(repo.dispose_test_repo)
+        new_dir = os.path.join(repo.package_ok, "a")
+        with ssh_connect_auto(repo.test_local_path_1) as vit_connection:
+            vit_connection.origin_cache.ttl = 60
+            self.assertFalse(vit_connection.exists_on_origin(new_dir))
+            vit_connection.create_dirs_at_origin_if_not_exist(
+                os.path.join(new_dir, "b", "c")
+            )
+            self.assertTrue(vit_connection.exists_on_origin(new_dir))
+
+    def test_ttl(self):
+        cache = OriginCache(ttl=0.05)
+        cache.set_listing("dir", ["a"])
+        time.sleep(0.1)
+        self.assertIsNone(cache.exists("dir/a"))
+        cache.ttl = 0
+        cache.set_listing("dir", ["a"])
+        self.assertIsNone(cache.exists("dir/a"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,154 @@
+import os
+import sys
+import unittest
+from unittest import mock
+
+import vit
+from vit import constants
+from vit import vit_serve
+from vit.custom_exceptions import *
+from vit.file_handlers.repo_config import RepoConfig
+from vit.file_handlers.tree_asset import TreeAsset
+from vit.vit_lib import checkout, commit, tag
+from vit.vit_lib.misc import file_name_generation
+
+from tests import vit_test_repo as repo
+from vit.connection.connection_utils import ssh_connect_auto
+
+
+class TestVitServe(unittest.TestCase):
+
+    def setUp(self):
+        repo.setup_test_repo("repo_base")
+        self.tree_asset_path = file_name_generation.generate_asset_tree_file_path(
+            repo.package_ok, repo.asset_ok
+        )
+        self.origin_path = os.path.abspath(repo.test_origin_path_ok)
+
+    def tearDown(self):
+        repo.dispose_test_repo()
+
+    def _request(self, *operations):
+        return vit_serve.handle_request({
+            "root": self.origin_path,
+            "path": self.tree_asset_path,
+            "handler": "TreeAsset",
+            "operations": [list(operation) for operation in operations]
+        })
+
+    def _read_origin_tree_asset(self):
+        # file and its journal.
+        with TreeAsset(os.path.join(self.origin_path, self.tree_asset_path)) as tree_asset:
+            return tree_asset.data
+
+    def _use_vit_serve_from_ssh(self):
+        src_path = os.path.dirname(os.path.dirname(vit.__file__))
+        with RepoConfig(repo.test_local_path_1) as repo_config:
+            repo_config.set_connection_config(
+                vit_serve="PYTHONPATH={} {} -m vit.vit_serve".format(
+                    src_path, sys.executable
+                )
+            )
+
+    def test_handle_request(self):
+        reply = self._request(
+            ("set_editor", {"filepath": "a_file", "user": "user1"}),
+            ("become_editor", {"filepath": "a_file", "user": "user2"}),
+        )
+        self.assertEqual("ok", reply["status"])
+        self.assertEqual([None, "user1"], reply["results"])
+        self.assertEqual(reply["data"], self._read_origin_tree_asset())
+        self.assertFalse(os.path.exists(
+            os.path.join(self.origin_path, constants.VIT_LOCK_FILE)
+        ))
+
+    def test_failed_request_does_not_change_file(self):
+        data = self._read_origin_tree_asset()
+        reply = self._request(
+            ("set_editor", {"filepath": "a_file", "user": "user1"}),
+            ("not_an_operation", {}),
+        )
+        self.assertEqual("error", reply["status"])
+        self.assertEqual(data, self._read_origin_tree_asset())
+        self.assertFalse(os.path.exists(
+            os.path.join(self.origin_path, constants.VIT_LOCK_FILE)
+        ))
+
+    def test_request_on_locked_repository(self):
+        lock_path = os.path.join(self.origin_path, constants.VIT_LOCK_FILE)
+        open(lock_path, "w").close()
+        with mock.patch.object(vit_serve, "LOCK_TIMEOUT", 0.1):
+            reply = self._request(
+                ("set_editor", {"filepath": "a_file", "user": "user1"}),
+            )
+        self.assertEqual({"status": "locked"}, reply)
+        self.assertTrue(os.path.exists(lock_path))
+
+    def test_request_outside_of_repository(self):
+        reply = vit_serve.handle_request({
+            "root": os.path.join(self.origin_path, repo.package_ok),
+            "path": os.path.join("..", self.tree_asset_path),
+            "handler": "TreeAsset",
+            "operations": [["set_editor", {"filepath": "a_file", "user": "user1"}]]
+        })
+        self.assertEqual("error", reply["status"])
+
+    def test_commit_through_vit_serve(self):
+        self._use_vit_serve_from_ssh()
+        with ssh_connect_auto(repo.test_local_path_1) as vit_connection:
+            checkout_file = checkout.checkout_asset_by_branch(
+                vit_connection,
+                repo.package_ok,
+                repo.asset_ok,
+                "base",
+                editable=True
+            )
+            with open(repo.checkout_path_repo_1, "a") as f:
+                f.write("ouiii")
+            with mock.patch.object(
+                    vit_connection, "put_metadata_to_origin",
+                    side_effect=AssertionError("metadata sent from stage")):
+                new_file_path = commit.commit_file(
+                    vit_connection,
+                    checkout_file,
+                    "new commit"
+                )
+                tag.create_tag_light_from_branch(
+                    vit_connection,
+                    repo.package_ok,
+                    repo.asset_ok,
+                    "base", "light_tag"
+                )
+            self.assertTrue(vit_connection.vit_serve_available)
+        data = self._read_origin_tree_asset()
+        self.assertEqual(new_file_path, data["branches"]["base"])
+        self.assertEqual(new_file_path, data["tags"]["light_tag"])
+        local_tree_asset = TreeAsset(
+            os.path.join(repo.test_local_path_1, self.tree_asset_path)
+        )
+        with local_tree_asset:
+            self.assertEqual(new_file_path, local_tree_asset.get_tag("light_tag"))
+
+    def test_checkout_as_editable_through_vit_serve(self):
+        self._use_vit_serve_from_ssh()
+        with ssh_connect_auto(repo.test_local_path_1) as vit_connection:
+            checkout.checkout_asset_by_branch(
+                vit_connection,
+                repo.package_ok,
+                repo.asset_ok,
+                "base",
+                editable=True
+            )
+        with self.assertRaises(Asset_AlreadyEdited_E):
+            with ssh_connect_auto(repo.test_local_path_2) as vit_connection:
+                checkout.checkout_asset_by_branch(
+                    vit_connection,
+                    repo.package_ok,
+                    repo.asset_ok,
+                    "base",
+                    editable=True
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,183 @@
+import os
+import time
+import random
+import threading
+import collections
+
+from vit import py_helpers
+from vit.custom_exceptions import SSH_ConnectionError_E, SSH_OperationInterrupted_E
+from tests.fake_ssh_connection import FakeSSHConnection
+
+# FakeSSHConnection behind a simulated WAN link: each command costs a round
+# trip, each transfer a channel open, a round trip and its size over the
+# bandwidth. Costs are added to a simulated clock (or slept for real, for
+# benchmarks) and counted in WanSSHConnection.stats, so tests can check how
+# many round trips a vit_lib operation makes.
+#
+# Injected failures happen once the operation is done on origin (reply
+# lost), like the real SSHConnection: retried if the operation is flagged
+# retry, else SSH_OperationInterrupted_E is raised.
+#
+# usage:
+#     VitConnection.SSHConnection = WanSSHConnection
+#     WanSSHConnection.profile = WanProfile(rtt=0.08, bandwidth=10 * 2**20)
+#     WanSSHConnection.stats.reset()
+
+
+class WanProfile(object):
+
+    def __init__(
+            self, rtt=0.05,
+            channel_open_rtt=None,
+            bandwidth=0,
+            jitter=0,
+            failure_rate=0,
+            seed=None,
+            real_time=False):
+        self.rtt = rtt
+        # opening a channel costs one more round trip by default.
+        self.channel_open_rtt = rtt if channel_open_rtt is None else channel_open_rtt
+        # bytes per second, 0 for no limit.
+        self.bandwidth = bandwidth
+        # each delay is multiplied by a random factor in [1 - jitter, 1 + jitter].
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.real_time = real_time
+
+
+class WanStats(object):
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.round_trips = 0
+        self.channel_opens = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.failures = 0
+        self.simulated_time = 0
+        self.round_trips_by_operation = collections.Counter()
+        self.commands = []
+
+    def as_dict(self):
+        with self.lock:
+            return {
+                "round_trips": self.round_trips,
+                "channel_opens": self.channel_opens,
+                "bytes_sent": self.bytes_sent,
+                "bytes_received": self.bytes_received,
+                "failures": self.failures,
+                "simulated_time": self.simulated_time,
+                "round_trips_by_operation": dict(self.round_trips_by_operation),
+            }
+
+
+class WanSSHConnection(FakeSSHConnection):
+
+    # class level: connections are created by VitConnection.
+    profile = WanProfile()
+    stats = WanStats()
+
+    def open_connection(self, password=None):
+        self._open_channel()
+        self._round_trip("connect")
+        return super().open_connection(password)
+
+    def put(
+            self, src, dst, recursive=False, resume=None,
+            priority=None, on_bytes=None, retry=False, hash_src=False):
+        def put():
+            self._open_channel()
+            self._round_trip("put")
+            size = _get_size(src)
+            self._send(size)
+            with self.stats.lock:
+                self.stats.bytes_sent += size
+            return super(WanSSHConnection, self).put(
+                src, dst, recursive, resume,
+                priority, on_bytes, retry, hash_src
+            )
+        return self._run("upload of {}".format(src), retry, put)
+
+    def get(
+            self, src, dst, recursive=False, resume=None,
+            priority=None, on_bytes=None, retry=False):
+        def get():
+            self._open_channel()
+            self._round_trip("get")
+            size = _get_size(src)
+            self._send(size)
+            with self.stats.lock:
+                self.stats.bytes_received += size
+            return super(WanSSHConnection, self).get(
+                src, dst, recursive, resume,
+                priority, on_bytes, retry
+            )
+        return self._run("download of {}".format(src), retry, get)
+
+    def exec_command(self, cmd, retry=False):
+        def exec_command():
+            self._round_trip("exec", cmd)
+            return super(WanSSHConnection, self).exec_command(cmd, retry)
+        return self._run("command '{}'".format(cmd), retry, exec_command)
+
+    def exec_command_output(self, cmd, retry=False):
+        def exec_command_output():
+            self._round_trip("exec", cmd)
+            return super(WanSSHConnection, self).exec_command_output(cmd, retry)
+        return self._run("command '{}'".format(cmd), retry, exec_command_output)
+
+    # -- Private -------------------------------------------------------------
+
+    def _run(self, operation, retry, func):
+        attempts = self.transfer_config.get("retry_attempts", 3) if retry else 0
+        attempt = 0
+        while True:
+            ret = func()
+            if self.profile.random.random() >= self.profile.failure_rate:
+                return ret
+            with self.stats.lock:
+                self.stats.failures += 1
+            # reconnection.
+            self._open_channel()
+            self._round_trip("connect")
+            if not retry:
+                raise SSH_OperationInterrupted_E(self.ssh_link, operation)
+            if attempt >= attempts:
+                raise SSH_ConnectionError_E(self.ssh_link, "injected failure")
+            attempt += 1
+
+    def _open_channel(self):
+        with self.stats.lock:
+            self.stats.channel_opens += 1
+        self._wait(self.profile.channel_open_rtt)
+
+    def _round_trip(self, operation, command=None):
+        with self.stats.lock:
+            self.stats.round_trips += 1
+            self.stats.round_trips_by_operation[operation] += 1
+            if command is not None:
+                self.stats.commands.append(command)
+        self._wait(self.profile.rtt)
+
+    def _send(self, size):
+        if self.profile.bandwidth:
+            self._wait(size / self.profile.bandwidth)
+
+    def _wait(self, delay):
+        jitter = self.profile.jitter
+        if jitter:
+            delay *= self.profile.random.uniform(1 - jitter, 1 + jitter)
+        with self.stats.lock:
+            self.stats.simulated_time += delay
+        if self.profile.real_time:
+            time.sleep(delay)
+
+
+def _get_size(path):
+    if os.path.isdir(path):
+        return py_helpers.get_dir_size(path)
+    return os.path.getsize(path)